@@ -93,6 +93,38 @@ parser.add_argument("--silent", action='store_true',
 parser.add_argument("--slow_t", type=int,
                     help="Input additional resting (integer as tenth of secs) per each servo movement")
 
+# --timings is added to the parser
+parser.add_argument("--timings", action='store_true',
+                    help="Measures the vision functions timings, logged to CubesDataLog/Cubotino_timings_log.txt")
+
+# --record is added to the parser
+parser.add_argument("--record", action='store_true',
+                    help="Records the frames of the cube status detection, for offline replay (Cubotino_P_replay.py)")
+
+# --settle is added to the parser
+parser.add_argument("--settle", action='store_true',
+                    help="Detects the motion settle via frames comparison, instead of fixed waits after the flips")
+
+# --five_faces is added to the parser
+parser.add_argument("--five_faces", action='store_true',
+                    help="Scans 5 faces, and deduces the last one when unique (the last face is scanned otherwise)")
+
+# --overlap is added to the parser
+parser.add_argument("--overlap", action='store_true',
+                    help="Servos movements via a timeline, with the top servo moving while the bottom one releases")
+
+# --virtual is added to the parser
+parser.add_argument("--virtual", nargs='?', const='FramesRecording', type=str,
+                    help="Runs on simulated hardware, replaying the recorded frames in the folder (default FramesRecording)")
+
+# --pipeline is added to the parser
+parser.add_argument("--pipeline", action='store_true',
+                    help="Robot movements run on a motion worker, while faces analysis, solver and collage fill the servos time")
+
+# --parallel_init is added to the parser
+parser.add_argument("--parallel_init", action='store_true',
+                    help="Initializes heavy imports, solver tables, camera, servos and data files concurrently")
+
 args = parser.parse_args()   # argument parsed assignement
 # ###############################################################################################
 
@@ -113,7 +145,7 @@ def import_parameters(debug=False):
     global expo_shift, kl, x_l, x_r, y_u, y_b, w_f, w_s, square_ratio, rhombus_ratio
     global delta_area_limit, collage_w, marg_coef, cam_led_bright, cam_led_auto
     global detect_timeout, show_time, warn_time, quit_time, cover_self_close, vnc_delay, fcs_delay
-    global built_by, built_by_x, built_by_fs
+    global built_by, built_by_x, built_by_fs, roi_detection, data_log
 
     try:                                                  # tentative
         sett = settings.get_settings()                    # settings are retrieved from the settings Class
@@ -142,6 +174,8 @@ def import_parameters(debug=False):
         built_by_fs = sett['built_by_fs']                 # font size for the maker's name on display
         fcs_delay = sett['fcs_delay']                     # delay in secs to switch to Fix Coordinates System for facelets position
         cover_self_close = sett['cover_self_close']       # cover_self_close parameter 
+        roi_detection = sett['roi_detection']             # facelets search limited to a region around the learned facelets coordinates
+        data_log = sett['data_log']                       # cube data log format: text (Cubotino_solver_log.txt), binary or both
         
         if debug:                                         # case debug variable is set true
             fname = settings.get_settings_fname()         # settings filename is retrieved
@@ -167,32 +201,39 @@ def import_libraries():
         These librries are imported after those needed for the display management.
         Kociemba solver is tentatively imported considering three installation/copy methods."""
     
-    global servo, rm, Popen, PIPE, camera, GPIO, median, dt, sv, cubie
-    global np, math, time, cv2, os, pathlib
+    global servo, rm, Popen, PIPE, camera, GPIO, median, dt, sv, cubie, FaceCube
+    global np, math, time, cv2, os, pathlib, ThreadPoolExecutor, deque, win, recorder, tm, post
+    global datalog, text_headers
+    
+    import importlib                                      # used to import the heavy libraries via the boot tasks
     
     # import custom libraries
     from Cubotino_P_settings_manager import settings as settings   # custom library managing the settings from<>to the settings files
     import Cubotino_P_servos as servo                     # custom library controlling Cubotino servos and led module
     import Cubotino_P_moves as rm                         # custom library, traslates the cuber solution string in robot movements string
+    from Cubotino_P_windows import windows as win         # custom library, worker thread owning the openCV windows on screen
+    from Cubotino_P_recorder import recorder              # custom library, recording the frames of the cube status detection
+    from Cubotino_P_timings import timings as tm          # custom library, measuring the vision functions timings
+    from Cubotino_P_post import post                      # custom library, background worker for the post-solve side effects
+    from Cubotino_P_datalog import datalog, text_headers  # custom library, compact binary copy of the cube data log
 
     # import non-custom libraries
     from statistics import median                         # median is used as sanity check while evaluating facelets contours
     from subprocess import Popen, PIPE                    # module for interacting with some shell commands
+    from concurrent.futures import ThreadPoolExecutor     # pool of worker threads, to run some openCV functions concurrently
+    from collections import deque                         # bounded list, used to keep track of recent events
     import os.path, pathlib                               # import libraries for file and folder management
     import RPi.GPIO as GPIO                               # import RPi GPIO library
     import datetime as dt                                 # mainly used as timestamp, like on data logging
-    import numpy as np                                    # data array management
+    boot.add('numpy', importlib.import_module, 'numpy')   # numpy import task (already declared, and started, on parallel init)
+    np = boot.lazy('numpy', globals(), 'np')              # data array management, imported (or waited) at first use
     import math                                           # math package
     import time                                           # time package
     import os                                             # os is imported to ensure the file presence check/make
     
 
-    disp.show_on_display('LOADING', 'openCV', fs1=24, fs2=26)  # feedback is printed to the display
-    print("Loading solver:")                              # feedback is printed to the terminal
-    disp.set_backlight(1)                                 # display backlight is turned on, in case it wasn't
-    import cv2                                            # computer vision package
-    print(f'CV2 version: {cv2.__version__}')              # print to terminal the cv2 version
-    disp.set_backlight(0)                                 # display backlight is turned off
+    boot.add('cv2', importlib.import_module, 'cv2', after=('numpy',))  # openCV import task
+    cv2 = boot.lazy('cv2', globals(), 'cv2')              # computer vision package, imported (or waited) at first use
     
 
     disp.show_on_display('LOADING', 'SOLVER', fs1=24, fs2=27)  # feedback is printed to the display
@@ -200,26 +241,59 @@ def import_libraries():
     disp.set_backlight(1)                                 # display backlight is turned on, in case it wasn't
 
     # importing Kociemba solver
-    solver_found = False                                  # boolean to track the import the copied solver in subfolder       
+    boot.add('solver', import_solver)                     # solver import task (solver tables are loaded at the import)
+    solver = boot.wait('solver')                          # solver modules, or None when the solver is not found
+    solver_found = solver is not None                     # boolean to track the import the copied solver in subfolder
+    if solver_found:                                      # case the solver has been imported
+        sv, cubie, FaceCube = solver                      # solver, cubie library part and facelet level cube
+    
+    if not solver_found:                                  # case no one solver has been imported
+        print('\nNot found Kociemba solver')              # feedback is printed to the terminal
+        disp.show_on_display('NO SOLVER', 'FOUND', fs1=19, fs2=28) # feedback is printed to the display
+        time.sleep(5)                                     # delay to let user the time to read the display
+        quit_func(quit_script=True)                       # script is quitted
+
+
+
+
+
+
+
+def import_solver():
+    """ Imports the Kociemba solver copied in the solver2x2x2 subfolder; The solver tables are loaded at the import.
+        Returns the tuple (solver, cubie, FaceCube), or None when the solver is not found."""
+    
+    import os, pathlib                                    # import libraries for file and folder management
     folder = pathlib.Path().resolve()                     # active folder (should be home/pi/cubotino_pocket)  
     fname = os.path.join(folder,'solver2x2x2','solver.py') # active folder + Solver2x2x2 + solver name
     if os.path.exists(fname):                             # case the solver exists in 'Solver2x2x2' subfolder
         try:                                              # attempt
             import solver2x2x2.solver as sv               # import Kociemba solver copied in sub-folder
             import solver2x2x2.cubie as cubie             # import cubie Kociemba solver library part
-            solver_found = True                           # boolean to track the  import the copied solver in subfolder
+            from solver2x2x2.face import FaceCube         # import facelet level cube, to check the cube status validity
             if debug:                                     # case debug variable is set True            
                 print('Found Kociemba solver in solver2x2x2 subfolder')  # feedback is printed to the terminal
+            return sv, cubie, FaceCube                    # solver modules are returned
         except:                                           # exception is raised if no library in folder or other issues
-            solver_found = False                          # boolean to track the import the copied solver in subfolder
-    else:
-        solver_found = False                              # boolean to track the import the copied solver in subfolder
+            pass
+    return None                                           # None is returned when the solver is not found
+
+
+
+
+
+
+
+def load_data_files():
+    """ Loads the data learned on the previous cycles. Returns the tuple (f_coordinates, ref_centers, colors_calib,
+        camera_profiles, fcs_history)."""
     
-    if not solver_found:                                  # case no one solver has been imported
-        print('\nNot found Kociemba solver')              # feedback is printed to the terminal
-        disp.show_on_display('NO SOLVER', 'FOUND', fs1=19, fs2=28) # feedback is printed to the display
-        time.sleep(5)                                     # delay to let user the time to read the display
-        quit_func(quit_script=True)                       # script is quitted
+    f_coordinates = load_coordinates()                    # load the fix coordinates
+    ref_centers = load_ref_colors()                       # load the reference colors of the last solved cube
+    colors_calib = load_colors_calib()                    # load (or build from the log) the per robot colors calibration
+    camera_profiles = load_camera_profiles()              # load the per robot camera profiles
+    fcs_history = load_fcs_history()                      # load the per-face history for the fix coordinates delay
+    return f_coordinates, ref_centers, colors_calib, camera_profiles, fcs_history
 
 
 
@@ -351,6 +425,8 @@ def check_screen_presence():
 
 def get_os_version():
     """Returns the Raspberry Pi OS (in digits)."""
+    if virtual:                   # case of the virtual hardware (--virtual argument)
+        return 11                 # the replay camera acts as the PiCamera on OS 11 (Bullseye)
     os_version = 0
     with open('/etc/os-release', 'r') as file:
         for row in file:
@@ -438,15 +514,14 @@ def robot_camera_setting(debug, os_version, camera):
     
     if screen and not robot_stop:                      # case screen variable is set True
         if fixWindPos:                                 # case the fixWindPos variable is chosen
-            cv2.namedWindow('cube')                    # create the cube window
-            cv2.moveWindow('cube', 0,0)                # move the window to (0,0)
+            win.window('cube', (0,0))                  # create the cube window, and move it to (0,0)
 
     t_start = time.time()                              # time reference
     while time.time()-t_start<t_max:                   # timeout for camera stabilization
         if screen and not robot_stop:                  # case screen variable is set True
             frame, w, h = read_camera()                # camera reading, not necessary but nice to show
-            cv2.imshow('cube', frame)                  # shows the frame 
-            cv2.waitKey(1)                             # tot refresh time of 1ms (in reality much more)
+            if frame is not None:                      # case the camera returned a frame
+                win.show('cube', frame)                # frame is queued to the windows worker (latest frame wins)
         else:                                          # case screen variable is set False
             time.sleep(0.11)                           # similar time when there is no camera reading and plot to screen
         
@@ -526,6 +601,110 @@ def robot_camera_setting(debug, os_version, camera):
 
 
 
+def camera_profile_key():
+    """ Returns the key of the camera profile, for the current led brightness and exposure shift."""
+    return f'{cam_led_bright}_{expo_shift}'
+
+
+
+
+
+
+
+def load_camera_profiles():
+    """ Loads the camera profiles (gains, AWB and shutter time of the previous successful cycles), per robot.
+        Profiles are keyed by the top cover led brightness (cam_led_bright) and by the exposure shift (expo_shift)."""
+    
+    import json                                                 # json is used to load the file
+    from Cubotino_P_settings_manager import settings as settings  # settings manager Class
+    fname = settings.get_camera_profile_fname()                 # camera profiles file name, for this robot
+    try:                                                        # tentative
+        if os.path.exists(fname):                               # case the camera profiles file exists
+            with open(fname, "r") as f:                         # file is opened in reading mode
+                return json.load(f)                             # camera profiles are returned
+    except:                                                     # case an exception is raised (i.e. corrupted file)
+        print(f"Not valid camera profiles in {fname}")          # feedback is printed to the terminal
+    return {}
+
+
+
+
+
+
+
+def save_camera_profile():
+    """ Saves the camera profile measured on this cycle (full auto-settle), after the cube has been solved."""
+    
+    global camera_profile_pending
+    
+    if len(camera_profile_pending) == 0:                        # case there is no new camera profile
+        return                                                  # function is terminated
+    import json                                                 # json is used to save the file
+    from Cubotino_P_settings_manager import settings as settings  # settings manager Class
+    camera_profiles.update(camera_profile_pending)              # new profile replaces the previous one (same key)
+    camera_profile_pending = {}                                 # pending profile is cleared
+    fname = settings.get_camera_profile_fname()                 # camera profiles file name, for this robot
+    try:                                                        # tentative
+        with open(fname, "w") as f:                             # file is opened in writing mode
+            json.dump(camera_profiles, f, indent=0)             # camera profiles are saved
+    except:                                                     # case an exception is raised
+        print(f"Could not save the camera profiles to {fname}") # feedback is printed to the terminal
+
+
+
+
+
+
+
+def camera_profile_check(camera, os_version, t_check=0.4, exp_tol=0.25, awb_tol=0.10):
+    """ Quick check of the stored camera profile, with the camera already in Auto mode on the first cube face.
+        After t_check secs (tripled on Rpi ZeroW) the auto exposure (shutter time * analog gain) and AWB gains are
+        read: This quick reading is compared to the quick reading stored in the profile, taken in the same way when
+        the profile was measured, and it must be within exp_tol for the exposure and within awb_tol for the AWB gains.
+        When matching, the profile gains and shutter time are set to the PiCamera (manual mode); On a mismatch
+        (i.e. drifted light conditions), or without a stored profile, the full auto-settle is needed.
+        Returns True when the profile is set, and the quick reading (dict) to be stored with a new profile."""
+    
+    t_ref = time.time()                                         # time reference
+    t_max = 3*t_check if Rpi_ZeroW else t_check                 # time to let the auto mode adjusting to the cube
+    while True:                                                 # metadata is inquired at the frame rate
+        if os_version <= 10:                                    # case the flashed OS is 10 (Buster) or older
+            metadata = camera.get_data()                        # camera is inquire
+        elif os_version >= 11:                                  # case the flashed OS is 11 (Bullseye) or newer
+            metadata = camera.get_metadata()                    # camera is inquired
+        if time.time() - t_ref >= t_max:                        # case the checking time is elapsed
+            break                                               # while loop is interrupted
+    
+    a_gain = metadata["AnalogueGain"]                           # analog gain from metadata is assigned to the variable
+    awb_gains = metadata["ColourGains"]                         # AWB gains from metadata is assigned to the variable
+    exposure = metadata["ExposureTime"]                         # exposure time from metadata is assigned to the variable
+    quick = {'exposure': float(a_gain)*exposure, 'awb_gains': [float(awb_gains[0]), float(awb_gains[1])]}  # quick reading
+    
+    prof = camera_profiles.get(camera_profile_key())            # stored profile for the current led and exposure settings
+    if prof is None or 'check' not in prof:                     # case there is no stored profile (or it has no quick reading)
+        return False, quick                                     # full auto-settle is needed
+    
+    ref = prof['check']                                         # quick reading taken when the profile was measured
+    exp_drift = abs(quick['exposure']/ref['exposure'] - 1)      # relative drift of the exposure
+    awb_drift = max(abs(quick['awb_gains'][i]/ref['awb_gains'][i] - 1) for i in range(2))  # relative drift of the AWB gains
+    if exp_drift > exp_tol or awb_drift > awb_tol:              # case the light conditions differ from the profile ones
+        print(f'Camera profile drift (exposure {round(100*exp_drift)}%, AWB {round(100*awb_drift)}%): full camera setting')
+        return False, quick                                     # full auto-settle is needed
+    
+    camera.set_gains(debug, prof['a_gain'], prof['d_gain'], tuple(prof['awb_gains']))  # profile gains are set to the PiCamera
+    camera.set_exposure(prof['shutter_time'])                   # profile shutter time is set to the PiCamera
+    t_ref = time.time()                                         # current time is assigned to a reference variable
+    while time.time()-t_ref < 2:                                # while loop for max 2 seconds
+        if abs(camera.get_exposure()-prof['shutter_time']) < 0.10*prof['shutter_time']:  # case the shutter time is set
+            break                                               # while loop is interrupted
+    return True, quick
+
+
+
+
+
+
+
 def robot_consistent_camera_images(debug, os_version, camera, start_time):
     """ Picamera is left in set in Auto mode for Exposure and AWB gains, while presenting 4 cube faces.
     These parameters are retrieved from PiCamera after showing each of these first 4 cube faces.
@@ -550,6 +729,12 @@ def robot_consistent_camera_images(debug, os_version, camera, start_time):
     
     camera.set_auto(debug, awb_mode, expo_shift)        # camera is set to automatic mode, by also passing the chosen AWB mode
     
+    profile_set, quick = camera_profile_check(camera, os_version)  # stored camera profile check, and quick camera reading
+    if profile_set:                                     # case the stored camera profile matches the current light conditions
+        print(f'Camera setting: Stored camera profile, in {round(time.time()-start_time,1)} secs')  # feedback is printed to the terminal
+        disp.clean_display()                            # cleans the display
+        return                                          # function is terminated, the cube is still on the first face
+    
     if debug:                                           # case debug variable is set True
         print("\nCamera settings (in Auto mode):")      # feedback is printed to the terminal
         print('\nPiCamera: Reading the stable camera parameters on four cube sides')  # feedback is printed to the terminal
@@ -611,6 +796,10 @@ def robot_consistent_camera_images(debug, os_version, camera, start_time):
         print('Awb_red_list',awb_red_list)              # feedback is printed to the terminal
         print("\n"*4)                                   # prints four empty lines
 
+    # camera profile, saved once the cube is solved, with the quick reading for the check on the next cycles
+    camera_profile_pending[camera_profile_key()] = {'a_gain': a_gain, 'd_gain': d_gain, 'awb_gains': awb_gains,
+                                                    'shutter_time': shutter_time, 'check': quick}
+    
     disp.clean_display()                                # cleans the display
     robot_to_cube_side(1,cam_led_bright)                # flipping the cube, to reach the 1st face for the scanning process
 
@@ -621,7 +810,7 @@ def robot_consistent_camera_images(debug, os_version, camera, start_time):
 
 
 def read_camera():
-    """ Returns the camera reading, and dimensions."""
+    """ Returns the camera reading, and dimensions; The frame is None when the camera returns an empty frame."""
     
     global previous_time
     
@@ -631,9 +820,10 @@ def read_camera():
     
     if len(frame)==0:                                             # case the frame is empty
         print('camera frame not available')                       # feedback is print to the terminal
+        return None, width, height                                # None frame, and the camera dimensions
     
     else:                                                         # case the frame is not empty
-        if not picamera_test:                                     # case picamera_test is false
+        if not (picamera_test or virtual):                        # case picamera_test is false, and frames are not replayed
             frame, w, h = frame_cropping(frame, width, height, x_l, x_r, y_u, y_b)  # frame is cropped in order to limit the image area to analyze
             frame, w, h = warp_image(frame, w, h, w_f, w_s)       # frame is warped to have a top like view toward the top cube face
             scale = 0.75 if cv_wow else 0.8                       # scaling factor according to cv_wow i 
@@ -643,6 +833,9 @@ def read_camera():
             w = width                                             # widht is assigned to w
             h = height                                            # height is assigned to h
         
+        elif virtual:                                             # case of the virtual hardware (--virtual argument)
+            h, w = frame.shape[:2]                                # replayed frames are already cropped, warped and resized
+        
         return frame, w, h
 
 
@@ -740,6 +933,8 @@ def edge_analysis(frame, w, h):
     """ Image analysis that returns a black & white image, based on the colors borders.
         Different analysis for cube with /withouth the black frame around the facelets."""
     
+    global last_cannies                                      # canny images of the last frame, per edges chain
+    
     if cv_wow and screen:                                    # case screen and cv_wow variables are set true on __main__
         global gray, blurred, canny, dilated, eroded         # images are set as global variable
 
@@ -761,13 +956,22 @@ def edge_analysis(frame, w, h):
         kernel = np.ones((5,5), np.uint8)                    # smaller kernel is used for the erosion
         eroded = cv2.erode(dilated, kernel, iterations = 1)  # smaller "iterations" keeps the contour apart from the edges
     
-    # note: when frameless_cube == 'auto' the cube detection takes slightly longer
+    # note: when frameless_cube == 'auto' the two edges chains run concurrently, or only the one that recently worked
     elif frameless_cube == 'auto':                           # case for cubes with and without the black frame around the facelets
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)          # low pass gaussian filter, with a 5x5 gaussian filter
-        canny_01 = cv2.Canny(blurred, 10, 30)                # single pixel edges, with intensity gradient range 10 to 30
-        blurred = cv2.bilateralFilter(gray,4, 200, 200)      # low pass bilateral filter, to de-noise while safegarding edges
-        canny_02 = cv2.Canny(blurred, 4, 25)                 # single pixel edges, with intensity gradient range 4 to 25
-        canny = cv2.bitwise_or(canny_01, canny_02, mask = None) # canny image, by (OR) combining those generated with parameters with and without frames
+        chains = auto_edge_chains()                          # edges chains to apply ('frame', 'frameless', or both)
+        if len(chains) == 2 and edge_pool is not None:       # case both the chains are needed, and the workers pool exists
+            futures = [edge_pool.submit(edge_chain, gray, chain) for chain in chains]  # both the chains run concurrently
+            (_, canny_01), (blurred, canny_02) = [future.result() for future in futures]  # waits for both chains results
+        elif len(chains) == 2:                               # case both the chains are needed, without workers pool (i.e. Rpi ZeroW)
+            _, canny_01 = edge_chain(gray, 'frame')          # edges chain for cubes with black frame around the facelets
+            blurred, canny_02 = edge_chain(gray, 'frameless')  # edges chain for frameless cubes
+        else:                                                # case only one chain is needed (the recently winning one)
+            blurred, canny = edge_chain(gray, chains[0])     # the recently winning edges chain is applied
+            last_cannies = {chains[0]: canny}                # canny image is stored, to later tell the winning chain
+        
+        if len(chains) == 2:                                 # case both the chains have been applied
+            canny = cv2.bitwise_or(canny_01, canny_02, mask = None) # canny image, by (OR) combining those generated with parameters with and without frames
+            last_cannies = {'frame': canny_01, 'frameless': canny_02}  # canny images are stored, to later tell the winning chain
         kernel = np.ones((7,7), np.uint8)                    # kernel of 7x7 pixels for the dilate transformation
         dilated = cv2.dilate(canny, kernel, iterations = 3)  # higher "iterations" is overall faster
         kernel = np.ones((3,3), np.uint8)                    # smaller kernel is used for the erosion
@@ -789,6 +993,78 @@ def edge_analysis(frame, w, h):
 
 
 
+def edge_chain(gray, chain):
+    """ Edges detection chain used when frameless_cube == 'auto'; Argument chain is 'frame' or 'frameless'.
+        OpenCV releases the GIL, therefore two chains can run concurrently on different threads.
+        Returns the blurred image and the canny (single pixel edges) image."""
+    
+    if chain == 'frame':                                     # case of chain for cubes with black frame around the facelets
+        blurred = cv2.GaussianBlur(gray, (5, 5), 0)          # low pass gaussian filter, with a 5x5 gaussian filter
+        canny = cv2.Canny(blurred, 10, 30)                   # single pixel edges, with intensity gradient range 10 to 30
+    else:                                                    # case of chain for frameless cubes
+        blurred = cv2.bilateralFilter(gray,4, 200, 200)      # low pass bilateral filter, to de-noise while safegarding edges
+        canny = cv2.Canny(blurred, 4, 25)                    # single pixel edges, with intensity gradient range 4 to 25
+    
+    return blurred, canny
+
+
+
+
+
+
+
+def auto_edge_chains():
+    """ Returns the edges chains to apply when frameless_cube == 'auto'.
+    When the same chain has produced the accepted facelets on the last faces (chain_history is full and uniform),
+    only that chain is applied; If that chain does not detect the face within max_frames, both the chains are
+    applied again and the history is cleared."""
+    
+    max_frames = 6                                           # frames to detect a face with a single chain, before using both
+    
+    if len(chain_history) == chain_history.maxlen and len(set(chain_history)) == 1:  # case of a steady winning chain
+        if roi_frames <= max_frames:                         # case the face is not taking too many frames
+            return (chain_history[-1],)                      # the steady winning chain is returned
+        chain_history.clear()                                # history is cleared, as the winning chain failed on this face
+    
+    return ('frame', 'frameless')                            # both the chains are returned
+
+
+
+
+
+
+
+def auto_chain_update(facelets, fcs_used):
+    """ Identifies which edges chain produced the accepted facelets, when frameless_cube == 'auto', and stores it in
+    chain_history. When both the chains were applied, the winner is the one having more edge pixels along the facelets
+    contours. Faces detected via the fix coordinates system are not considered."""
+    
+    if frameless_cube != 'auto' or fcs_used or len(last_cannies) == 0:  # case the chains are not used, or face from fcs
+        return                                               # function is terminated
+    
+    if len(last_cannies) == 1:                               # case a single chain was applied
+        winner = list(last_cannies.keys())[0]                # the applied chain is the winner
+    else:                                                    # case both the chains were applied
+        x0, y0 = roi_origin                                  # ROI origin, as the canny images refer to the ROI
+        contours = [(np.array(f['contour']).reshape(-1,1,2) - (x0, y0)).astype(np.int32) for f in facelets]  # facelets contours on ROI
+        scores = {}                                          # dict to store the edge pixels along the facelets contours, per chain
+        for chain, canny in last_cannies.items():            # iteration over the canny images of the chains
+            mask = np.zeros_like(canny)                      # empty mask, having the canny image size
+            cv2.drawContours(mask, contours, -1, 255, 5)     # facelets contours are drawn on the mask, with 5 pixels thickness
+            scores[chain] = cv2.countNonZero(cv2.bitwise_and(canny, mask))  # canny edge pixels along the facelets contours
+        winner = max(scores, key=scores.get)                 # the chain having more edges along the facelets contours
+    
+    chain_history.append(winner)                             # winning chain is appended to the history
+    chain_winners.append(winner)                             # winning chain is appended to the list for this cycle
+    if debug:                                                # case debug variable is set True
+        print(f"Edges chain producing the facelets: {winner}")  # feedback is printed to the terminal
+
+
+
+
+
+
+
 def show_cv_wow(cube, time=2000):
     """ shows how the image from the camera is altered to detect the facelets.
         Also possible to set a boolean to save those images."""
@@ -798,36 +1074,28 @@ def show_cv_wow(cube, time=2000):
     
     # note: for precise window position, after windows name at cv2.namedWindow, the parameter cv2.WINDOW_NORMAL  
     # should be used instead of the cv2.WINDOW_RESIZE (default), but image quality on screen changes too much....
-    cv2.namedWindow('Pre_warp')                      # create the Pre_warp window
-    cv2.moveWindow('Pre_warp', w, gap_h)             # move the Pre_warp window to coordinate
-    cv2.namedWindow('After_warp')                    # create the Frame window
-    cv2.moveWindow('After_warp', 2*w+gap_w, gap_h)   # move the Frame window to coordinate
-    cv2.namedWindow('Gray')                          # create the Gray window
-    cv2.moveWindow('Gray', 3*w+gap_w, gap_h)         # move the Gray window to coordinate
-    cv2.namedWindow('blurred')                       # create the Blurred window
-    cv2.moveWindow('blurred', 4*w+gap_w, gap_h)      # move the Blurred window to coordinate
-    cv2.namedWindow('Canny')                         # create the Canny window
-    cv2.moveWindow('Canny', w+gap_w, h+2*gap_h)      # move the Canny window to coordinate
-    cv2.namedWindow('Dilated')                       # create the Dilated window
-    cv2.moveWindow('Dilated', 2*w+gap_w, h+2*gap_h)  # move the Dilated window to coordinate
-    cv2.namedWindow('Eroded')                        # create the Eroded window
-    cv2.moveWindow('Eroded', 3*w+gap_w, h+2*gap_h)   # move the Eroded window to coordinate
-    cv2.namedWindow('Cube')                          # create the Cube window
-    cv2.moveWindow('Cube', 4*w+gap_w, h+2*gap_h)     # move the Cube window to coordinate
-    
-    cv2.imshow("Pre_warp", pre_warp)                 # pre-warp is shown, on a window called Pre_warp
-    cv2.imshow("After_warp", after_warp)             # after_warp is shown, on a window called After_warp
-    cv2.imshow("Gray", gray)                         # gray is shown, on a window called Gray
-    cv2.imshow("blurred", blurred)                   # blurred is shown, on a window called Blurred
-    cv2.imshow("Canny", canny)                       # canny is shown, on a window called Canny
-    cv2.imshow("Dilated", dilated)                   # dilated is shown, on a window called Dilated
-    cv2.imshow("Eroded", eroded)                     # eroded is shown, on a window called Eroded
-    cv2.imshow("Cube", cube)                         # cube is shown, on a window called Cube
+    win.window('Pre_warp', (w, gap_h))               # create the Pre_warp window, and move it to coordinate
+    win.window('After_warp', (2*w+gap_w, gap_h))     # create the Frame window, and move it to coordinate
+    win.window('Gray', (3*w+gap_w, gap_h))           # create the Gray window, and move it to coordinate
+    win.window('blurred', (4*w+gap_w, gap_h))        # create the Blurred window, and move it to coordinate
+    win.window('Canny', (w+gap_w, h+2*gap_h))        # create the Canny window, and move it to coordinate
+    win.window('Dilated', (2*w+gap_w, h+2*gap_h))    # create the Dilated window, and move it to coordinate
+    win.window('Eroded', (3*w+gap_w, h+2*gap_h))     # create the Eroded window, and move it to coordinate
+    win.window('Cube', (4*w+gap_w, h+2*gap_h))       # create the Cube window, and move it to coordinate
+    
+    win.show_set({"Pre_warp": pre_warp,              # pre-warp is shown, on a window called Pre_warp
+                  "After_warp": after_warp,          # after_warp is shown, on a window called After_warp
+                  "Gray": gray,                      # gray is shown, on a window called Gray
+                  "blurred": blurred,                # blurred is shown, on a window called Blurred
+                  "Canny": canny,                    # canny is shown, on a window called Canny
+                  "Dilated": dilated,                # dilated is shown, on a window called Dilated
+                  "Eroded": eroded,                  # eroded is shown, on a window called Eroded
+                  "Cube": cube})                     # cube is shown, on a window called Cube
     
     if side == 1:                   # case the first cube side is under analysis 
-        cv2.waitKey(time + 4000)    # all the openCV windows are showed, with an extra time on first cube side
+        win.wait(time + 4000)       # all the openCV windows are showed, with an extra time on first cube side
     else:                           # case the cube side under analysis is not the first side
-        cv2.waitKey(time)           # all the openCV windows are showed
+        win.wait(time)              # all the openCV windows are showed
     
     save_images = False                                         # boolean to enable/disable saving cv_wow images
     folder = pathlib.Path().resolve()                           # active folder (should be home/pi/cubotino_pocket)  
@@ -962,8 +1230,15 @@ def read_facelets(frame, w, h):
         print(f'Reading side {sides[side]}')      # feedback is printed to the terminal
         prev_side=side                            # current side is assigned to previous side variable
 
-    image, w, h = edge_analysis(frame, w, h)      # image edges analysis is applied to the frame
-    (contours, hierarchy) = cv2.findContours(image, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)  # contours are searched on the image
+    global roi_origin
+    
+    x0, y0, x1, y1 = roi_box(w, h)                # region of interest (ROI) where to search for the facelets
+    roi_origin = (x0, y0)                         # ROI origin is stored (canny images refer to the ROI)
+    roi = frame[y0:y1, x0:x1]                     # frame is sliced to the ROI (full frame when the ROI is not used)
+    image, _, _ = edge_analysis(roi, x1-x0, y1-y0)  # image edges analysis is applied to the ROI
+    
+    # contours are searched on the image, and shifted by the ROI origin to the full frame coordinates
+    (contours, hierarchy) = cv2.findContours(image, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE, offset=(x0, y0))
     
     return (contours, hierarchy)                  # contours are returned
 
@@ -973,6 +1248,285 @@ def read_facelets(frame, w, h):
 
 
 
+def roi_box(w, h):
+    """ Returns the Region Of Interest (ROI) where to search for the facelets, as (x0, y0, x1, y1) frame coordinates.
+    The ROI is a box around the facelets centers learned on previous cycles (f_coordinates), padded by a fraction
+    of the facelets pitch. The padding is widened after a few frames without a detected face, until the full frame
+    is used again; This keeps the edge analysis and the contours search on a small image area, as long as the cube
+    sits where expected.
+    The full frame is returned when the ROI is disabled, with cv_wow, or when there aren't learned coordinates."""
+    
+    global roi_frames, roi_active
+    
+    roi_pads = (0.9, 1.4)                          # ROI padding, as fraction of facelets pitch, at the different ROI levels
+    frames_per_level = 4                           # frames without a detected face before widening the ROI
+    
+    roi_frames += 1                                # counter of the analyzed frames on this face is incremented
+    roi_active = False                             # ROI flag is initially set False
+    
+    if not roi_detection or cv_wow or len(f_coordinates)!=8:  # case ROI is disabled, cv_wow is active or no learned coordinates
+        return 0, 0, w, h                          # full frame is returned
+    
+    level = (roi_frames-1)//frames_per_level       # ROI level, increasing every frames_per_level frames without a detected face
+    if level >= len(roi_pads):                     # case all the ROI levels have been tried
+        return 0, 0, w, h                          # full frame is returned
+    
+    c = f_coordinates                              # f_coordinates assigned to a local very short variable name
+    x_dist = (c[2]-c[0] + c[6]-c[4])/2             # x distance between the facelets centers
+    y_dist = (c[5]-c[1] + c[7]-c[3])/2             # y distance between the facelets centers
+    if x_dist <= 0 or y_dist <= 0:                 # case the learned coordinates are not consistent
+        return 0, 0, w, h                          # full frame is returned
+    
+    pad_x = int(roi_pads[level]*x_dist)            # ROI padding along x, from the outer facelets centers
+    pad_y = int(roi_pads[level]*y_dist)            # ROI padding along y, from the outer facelets centers
+    x0 = max(min(c[0:8:2]) - pad_x, 0)             # ROI left side, limited to the frame
+    y0 = max(min(c[1:8:2]) - pad_y, 0)             # ROI top side, limited to the frame
+    x1 = min(max(c[0:8:2]) + pad_x, w)             # ROI right side, limited to the frame
+    y1 = min(max(c[1:8:2]) + pad_y, h)             # ROI bottom side, limited to the frame
+    
+    if x1-x0 < 16 or y1-y0 < 16:                   # case the ROI is too small for the edges analysis
+        return 0, 0, w, h                          # full frame is returned
+    
+    roi_active = True                              # ROI flag is set True
+    return x0, y0, x1, y1                          # ROI coordinates are returned
+
+
+
+
+
+
+
+def roi_face_stats(side, detect_time, fcs_used):
+    """ Stores the detection time, the analyzed frames and whether the face was detected within the ROI.
+        The frame counter is reset, so that the next face starts from the smallest ROI."""
+    
+    global roi_frames
+    
+    hit = roi_active and not fcs_used              # face detected within the ROI (not via the fix coordinates system)
+    roi_stats.append((sides[side], round(detect_time,2), roi_frames, hit, fcs_used))  # face statistics are appended to the list
+    roi_frames = 0                                 # counter of the analyzed frames is reset for the next face
+
+
+
+
+
+
+
+def load_fcs_history():
+    """ Loads the per-face history of the contours detection times and of the fix coordinates reads outcome."""
+    
+    import json                                    # json is used to load the file
+    fname = os.path.join(pathlib.Path().resolve(), 'Cubotino_P_fcs_history.txt')  # folder and file name
+    try:                                           # tentative
+        if os.path.exists(fname):                  # case the file exists
+            with open(fname, "r") as f:            # file is opened in reading mode
+                return json.load(f)                # history is returned
+    except:                                        # case an exception is raised (i.e. corrupted file)
+        print(f"Not valid fix coordinates history in {fname}")  # feedback is printed to the terminal
+    return {}
+
+
+
+
+
+
+
+def update_fcs_history(solved, delays, max_len=50):
+    """ Updates, and saves, the per-face history with the faces detection statistics of this cycle (roi_stats).
+        Faces detected via contours store their detection time; Faces detected via the fix coordinates store
+        whether the cube status led to a solution (solved), as colors read on wrong coordinates lead to errors.
+        Faces switched to the fix coordinates after a delay also store that delay (delays, per side) as a lower
+        bound of the contours detection time ('cut'), otherwise the slow detections would never be learned.
+        The history is not updated on the virtual hardware, to keep the synthetic timings out of the file."""
+    
+    import json                                    # json is used to save the file
+    if virtual:                                    # case of the virtual hardware (--virtual argument)
+        return                                     # function is terminated
+    
+    side_of = {face: side_n for side_n, face in sides.items()}  # cube side number per face letter
+    for face, secs, frames, hit, fcs_used in roi_stats:  # iteration over the faces statistics
+        hist = fcs_history.setdefault(face, {'t': [], 'fcs': []})  # history of the face
+        if fcs_used:                               # case the face was detected via the fix coordinates
+            hist['fcs'] = (hist['fcs'] + [int(solved)])[-max_len:]  # fix coordinates outcome is stored
+            delay = delays.get(side_of.get(face), 0)  # delay after which the fix coordinates were used
+            if delay > 0:                          # case the contours detection was cut off by the fix coordinates
+                hist['cut'] = (hist.get('cut', []) + [round(delay, 2)])[-max_len:]  # lower bound of the detection time
+        else:                                      # case the face was detected via contours
+            hist['t'] = (hist['t'] + [secs])[-max_len:]  # detection time is stored
+    
+    fname = os.path.join(pathlib.Path().resolve(), 'Cubotino_P_fcs_history.txt')  # folder and file name
+    try:                                           # tentative
+        with open(fname, "w") as f:                # file is opened in writing mode
+            json.dump(fcs_history, f)              # history is saved
+    except:                                        # case an exception is raised
+        print(f"Could not save the fix coordinates history to {fname}")  # feedback is printed to the terminal
+
+
+
+
+
+
+
+def adaptive_fcs_delays(n_min=8, reliable=0.95, min_delay=0.3):
+    """ Returns a dict with the per-face delay (secs) to switch to the fix coordinates, learned from the history.
+        Faces where the fix coordinates have proven reliable (at least n_min reads, with a success rate >= reliable)
+        use the fix coordinates immediately; Otherwise the switch-over happens once the wait exceeds the p95 of the
+        past contours detection times (not shorter than min_delay). Detections cut off by the fix coordinates
+        ('cut') are only known to be longer than the delay, so they rank above all the measured times: When they
+        are more than 5% the p95 is not known, and the fcs_delay setting is used again to measure the slow faces.
+        The fcs_delay setting is the upper limit, and it is used as is for faces without enough history."""
+    
+    delays = {}                                    # dict to store the per-face delay
+    for side_n in range(1, 7):                     # iteration over the cube sides
+        hist = fcs_history.get(sides[side_n], {'t': [], 'fcs': []})  # history of the face
+        if len(hist['fcs']) >= n_min and sum(hist['fcs'])/len(hist['fcs']) >= reliable:  # case of reliable fix coordinates
+            delays[side_n] = 0                     # fix coordinates are used immediately
+        elif len(hist['t']) + len(hist.get('cut', [])) >= n_min:  # case of enough contours detection times
+            t = sorted(hist['t'])                  # measured detection times, sorted (cut off ones rank above these)
+            rank = max(0, -(-95*(len(t) + len(hist.get('cut', [])))//100) - 1)  # 95th percentile rank (nearest rank)
+            if rank < len(t):                      # case the 95th percentile is a measured detection time
+                delays[side_n] = min(fcs_delay, max(min_delay, t[rank]))  # switch-over time
+            else:                                  # case the 95th percentile falls on the cut off detections
+                delays[side_n] = fcs_delay         # switch-over time from the settings
+        else:                                      # case of not enough history
+            delays[side_n] = fcs_delay             # switch-over time from the settings
+    return delays
+
+
+
+
+
+
+
+def roi_report():
+    """ Prints to the terminal the per-face detection time, the analyzed frames, and the ROI hit rate."""
+    
+    if len(roi_stats) == 0:                        # case there are no face statistics
+        return                                     # function is terminated
+    
+    print('\nFaces detection (face: secs, frames, ROI):')  # feedback is printed to the terminal
+    for face, secs, frames, hit, fcs_used in roi_stats:  # iteration over the faces statistics
+        print(f'  {face}: {secs} secs, {frames} frames, {"hit" if hit else "fcs" if fcs_used else "miss"}')  # feedback to the terminal
+    
+    if len(chain_winners) > 0:                     # case the edges chains have been tracked (frameless_cube == 'auto')
+        print(f'Edges chains producing the facelets: {", ".join(chain_winners)}')  # feedback is printed to the terminal
+    
+    if len(consensus_stats) > 0:                   # case the facelets colors have been sampled on multiple frames
+        print('Frames per face for the colors consensus: ' + '  '.join(f'{f}:{n}' for f, n in consensus_stats))  # feedback to the terminal
+    
+    tot_time = sum([stat[1] for stat in roi_stats])  # total faces detection time
+    hits = sum([1 for stat in roi_stats if stat[3]])  # faces detected within the ROI
+    hit_rate = int(100*hits/len(roi_stats))        # ROI hit rate, in percentage
+    print(f'Faces detection time: {round(tot_time,2)} secs, ROI hit rate: {hit_rate}%')  # feedback is printed to the terminal
+
+
+
+
+
+
+
+def motion_settle(fixed_wait, thr=2.0, n_stable=2, step=8, min_ratio=0.4):
+    """ Waits for the top cover (PiCamera) and the cube to settle after a movement, instead of a fixed_wait sleep.
+        Consecutive frames are compared on a sparse pixels grid (every step pixels, summed BGR channels): Motion is
+        settled when the mean absolute difference stays below thr for n_stable consecutive frames.
+        Stability is not accepted before min_ratio * fixed_wait (the servo might not have started moving yet), and the
+        wait is anyhow terminated after fixed_wait secs.
+        The waited time and the time saved compared to the fixed_wait are stored on settle_stats; Entries stored
+        during the camera setting flips are discarded by cubeAF, so that settle_stats covers the scan only."""
+    
+    t0 = time.time()                                   # time reference
+    prev, stable = None, 0                             # previous sampled frame, and counter of stable frames
+    while time.time() - t0 < fixed_wait:               # case the fixed waiting time is not elapsed
+        frame = camera.get_frame()                     # frame is retrieved from the camera
+        if len(frame) == 0:                            # case the frame is empty
+            continue                                   # next frame
+        sample = frame[::step, ::step].astype(np.int16).sum(axis=2)  # sparse pixels grid, BGR channels summed
+        if prev is not None:                           # case there is a previous sampled frame
+            diff = np.abs(sample - prev).mean()/3      # mean absolute difference, per channel
+            stable = stable + 1 if diff < thr else 0   # counter of consecutive stable frames
+            if stable >= n_stable and time.time() - t0 > min_ratio * fixed_wait:  # case of settled motion
+                break                                  # while loop is interrupted
+        prev = sample                                  # sampled frame becomes the previous one
+    
+    waited = time.time() - t0                          # time spent waiting for the motion to settle
+    settle_stats.append((sides[side+1], round(waited,3), round(max(0, fixed_wait - waited),3)))  # next face statistics
+    if debug:                                          # case debug variable is set True
+        print(f'Motion settled in {round(waited,3)} secs (fixed wait {round(fixed_wait,3)} secs)')  # feedback to the terminal
+
+
+
+
+
+
+
+def settle_report():
+    """ Prints to the terminal the per-face time saved by the motion-settle detection."""
+    
+    if len(settle_stats) == 0:                         # case there are no motion-settle statistics
+        return                                         # function is terminated
+    
+    saved = [stat[2] for stat in settle_stats]         # time saved per face
+    print('Motion settle (face: waited, saved secs): ' + 
+          ',  '.join(f'{face}: {waited}, {s}' for face, waited, s in settle_stats))  # feedback is printed to the terminal
+    print(f'Motion settle saved {round(sum(saved),2)} secs, on {len(saved)} faces')  # feedback is printed to the terminal
+
+
+
+
+
+
+
+def contours_prefilter(contours, hierarchy, w, h):
+    """ Batch pre-filter of the contours, to discard those out of range before the (per contour) polygon approximation.
+    Areas (shoelace formula) and bounding boxes of all the contours are computed at once, on the concatenated points.
+    Discarded contours are those having less than 4 vertices, those having a bounding box smaller than the min facelet
+    area (the approximated contour is always within the bounding box), and those having an area larger than 4 times
+    the max facelet area: The latter is a heuristic, as the approximated contour area differs from the raw one.
+    Returns a structured numpy array with index and bounding box of the surviving contours."""
+    
+    candidate_dtype = [('idx', 'i4'), ('x', 'i4'), ('y', 'i4'), ('w', 'i4'), ('h', 'i4')]
+    
+    n = len(contours)                                  # number of contours
+    if n == 0 or hierarchy is None:                    # case there are no contours
+        return np.zeros(0, dtype=candidate_dtype)      # empty structured array is returned
+    
+    min_area = int(0.08*(w*h)/4)                       # min area limit for a single facelet's contour (as in get_facelets)
+    max_area = 6*min_area                              # max area limit for a single facelet's contour (as in get_facelets)
+    
+    lengths = np.fromiter((len(c) for c in contours), dtype=np.int64, count=n)  # number of vertices per contour
+    pts = np.concatenate(contours).reshape(-1, 2).astype(np.int64)  # all the contours vertices in a single array
+    ends = np.cumsum(lengths)                          # index (excluded) of the last vertex of each contour
+    starts = ends - lengths                            # index of the first vertex of each contour
+    
+    x = pts[:, 0]                                      # x coordinates of all the vertices
+    y = pts[:, 1]                                      # y coordinates of all the vertices
+    nxt = np.arange(len(pts)) + 1                      # index of the next vertex
+    nxt[ends-1] = starts                               # the next vertex of the last one is the first of the same contour
+    cross = x*y[nxt] - x[nxt]*y                        # shoelace formula terms
+    areas = np.abs(np.add.reduceat(cross, starts))/2   # contours areas
+    
+    x_min = np.minimum.reduceat(x, starts)             # bounding box left side, per contour
+    y_min = np.minimum.reduceat(y, starts)             # bounding box top side, per contour
+    b_w = np.maximum.reduceat(x, starts) - x_min + 1   # bounding box width, per contour
+    b_h = np.maximum.reduceat(y, starts) - y_min + 1   # bounding box height, per contour
+    
+    keep = (lengths >= 4) & (b_w*b_h > min_area) & (areas < 4*max_area)  # contours potentially being a facelet
+    
+    candidates = np.zeros(int(np.count_nonzero(keep)), dtype=candidate_dtype)  # structured array for the surviving contours
+    candidates['idx'] = np.flatnonzero(keep)           # index of the surviving contours
+    candidates['x'] = x_min[keep]                      # bounding box left side of the surviving contours
+    candidates['y'] = y_min[keep]                      # bounding box top side of the surviving contours
+    candidates['w'] = b_w[keep]                        # bounding box width of the surviving contours
+    candidates['h'] = b_h[keep]                        # bounding box height of the surviving contours
+    
+    return candidates
+
+
+
+
+
+
+
 def get_approx_contours(component):
     """ Function that simplifies contours (from: https://docs.opencv.org/4.5.3/dd/d49/tutorial_py_contour_features.html).
     Argument is a contour, having at least 4 vertex (contours with less than 4 vertex were previously filtered out)
@@ -1427,20 +1981,16 @@ def order_4contours(data, new_center):
 
 
 def save_coordinates(coordinates):
-    """Saves the coordinates of the 4 facelets to a text file.
+    """Updates the facelets coordinates store with the coordinates of the 4 facelets.
         This action is done when a cubes_status is correctly determined.
         The 4 coordinates are averaged from the 6 faces."""
     
     coordinates = np.array(coordinates)                     # the coordinates list is converted to numpy array 
     avg = coordinates.mean(axis=0)                          # coordinates are averaged by 'columns'
     avg = np.round(avg, decimals=0).astype(int)             # coordinates are first rounded to 0 decimal then converted to integers
-    avg = str(list(avg))                                    # coordinates are converted from array to list to string
-    avg = avg.replace('[','').replace(']','').replace(' ','')+'\n'  # coordinates string without parentheses and empty spaces
-    fname = 'Cubotino_P_coordinates.txt'                    # fname for the text file to retrieve the coordinates
-    folder = pathlib.Path().resolve()                       # active folder (should be home/pi/cubotino_pocket/src)
-    fname = os.path.join(folder, fname)                     # folder and file name for the coordinates, to be saved
-    with open (fname, 'a') as f:                            # text file is opened to write on it in 'appending' mode
-        f.write(avg)                                        # coordinates are saved to text file
+    store = load_coordinates_store()                        # facelets coordinates store (fixed size record)
+    update_coordinates_store(store, avg.tolist())           # store is updated with the coordinates of this cycle
+    save_coordinates_store(store)                           # store is saved
 
 
 
@@ -1449,91 +1999,20 @@ def save_coordinates(coordinates):
 
 
 def load_coordinates():
-    """Loads the coordinates of the 4 facelets from a text file.
-        Checks if all the characters in file are valid, else remove lines with non valid characters."""
-    
-    lines = []                                              # empty list to store the data from the file, or to return is empty
-    historical_data = False                                 # flag to track presence of historical data is set False
-    fname = 'Cubotino_P_coordinates.txt'                    # fname for the text file to retrieve the coordinates
-    folder = pathlib.Path().resolve()                       # active folder (should be home/pi/cubotino_pocket/src) 
-    fname = os.path.join(folder, fname)                     # folder and file name for the coordinates, to be loaded
-    
-    if os.path.exists(fname):                               # case the coordinates file exists
-        with open(fname, "r") as f:                         # settings file is opened in reading mode
-            lines = f.read().splitlines()                   # all lines (without LF) are assigned as list to lines variable
-        if len(lines)>=1:                                   # case the file has at least one row of data
-            historical_data = True                          # flag to track presence or assence of historical data is set True
-    else:                                                   # case the coordinates file does not exist
-        print(f"Not found file {fname}")                    # print feedback to the terminal
-        print("This files is generated by the robot at the first successfull cycle") # print feedback to the terminal
-
-    corrupted_data = False                                  # corrupted_data is initially set False
-    if len(lines)>=1:                                       # case the file has at least one row of data
-        lines = [line.replace(' ', '') for line in lines]   # all spaces are removed
-        valid_chars = set('0123456789,')                    # set of valid charcters (includes comma)
-        for line in lines:                                  # iteration through the lines
-            for c in line:                                  # iteration through the characters in line
-                if c not in valid_chars:                    # case the character is not valid
-                    corrupted_data = True                   # corrupted_data is set True
-                    break                                   # inner for_loop s interrupted
-            if corrupted_data:                              # case corrupted_data is True
-                break                                       # outer loop_is interrupted
-       
-    if corrupted_data:                                      # case corrupted_data is True
-        if debug:                                           # case debug is set true
-            print(f"\nNot valid characters in {fname}")     # feedback is printed to the terminal
-        new_lines=[]                                        # empty list to store the cleaned lines
-        with open(fname, "w") as f:                         # settings file is opened in writing mode
-            for line in lines:                              # iteration through the lines
-                if not line.isspace():                      # case the line is not empty
-                    keep_line=True                          # keep_line variable is initially set True
-                    for c in line.strip().strip('\n'):      # iteration through the characters in line
-                        if c not in valid_chars:            # case the character is not valid
-                            keep_line=False                 # keep_line variable is set False
-                            break                           # inner for_loop is interrupted
-                    if keep_line:                           # case keep_line variable is (still) True
-                        f.write(line)                       # that line is written to text file
-                        new_lines.append(line)              # line is appended to lines
-        
-        if len(new_lines)>=1:                               # case the file has at least one row of data
-            lines = new_lines                               # new_lines is assigned to lines
-            if debug:                                       # case debug is set true
-                print(f"The file got repaired")             # feedback is printed to the terminal
-        else:                                               # case the remaining file does not have any row of data
-            lines=[]                                        # lines variable is set as an empty list
-            historical_data = False                         # historical data variable is set False
-        
-    if historical_data:                                     # case there is historical data
-        # convert from string to integers and feed a list with coordinates values as tuple
-        all_coordinates = []                                # empty list to store all the coordinates (prevoius solves cubes)
-        for line in lines:                                  # iterating on each set of coordinates (each cube)
-            coordinates=[]                                  # empty list to store the coordinated parsed from text to integers
-            for i in range(7):                              # iterating over the 4 facelets of each cube set of coordinates
-                val = int(line[: line.find(',')])           # coordinate is retrieved and converted to integer
-                line = line[line.find(',')+1:]              # line is sliced for the remaining coordinates
-                coordinates.append(val)                     # facelet coordinate is appended to the coordinates list
-            coordinates.append(int(line))                   # the last facelet is appended to the coordinates list
-            all_coordinates.append(coordinates)             # all the facelet coordinates are appended to all_coordinates list variable
-        
-        # limits the dataset to latest 5 cube readings saved (latest scans are more relevant, in case of settings changed at robot)
-        n = len(all_coordinates)                            # quantity of coordinates sets (cubes) stored
-        if n > 5:                                           # case there are more than 5 sets of coordinates (more than 5 cubes' history)
-            all_coordinates = all_coordinates[-5:]          # only the last 5 are considered
-        if n > 10:                                          # case there are more than 30 sets of coordinates (more than 5 cubes' history)
-            remove_old_data(fname)                          # call a function that removes old data from the text file
-        
-        # average the coordinates from the dataset
-        all_coordinates = np.array(all_coordinates)         # the list of lists all_coordinates is changed to a 2d numpy array
-        avg = all_coordinates.mean(axis=0)                  # coordinates are averaged by 'columns'
-        avg = np.round(avg, decimals=0).astype(int)         # coordinates are first rounded to 0 decimal then converted to integers
-        avg = avg.tolist()                                  # coordinates are assigned to a list
+    """Loads the coordinates of the 4 facelets, as the running mean of the facelets coordinates store.
+        Pending post-solve jobs are waited first, as the previous cycle might still be saving the coordinates."""
+    
+    post.flush()                                            # waits for the post-solve jobs (save_coordinates included)
+    store = load_coordinates_store()                        # facelets coordinates store (fixed size record)
+    if len(store['ewma']) == 8:                             # case there is historical data
+        avg = [int(round(c)) for c in store['ewma']]        # running mean of the coordinates, rounded to integers
         if debug:                                           # case debug is set true
             print("Loaded facelets coordinates:", avg)      # feedback is printed to the terminal
         return avg                                          # the average coordinates are returned
     
     else:                                                   # case there isn't historical data
-        if debug:                                           # case debug is set true
-            print("Not loaded facelets coordinates")        # feedback is printed to the terminal
+        print("Not found facelets coordinates")             # print feedback to the terminal
+        print("These are generated by the robot at the first successfull cycle") # print feedback to the terminal
         return []                                           # an empty list is returned 
 
 
@@ -1542,23 +2021,91 @@ def load_coordinates():
 
 
 
-
-def remove_old_data(fname):
-    """"Removes excess data from the coordinates file (it keeps the last 10 rows)."""
+def load_coordinates_store():
+    """Loads the facelets coordinates store, a json file of fixed size regardless the robot cycles:
+        'ewma' is the exponentially weighted running mean of the 8 coordinates, 'reservoir' holds the latest samples
+        used to reject the outliers, 'cycles' and 'rejected' count the samples.
+        When the store does not exist, it is built from the text file Cubotino_P_coordinates.txt of older releases."""
     
-    with open(fname, "r") as f:                             # settings file is opened in reading mode
-        lines = f.readlines()                               # all lines are assigned as list to lines variable
-        lines = lines[-5:]                                  # the last 5 lines are assigned to a local variable
-    
-    with open (fname, 'w') as f:                            # text file is opened to write on it (to empty it)
-        f.write('')                                         # an empty character is saved
+    import json                                             # json is used to load the file
+    folder = pathlib.Path().resolve()                       # active folder (should be home/pi/cubotino_pocket/src)
+    fname = os.path.join(folder, 'Cubotino_P_coordinates_store.txt')  # folder and file name for the coordinates store
+    try:                                                    # tentative
+        if os.path.exists(fname):                           # case the coordinates store exists
+            with open(fname, "r") as f:                     # file is opened in reading mode
+                store = json.load(f)                        # coordinates store is loaded
+            if len(store['ewma']) in (0, 8):                # case of valid store
+                return store                                # coordinates store is returned
+            print(f"Not valid facelets coordinates store in {fname}")  # feedback is printed to the terminal
+    except:                                                 # case an exception is raised (i.e. corrupted file)
+        print(f"Not valid facelets coordinates store in {fname}")  # feedback is printed to the terminal
+    
+    store = {'cycles': 0, 'rejected': 0, 'ewma': [], 'reservoir': []}  # empty coordinates store
+    old_fname = os.path.join(folder, 'Cubotino_P_coordinates.txt')  # text file used by older releases
+    if os.path.exists(old_fname):                           # case the text file exists
+        with open(old_fname, "r") as f:                     # text file is opened in reading mode
+            for line in f:                                  # iteration through the lines (one per solved cube)
+                vals = line.replace(' ', '').strip().split(',')  # coordinates as list of strings
+                if len(vals) == 8 and all(v.isdigit() for v in vals):  # case of valid line
+                    update_coordinates_store(store, [int(v) for v in vals])  # store is updated
+        if store['cycles'] > 0:                             # case the text file had valid data
+            print(f"One time action: Facelets coordinates store built from {store['cycles']} cycles in {old_fname}")
+            save_coordinates_store(store)                   # coordinates store is saved
+    return store
+
+
+
+
+
+
+
+def update_coordinates_store(store, coordinates, alpha=0.33, size=16, tol=8):
+    """Updates the coordinates store with the 8 coordinates (4 facelets) of a solved cube.
+        The sample is added to the reservoir of the latest size samples; The running mean is updated only when the
+        sample is within tol pixels (or 4 robust sigmas) from the reservoir median. Rejected samples still enter the
+        reservoir, so that a permanent change (i.e. camera adjusted) is followed after a few cycles.
+        alpha=0.33 weights the recent cycles about like the average of the last 5 cycles, as in older releases."""
+    
+    sample = [int(c) for c in coordinates]                  # coordinates as list of integers
+    store['reservoir'] = (store['reservoir'] + [sample])[-size:]  # sample is added to the latest samples
+    store['cycles'] += 1                                    # cycles counter is incremented
+    if len(store['ewma']) != 8:                             # case of empty store
+        store['ewma'] = [float(c) for c in sample]          # running mean starts from the sample
+        return store
+    
+    if len(store['reservoir']) >= 3:                        # case there are enough samples for the outliers rejection
+        samples = np.array(store['reservoir'])              # latest samples as array
+        med = np.median(samples, axis=0)                    # median of each coordinate
+        mad = np.median(np.abs(samples - med), axis=0)      # median absolute deviation of each coordinate
+        if np.any(np.abs(np.array(sample) - med) > np.maximum(tol, 4*1.4826*mad)):  # case the sample is an outlier
+            store['rejected'] = store.get('rejected', 0) + 1  # rejected counter is incremented
+            if debug:                                       # case debug is set true
+                print("Facelets coordinates rejected as outlier:", sample)  # feedback is printed to the terminal
+            return store
     
-    with open (fname, 'a') as f:                            # text file is opened to write on it, in appending mode
-        for line in lines:                                  # iteration over the lines variable
-            f.write(line)                                   # line is written to file
+    store['ewma'] = [round((1-alpha)*e + alpha*c, 2) for e, c in zip(store['ewma'], sample)]  # running mean update
+    return store
+
+
+
+
+
+
+
+def save_coordinates_store(store):
+    """Saves the coordinates store; The file is replaced atomically, to never leave a partially written store."""
     
-    if debug:                                               # case debug is set true
-        print(f"\nRemoved excessive data from {fname}")     # feedback is printed to the terminal
+    import json                                             # json is used to save the file
+    folder = pathlib.Path().resolve()                       # active folder (should be home/pi/cubotino_pocket/src)
+    fname = os.path.join(folder, 'Cubotino_P_coordinates_store.txt')  # folder and file name for the coordinates store
+    try:                                                    # tentative
+        with open(fname + '.tmp', "w") as f:                # temporary file is opened in writing mode
+            json.dump(store, f)                             # coordinates store is saved
+            f.flush()                                       # python buffer is flushed to the OS
+            os.fsync(f.fileno())                            # OS buffer is written to storage
+        os.replace(fname + '.tmp', fname)                   # temporary file replaces the store (atomic)
+    except:                                                 # case an exception is raised
+        print(f"Could not save the facelets coordinates store to {fname}")  # feedback is printed to the terminal
 
 
 
@@ -1566,9 +2113,12 @@ def remove_old_data(fname):
 
 
 
-def cube_colors_clusters(color, vectors, clusters):
+def cube_colors_clusters(color, vectors, clusters, warm=None):
     """ This function is used to divide the facelets' colors in 6 clusters.
         The argumnent is the mean color values (BR or HSV) for the 24 facelets detected on the cube.
+        When warm ('BGR' or 'Hue') is given, the reference colors of the last solved cube are used as initial centers:
+        Under the same led and camera gains the cube colors barely change, therefore the clustering is deterministic
+        and faster. The random centers clustering is used when the warm-started result fails the quality check.
         The funtion returns a numpy array with the 6 dominant colors. """
     
     facelets_color = np.array(color)                          # facelets BGR_mean colors changed to array
@@ -1576,7 +2126,25 @@ def cube_colors_clusters(color, vectors, clusters):
     reshaped_facelets = np.float32(reshaped_facelets)         # facelets BGR_mean colors array to float 32 bit
     criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)  # escape criteria for clustering (epsilon and max iterations)
     clusters = clusters                                       # number of clusters (obviously the 6 colors of the cube)
+    per_cluster = len(reshaped_facelets)//clusters            # facelets expected per cluster (4 on a 2x2x2 cube)
+    
+    seeds = ref_centers.get(warm, []) if warm else []         # reference colors of the last solved cube
+    if len(seeds) == clusters:                                # case reference colors are available
+        seeds = np.float32(seeds).reshape((-1,vectors))       # reference colors as array
+        dist = ((reshaped_facelets[:, None, :] - seeds[None, :, :])**2).sum(axis=2)  # squared distances facelets-references
+        label = dist.argmin(axis=1).astype(np.int32).reshape((-1,1))  # facelets are labelled by the nearest reference color
+        ret, label, ref_colors = cv2.kmeans(reshaped_facelets, clusters, label, criteria, 1, cv2.KMEANS_USE_INITIAL_LABELS)  # warm-started clustering
+        if np.all(np.bincount(label.ravel(), minlength=clusters) == per_cluster):  # quality check: 4 facelets per color
+            last_centers[warm] = ref_colors.tolist()          # clustered colors are stored, to be saved if the cube gets solved
+            if debug:                                         # case debug variable is set True
+                print(f'Colors clustering ({warm}) warm-started from the last solved cube')  # feedback is printed to the terminal
+            return label, ref_colors
+        print(f'Warm-started colors clustering ({warm}) failed the quality check, random centers are used')  # feedback is printed to the terminal
+    
+    cv2.setRNGSeed(0)                                         # random generator is seeded, for a deterministic clustering
     ret, label, ref_colors = cv2.kmeans(reshaped_facelets, clusters, None, criteria, 5, cv2.KMEANS_RANDOM_CENTERS)  # colors clustering
+    if warm and np.all(np.bincount(label.ravel(), minlength=clusters) == per_cluster):  # case of warm key and 4 facelets per color
+        last_centers[warm] = ref_colors.tolist()              # clustered colors are stored, to be saved if the cube gets solved
     return label, ref_colors
 
 
@@ -1585,6 +2153,242 @@ def cube_colors_clusters(color, vectors, clusters):
 
 
 
+def load_ref_colors():
+    """Loads the reference colors (clusters centers) of the last solved cube, from a json text file.
+        Returns a dict with 'BGR' and/or 'Hue' keys, or an empty dict."""
+    
+    import json                                             # json is used to load the file
+    fname = 'Cubotino_P_ref_colors.txt'                     # fname for the text file with the reference colors
+    folder = pathlib.Path().resolve()                       # active folder (should be home/pi/cubotino_pocket/src)
+    fname = os.path.join(folder, fname)                     # folder and file name for the reference colors
+    try:                                                    # tentative
+        if os.path.exists(fname):                           # case the reference colors file exists
+            with open(fname, "r") as f:                     # file is opened in reading mode
+                ref_colors = json.load(f)                   # reference colors are loaded
+            if debug:                                       # case debug is set true
+                print("Loaded reference colors:", ref_colors)  # feedback is printed to the terminal
+            return ref_colors                               # reference colors are returned
+    except:                                                 # case an exception is raised (i.e. corrupted file)
+        print(f"Not valid reference colors in {fname}")     # feedback is printed to the terminal
+    return {}                                               # an empty dict is returned
+
+
+
+
+
+
+
+def save_ref_colors(warm):
+    """Saves the reference colors (clusters centers) that led to a solved cube, to warm-start the next clustering.
+        The file is written only when the reference colors differ from the saved ones."""
+    
+    import json                                             # json is used to save the file
+    global ref_centers
+    if warm not in last_centers:                            # case there are no valid clustered colors for warm
+        return                                              # function is terminated
+    centers = [[int(round(v)) for v in c] for c in last_centers[warm]]  # clustered colors, rounded to integers
+    if ref_centers.get(warm) == centers:                    # case the reference colors did not change
+        return                                              # function is terminated
+    ref_centers[warm] = centers                             # reference colors are updated
+    fname = 'Cubotino_P_ref_colors.txt'                     # fname for the text file with the reference colors
+    folder = pathlib.Path().resolve()                       # active folder (should be home/pi/cubotino_pocket/src)
+    fname = os.path.join(folder, fname)                     # folder and file name for the reference colors
+    try:                                                    # tentative
+        with open(fname, "w") as f:                         # file is opened in writing mode
+            json.dump(ref_centers, f)                       # reference colors are saved
+    except:                                                 # case an exception is raised
+        print(f"Could not save the reference colors to {fname}")  # feedback is printed to the terminal
+
+
+
+
+
+
+
+def bgr2lab_array(BGR):
+    """ Converts a list of BGR colors to an array of Lab colors (L 0 to 100), in one openCV call."""
+    
+    bgr = np.float32(BGR).reshape((-1,1,3))/255               # BGR colors as float image, with values from 0 to 1
+    return cv2.cvtColor(bgr, cv2.COLOR_BGR2LAB).reshape((-1,3))  # Lab colors array
+
+
+
+
+
+
+
+def load_colors_calib():
+    """ Loads the per-robot colors calibration (Lab centroids and covariances statistics of the 6 cube colors).
+        The file name follows the settings one (get_fname_AF for AF robots); When the file does not exist, the
+        calibration is built from the colors logged in Cubotino_solver_log.txt for the solved cubes."""
+    
+    import json                                                 # json is used to load the file
+    from Cubotino_P_settings_manager import settings as settings  # settings manager Class
+    fname = settings.get_colors_calib_fname()                   # colors calibration file name, for this robot
+    try:                                                        # tentative
+        if os.path.exists(fname):                               # case the colors calibration file exists
+            with open(fname, "r") as f:                         # file is opened in reading mode
+                return json.load(f)                             # colors calibration is returned
+    except:                                                     # case an exception is raised (i.e. corrupted file)
+        print(f"Not valid colors calibration in {fname}")       # feedback is printed to the terminal
+    
+    calib = build_colors_calib()                                # colors calibration is built from the log file
+    if calib['cycles'] > 0:                                     # case the log file had data of solved cubes
+        print(f"One time action: Colors calibration built from {calib['cycles']} solved cubes in Cubotino_solver_log.txt")
+        save_colors_calib(calib)                                # colors calibration is saved
+    return calib
+
+
+
+
+
+
+
+def build_colors_calib():
+    """ Builds the colors calibration from the facelets colors logged in Cubotino_solver_log.txt, for the solved cubes."""
+    
+    import ast                                                  # ast is used to parse the logged colors
+    calib = {'cycles': 0, 'n': [0]*6, 's1': [[0.0]*3 for i in range(6)], 's2': [[[0.0]*3 for j in range(3)] for i in range(6)]}
+    folder = pathlib.Path().resolve()                           # active folder (should be home/pi/cubotino_pocket/src)
+    fname = os.path.join(folder, 'CubesDataLog', 'Cubotino_solver_log.txt')  # log file with the cube data
+    if not os.path.exists(fname):                               # case the log file does not exist
+        return calib                                            # empty calibration is returned
+    
+    with open(fname, "r") as f:                                 # log file is opened in reading mode
+        headers = f.readline().rstrip('\n').split('\t')        # columns headers
+        try:                                                    # tentative
+            e = headers.index('ColorAnalysisWinner')            # column of the color detection winner
+            p = headers.index('CubeStatus')                     # column of the cube status string
+            r = [i for i, h in enumerate(headers) if h.startswith('CubeColor')][0]  # column of the facelets colors
+        except:                                                 # case the headers are not the expected ones
+            return calib                                        # empty calibration is returned
+        
+        for line in f:                                          # iteration over the logged cubes
+            cols = line.rstrip('\n').split('\t')               # columns of the line
+            try:                                                # tentative
+                cdw, css = cols[e], cols[p]                     # color detection winner and cube status string
+                if cdw in ('BGR', 'LAB'):                       # case the logged colors are BGR, in robot detection order
+                    BGR = URFDLB_facelets_order([tuple(c) for c in ast.literal_eval(cols[r])])  # BGR in URFDLB order
+                elif cdw in ('HSV', 'HSV_02'):                  # case the logged colors are HSV, in URFDLB order
+                    hsv = np.uint8(ast.literal_eval(cols[r])).reshape((-1,1,3))  # HSV colors as image
+                    BGR = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR).reshape((-1,3)).tolist()  # BGR colors
+                else:                                           # case the cube was not solved
+                    continue                                    # next line
+                if len(BGR) == 24 and len(css) == 24:           # case of complete data
+                    update_colors_calib(calib, BGR, css)        # colors calibration is updated
+            except:                                             # case of not parsable data (i.e. older log formats)
+                pass                                            # the line is skipped
+    return calib
+
+
+
+
+
+
+
+def update_colors_calib(calib, BGR_detected, cube_status_string, max_n=400, facelets=None):
+    """ Updates the colors calibration with the 24 facelets colors (URFDLB order) of a solved cube.
+        The cube status string tells the 4 facelets of each color; The 6 colors are matched to the calibration ones
+        by the minimum overall Lab distance. Statistics are scaled down beyond max_n samples, to follow slow drifts.
+        When facelets (list of URFDLB indexes) is given, only the colors of these facelets are used."""
+    
+    from itertools import permutations                          # permutations are used to match the colors
+    lab = bgr2lab_array(BGR_detected)                           # facelets colors in Lab color space
+    letters = sorted(set(cube_status_string))                   # letters of the 6 colors
+    if len(letters) != 6:                                       # case the string does not have 6 colors
+        return calib                                            # calibration is returned unchanged
+    if facelets is None:                                        # case all the facelets are used
+        facelets = range(len(cube_status_string))               # all the facelets indexes
+    groups = [lab[[i for i in facelets if cube_status_string[i] == letter]] for letter in letters]  # Lab per color
+    means = np.array([g.mean(axis=0) for g in groups])          # Lab mean per color
+    
+    if calib['cycles'] == 0:                                    # case of empty calibration
+        match = tuple(range(6))                                 # colors are taken in the letters order
+    else:                                                       # case of existing calibration
+        centroids = np.array(calib['s1'])/np.maximum(1, np.array(calib['n']))[:, None]  # calibrated Lab centroids
+        dist = np.linalg.norm(means[:, None, :] - centroids[None, :, :], axis=2)  # distances colors-centroids
+        match = min(permutations(range(6)), key=lambda m: sum(dist[i, m[i]] for i in range(6)))  # best colors match
+    
+    for i, k in enumerate(match):                               # iteration over the colors, and the matched centroid
+        n, s1, s2 = calib['n'][k], np.array(calib['s1'][k]), np.array(calib['s2'][k])  # centroid statistics
+        if n >= max_n:                                          # case the centroid has enough samples
+            s1, s2, n = s1*0.9, s2*0.9, n*0.9                   # older samples weight less
+        g = groups[i]                                           # Lab of the 4 facelets
+        calib['n'][k] = n + len(g)                              # samples quantity is updated
+        calib['s1'][k] = (s1 + g.sum(axis=0)).tolist()          # sum of the samples is updated
+        calib['s2'][k] = (s2 + g.T @ g).tolist()                # sum of the samples outer products is updated
+    calib['cycles'] += 1                                        # calibration cycles counter is incremented
+    return calib
+
+
+
+
+
+
+
+def save_colors_calib(calib):
+    """ Saves the colors calibration to the per-robot file."""
+    
+    import json                                                 # json is used to save the file
+    from Cubotino_P_settings_manager import settings as settings  # settings manager Class
+    fname = settings.get_colors_calib_fname()                   # colors calibration file name, for this robot
+    try:                                                        # tentative
+        with open(fname, "w") as f:                             # file is opened in writing mode
+            json.dump(calib, f)                                 # colors calibration is saved
+    except:                                                     # case an exception is raised
+        print(f"Could not save the colors calibration to {fname}")  # feedback is printed to the terminal
+
+
+
+
+
+
+
+def cube_colors_interpr_LAB(BGR_detected, min_cycles=3, d2_max=30, facelets=None):
+    """ Classifies the 24 facelets colors (URFDLB order) by the Mahalanobis distance from the calibrated Lab centroids.
+        Facelets are assigned by increasing distance, with 4 facelets per color; The result is discarded when
+        the calibration has less than min_cycles solved cubes, or when a facelet is too far (d2_max) from its centroid.
+        When facelets (list of URFDLB indexes) is given, only these facelets are classified.
+        Returns the cube status and the reference BGR colors, or an empty dict and list."""
+    
+    if colors_calib.get('cycles', 0) < min_cycles:              # case the calibration is not yet reliable
+        return {}, []                                           # empty cube status and reference colors are returned
+    
+    n = np.maximum(1, np.array(colors_calib['n'], dtype=np.float64))  # samples per color
+    centroids = np.array(colors_calib['s1'])/n[:, None]         # Lab centroids
+    covs = np.array(colors_calib['s2'])/n[:, None, None] - centroids[:, :, None]*centroids[:, None, :]  # Lab covariances
+    inv_covs = np.linalg.inv(covs + 2.0*np.eye(3))              # inverse of the (regularized) covariances
+    
+    if facelets is None:                                        # case all the facelets are classified
+        facelets = list(range(len(BGR_detected)))               # all the facelets indexes
+    lab = bgr2lab_array([BGR_detected[i] for i in facelets])    # facelets colors in Lab color space
+    delta = lab[:, None, :] - centroids[None, :, :]             # differences facelets-centroids (24, 6, 3)
+    d2 = np.einsum('fki,kij,fkj->fk', delta, inv_covs, delta)   # squared Mahalanobis distances (24, 6)
+    
+    quota = [4]*6                                               # facelets left per color
+    cube_status = {}                                            # dict to store the cube status
+    for f in np.argsort(d2.min(axis=1)):                        # facelets ordered by increasing distance from a centroid
+        for k in np.argsort(d2[f]):                             # colors ordered by increasing distance
+            if quota[k] > 0:                                    # case the color has facelets left
+                break                                           # for loop is interrupted
+        if d2[f, k] > d2_max:                                   # case the facelet is too far from the assigned color
+            if debug:                                           # case debug variable is set True
+                print(f"Calibrated colors classifier not confident on facelet {f}")  # feedback is printed to the terminal
+            return {}, []                                       # empty cube status and reference colors are returned
+        quota[k] -= 1                                           # facelets left for the color
+        cube_status[facelets[f]] = 'c' + str(k)                 # color is assigned to the facelet
+    
+    cube_status = dict(sorted(cube_status.items()))             # cube status ordered by facelet number
+    lab_img = np.float32(centroids).reshape((-1,1,3))           # centroids as Lab image
+    ref_colors_BGR = (255*cv2.cvtColor(lab_img, cv2.COLOR_LAB2BGR).reshape((-1,3))).round().astype(int).tolist()  # BGR centroids
+    return cube_status, ref_colors_BGR
+
+
+
+
+
+
+
 def cube_colors_interpr_BGR(BGR_detected, ref_colors_BGR):
     """ This function is used to define the cube status.
     The basic principle is to associate facelets to the reference color having the minimum color distance.
@@ -1702,11 +2506,12 @@ def cube_colors_interpr_HSV(HSV_detected):
     There is no interpretation of the colors from the Hue values, just clustering.
     This function returns the interpreted facelet colors, on the URFDLB order.""" 
     
-    print()                                                 # print an empty line
-    print('#'*65)                                           # print a separation line
-    print('Called the function to get the cube status vis HSV color analysis') # feedback is printed to the terminal
-    print('#'*65)                                           # print a separation line
-    print()                                                 # print an empty line
+    if debug:                                               # case debug variable is set True (all the interpreters run on each cycle)
+        print()                                             # print an empty line
+        print('#'*65)                                       # print a separation line
+        print('Called the function to get the cube status vis HSV color analysis') # feedback is printed to the terminal
+        print('#'*65)                                       # print a separation line
+        print()                                             # print an empty line
 
     if debug:                                               # case debug variable is set True
         print("\nHSV_detected:", HSV_detected)              # feedbacl is printed to the terminal
@@ -1727,7 +2532,7 @@ def cube_colors_interpr_HSV(HSV_detected):
 
     # Step2: get the Hue of the 6 dominant colors, out of the detected 24 facelets
     Hue_detected = list(Hue.values())                       # list the Hue of the detected 24 facelets
-    label, Hue_ref = cube_colors_clusters(Hue_detected, vectors=1, clusters=clusters)  # 6 reference Hue colors, out of the 24 colored facelets
+    label, Hue_ref = cube_colors_clusters(Hue_detected, vectors=1, clusters=clusters, warm='Hue')  # 6 reference Hue colors, out of the 24 colored facelets
     Hue_reference = [x[0] for x in np.uint8(Hue_ref).tolist()]  # Hue_ref is converted to int to list and assigned to Hue_reference 
     if debug:                                               # case debug variable is set True
         print("\nHue colors:", Hue)                         # feedback is printed to the terminal
@@ -1850,11 +2655,12 @@ def cube_colors_interpr_HSV_02(HSV_detected):
     There is no interpretation of the colors from the Hue values, just clustering.
     This function returns the interpreted facelet colors, on the URFDLB order.""" 
     
-    print()                                                 # print an empty line
-    print('#'*54)                                           # print a separation line
-    print('Called the alternative function for HSV color analysis') # feedback is printed to the terminal
-    print('#'*54)                                           # print a separation line
-    print()                                                 # print an empty line
+    if debug:                                               # case debug variable is set True (all the interpreters run on each cycle)
+        print()                                             # print an empty line
+        print('#'*54)                                       # print a separation line
+        print('Called the alternative function for HSV color analysis') # feedback is printed to the terminal
+        print('#'*54)                                       # print a separation line
+        print()                                             # print an empty line
 
     if debug:                                               # case debug variable is set True
         print("\nHSV_detected:", HSV_detected)              # feedbacl is printed to the terminal
@@ -1994,6 +2800,205 @@ def cube_colors_interpr_HSV_02(HSV_detected):
 
 
 
+def cube_status_check(cube_status_string):
+    """ Fast check of the cube status string, without searching for a solution.
+        The string must have 4 facelets per color, and the corners (cubie level) must define a reachable cube state.
+        Returns True when the cube status is valid."""
+    
+    if len(cube_status_string) != 24:                          # case the cube status string has not 24 facelets
+        return False                                            # False is returned
+    if any(cube_status_string.count(c) != 4 for c in 'URFDLB'): # case a color does not appear 4 times
+        return False                                            # False is returned
+    if FaceCube is None:                                        # case the solver library could not be imported
+        return True                                             # the colors count check is the only possible one
+    return FaceCube().from_string(cube_status_string) is True   # True when the corners verify as a valid cube
+
+
+
+
+
+
+
+def cube_status_margin(cube_status, lab):
+    """ Returns the assignment margin of a cube status, on the Lab facelets colors (URFDLB order).
+        Per each facelet, the margin is the distance to the nearest other color centroid, minus the distance to the
+        centroid of its assigned color; Centroids are the mean of the 4 facelets assigned to each color.
+        Returned values are the minimum margin (the weakest facelet) and the mean margin."""
+    
+    labels = np.array([int(cube_status[f][1]) for f in range(24)])  # assigned color index per facelet
+    centroids = np.array([lab[labels == k].mean(axis=0) for k in range(6)])  # Lab centroid per color
+    dist = np.linalg.norm(lab[:, None, :] - centroids[None, :, :], axis=2)  # distances facelets-centroids (24, 6)
+    rows = np.arange(24)                                        # facelets indexes
+    own = dist[rows, labels].copy()                             # distance to the assigned color centroid
+    dist[rows, labels] = np.inf                                 # assigned color is excluded
+    margin = dist.min(axis=1) - own                             # margin per facelet
+    return float(margin.min()), float(margin.mean())
+
+
+
+
+
+
+
+def cube_colors_interpr_all(BGR_detected, HSV_detected):
+    """ Runs all the color interpreters (LAB, BGR, HSV, HSV_02) on the same 24 facelets colors (URFDLB order).
+        Cube statuses passing the fast validity check (cube_status_check) are scored by their assignment margin,
+        measured on the same Lab colors for all the interpreters.
+        Cube statuses differing only by the colors labelling (canonical_string) are the same candidate, voted by
+        all the interpreters returning it.
+        Returns the list of candidates (dicts), the valid ones first and ordered by decreasing margin."""
+    
+    def interpr_BGR():
+        label, ref_colors_BGR = cube_colors_clusters(BGR_detected, vectors=3, clusters=6, warm='BGR')  # six reference BGR colors
+        ref_colors_BGR = np.uint8(ref_colors_BGR).tolist()      # clustered colors convertered to 8bit and assigned to a list
+        return cube_colors_interpr_BGR(BGR_detected, ref_colors_BGR), ref_colors_BGR  # cube status and reference colors
+    
+    interpreters = (('LAB', lambda: cube_colors_interpr_LAB(BGR_detected)),   # calibrated colors classifier
+                    ('BGR', interpr_BGR),                                     # BGR clustering and color distance
+                    ('HSV', lambda: cube_colors_interpr_HSV(HSV_detected)),   # Hue clustering
+                    ('HSV_02', lambda: cube_colors_interpr_HSV_02(HSV_detected)))  # white by V-S, then Hue clustering
+    
+    lab = bgr2lab_array(BGR_detected)                           # facelets colors in Lab color space, for the scoring
+    candidates, checked = [], {}                                # candidates list, and dict of the checked cube status strings
+    for name, interpreter in interpreters:                      # iteration over the color interpreters
+        try:                                                    # tentative
+            cube_status, ref_colors_BGR = interpreter()         # cube status via the interpreter
+        except:                                                 # case an exception is raised
+            cube_status, ref_colors_BGR = {}, []                # empty cube status and reference colors
+        css = cube_string(cube_status) if len(cube_status) == 24 else ''  # cube status string
+        key = canonical_string(css)                             # cube status string, independent from the colors labelling
+        if key in checked:                                      # case another interpreter already returned this cube status
+            checked[key]['votes'] += 1                          # agreement counter is incremented
+            continue                                            # next interpreter
+        cand = {'name': name, 'cube_status': cube_status, 'ref_colors_BGR': ref_colors_BGR,
+                'css': css, 'valid': cube_status_check(css), 'margin': None, 'votes': 1}  # candidate dict
+        if cand['valid']:                                       # case the cube status is valid
+            cand['margin'] = cube_status_margin(cube_status, lab)  # assignment margin (min, mean)
+        if css != '':                                           # case of a cube status string
+            checked[key] = cand                                 # cube status string is tracked
+        candidates.append(cand)                                 # candidate is appended to the list
+    
+    # valid candidates first, ordered by the margin; Invalid ones having reference colors are kept for the sketch
+    candidates.sort(key=lambda c: (c['valid'], len(c['ref_colors_BGR']) > 0, c['margin'] or (0, 0)), reverse=True)
+    
+    s = ''                                                      # string with the candidates summary
+    for c in candidates:                                        # iteration over the candidates
+        if c['valid']:                                          # case of a valid candidate
+            s += f"{c['name']} {c['margin'][0]:.1f}/{c['margin'][1]:.1f} (x{c['votes']})   "  # margins and agreement
+        else:                                                   # case of an invalid candidate
+            s += f"{c['name']} invalid   "                      # invalid candidate
+    print(f'\nColor interpreters (min/mean margin): {s}')       # feedback is printed to the terminal
+    return candidates
+
+
+
+
+
+
+
+def last_face_deduction(BGR_detected, missing=(16, 17, 18, 19)):
+    """ Deduces the colors of the last face (not scanned), from the 20 facelets colors of the other 5 faces.
+        BGR_detected has the 24 facelets colors (URFDLB order), where the missing facelets (L face) are not valid.
+        The 20 scanned facelets are classified via the calibrated colors (cube_colors_interpr_LAB); The missing
+        facelets must then bring each color to 4 facelets, and the corners must verify as a valid cube: All the
+        consistent completions are enumerated.
+        Returns the deduction outcome ('unique', 'ambiguous', 'inconsistent' or 'unclassified'), the list of the
+        consistent completions (cube status dicts) and the reference BGR colors."""
+    
+    from itertools import permutations                          # permutations are used to enumerate the completions
+    known = [i for i in range(24) if i not in missing]          # scanned facelets indexes
+    cube_status, ref_colors_BGR = cube_colors_interpr_LAB(BGR_detected, facelets=known)  # scanned facelets colors
+    if len(cube_status) != len(known) or FaceCube is None:      # case the scanned facelets are not classified
+        return 'unclassified', [], ref_colors_BGR               # last face cannot be deduced
+    
+    colors = list(cube_status.values())                         # colors of the scanned facelets
+    left = []                                                   # colors left for the missing facelets
+    for k in range(6):                                          # iteration over the colors
+        left += ['c' + str(k)] * (4 - colors.count('c' + str(k)))  # each color is completed to 4 facelets
+    
+    completions = []                                            # list of the consistent completions
+    for perm in sorted(set(permutations(left))):                # iteration over the distinct colors arrangements
+        status = dict(cube_status)                              # scanned facelets colors
+        status.update(zip(missing, perm))                       # missing facelets colors
+        status = dict(sorted(status.items()))                   # cube status ordered by facelet number
+        if cube_status_check(cube_string(status)):              # case the completed cube status is valid
+            completions.append(status)                          # completion is appended to the list
+    
+    if debug:                                                   # case debug variable is set True
+        print(f"Last face completions: {len(completions)}")     # feedback is printed to the terminal
+    if len(completions) == 1:                                   # case of a single consistent completion
+        return 'unique', completions, ref_colors_BGR            # last face can be deduced
+    elif len(completions) > 1:                                  # case of multiple consistent completions
+        return 'ambiguous', completions, ref_colors_BGR         # last face has to be scanned
+    else:                                                       # case of no consistent completions
+        return 'inconsistent', completions, ref_colors_BGR      # last face has to be scanned (scanned colors are wrong)
+
+
+
+
+
+
+
+def speculative_solutions(completions, max_completions=6):
+    """ Solves, and plans the robot moves of, the candidate completions of the cube status.
+        This function runs in a worker thread, while the robot shows the last face to the camera and scans it.
+        The solver is pure python, therefore it competes for the GIL with the last face detection: The wall time
+        and the cpu time of the worker are returned, to be compared with the last face detection time.
+        Returns a dict with the canonical cube status string (canonical_string) as key, and the cube_solution()
+        returned tuple as value, the wall secs and the cpu secs of the worker."""
+    
+    t_ref, cpu_ref = time.time(), time.thread_time()            # time references (wall and worker thread cpu)
+    results = {}                                                # dict to store the solutions
+    for status in completions[:max_completions]:                # iteration over the candidate completions
+        css = cube_string(status)                               # cube status string
+        try:                                                    # tentative
+            results[canonical_string(css)] = cube_solution(css, feedback=False)  # solution and robot moves, without display feedback
+        except Exception as e:                                  # case an exception is raised
+            print(f'Exception at the speculative solve: {e}')   # feedback is printed to the terminal
+    return results, time.time() - t_ref, time.thread_time() - cpu_ref
+
+
+
+
+
+
+
+def canonical_string(cube_status_string):
+    """ Returns the cube status string with the colors relabeled by their first appearance (URFDLB facelets order).
+        Each color interpreter labels the 6 colors in its own order, while the solver detects the colors scheme by
+        itself: Strings of the same physical cube have the same canonical string, and the same solutions."""
+    
+    relabel = {}                                                # dict to store the new letter per original letter
+    for c in cube_status_string:                                # iteration over the facelets letters
+        if c not in relabel:                                    # case of a letter not yet relabeled
+            relabel[c] = 'URFDLB'[len(relabel)]                 # letters are assigned in URFDLB order
+    return ''.join(relabel[c] for c in cube_status_string)      # relabeled cube status string
+
+
+
+
+
+
+
+def last_face_image(face, cube_status, ref_colors_BGR, missing=(16, 17, 18, 19)):
+    """ Returns an image, shaped as face, with the deduced colors of the last face (not scanned).
+        This image replaces the face image of the last face, on the pictures collage."""
+    
+    img = np.zeros_like(face)                                   # black image having the face image dimensions
+    fh, fw = face.shape[:2]                                     # face image height and width
+    d = max(2, fh//30)                                          # gap between the facelets
+    for i, f in enumerate(missing):                             # iteration over the missing facelets
+        r, c = divmod(i, 2)                                     # row and column of the facelet
+        color = ref_colors_BGR[int(cube_status[f][1])]          # deduced color
+        img[r*fh//2+d:(r+1)*fh//2-d, c*fw//2+d:(c+1)*fw//2-d] = color  # facelet is drawn
+    return img
+
+
+
+
+
+
+
 def improve_hue_clustering(label, clusters, Hue, Hue_detected):
     """Function to alter the hue values to have clusters of equal size.
         The biggest issue is the Hue (range 0-179) overflowing, tipically with the red."""
@@ -2368,14 +3373,16 @@ def scrambling_cube():
 
 
 
-def cube_solution(cube_string, scrambling=False):
+def cube_solution(cube_string, scrambling=False, feedback=True):
     """ Calls the Hegbert Kociemba solver, and returns the solution's moves
     from: https://github.com/hkociemba/Rubiks2x2x2-OptimalSolver 
     The solver returns the optimal solution.
     More solutions could be returned, having the same quantity of cube movements; In this case
-    it is chosen the faster solution for the robot."""
+    it is chosen the faster solution for the robot.
+    feedback is set False when called by the speculative solve worker, that must not use the display."""
     
-    disp.show_on_display('SOLUTION', 'SEARCH', fs1=21, fs2=27)   # feedback is plot to display
+    if feedback:                                # case the display feedback is requested
+        disp.show_on_display('SOLUTION', 'SEARCH', fs1=21, fs2=27)   # feedback is plot to display
     
     solution_Text = ''                          # empty string variable to store the eventual erro messages from Kociemba solver
     robot_moves = ''                            # empty string variable to store the ronbot moves
@@ -2440,7 +3447,8 @@ def cube_solution(cube_string, scrambling=False):
                         print("Applied DBL faces rotation")    # feedback is printed to Terminal
                 solution_Text = ''              # an empty text is assigned to solution_Text variable
                 # string with robot movements, for 'i' solution
-                _, robot_moves, total_moves, _ = rm.robot_required_moves(sol, solution_Text, simulation=False, informative=debug)
+                _, robot_moves, total_moves, _ = rm.robot_required_moves(sol, solution_Text, simulation=False, informative=debug,
+                                                                         skipped_flips=0 if scrambling else skipped_flips)
                 estimate_time[i] = servo.estimate_time(robot_moves, timer, slow_time_s)   # estimated time for the robot moves in argument
                 robot_moves_strings[i] = robot_moves   # robot movements for the fastest solution
                 tot_robot_moves[i] = total_moves   # total quantity of robot movements for the robot moves in argument
@@ -2475,7 +3483,8 @@ def cube_solution(cube_string, scrambling=False):
         
         if solution_Text != 'Error':            # case the solver does not returns errors
             # string with robot movements, and total movements
-            _, robot_moves, total_robot_moves, _ = rm.robot_required_moves(s, solution_Text, simulation=False, informative=debug)
+            _, robot_moves, total_robot_moves, _ = rm.robot_required_moves(s, solution_Text, simulation=False, informative=debug,
+                                                                           skipped_flips=0 if scrambling else skipped_flips)
             est_time = servo.estimate_time(robot_moves, timer, slow_time_s)  # estimation servos time for the single solution
                 
     if debug and solution_Text != 'Error':      # case debug variable is set True
@@ -2522,16 +3531,9 @@ def decoration(deco_info):
     status=cv2.imwrite(fname, collage)                   # cube sketch with detected and interpred colors is saved as image
     
     if screen and not robot_stop:                        # case screen variable is set True
-        cv2.namedWindow('cube_collage')                  # create the collage window
-        for i in range(5):                               # iteration
-            cv2.moveWindow('cube_collage', 0,0)          # move the collage window to (0,0)
-            cv2.imshow('cube_collage', collage)          # collage (starting cube status) is shown
-            cv2.waitKey(100)                             # showtime of 100ms per iteration
-        cv2.waitKey(int(show_time*1000))                 # showtime in secs is trasformed to milliseconds 
-        try:
-            cv2.destroyWindow('cube_collage')            # cube_collage window is closed after the show_time
-        except:
-            pass
+        win.window('cube_collage', (0,0))                # create the collage window, and move it to (0,0)
+        win.show('cube_collage', collage)                # collage (starting cube status) is shown
+        win.destroy_after('cube_collage', show_time)     # cube_collage window is closed after the show_time (the worker is not held)
 
 
 
@@ -2810,6 +3812,46 @@ def cube_facelets_colors(frame, facelets, candidates, BGR_mean, HSV_mean):
 
 
 
+def facelets_colors_consensus(facelets, BGR_mean, HSV_mean, n_max=4, var_max=2.0):
+    """ Refines the colors of the 4 facelets just read (the last 4 entries of BGR_mean and HSV_mean), by sampling the
+    same facelets areas on the following frames: The cube does not move until the next face is requested.
+    Per facelet and BGR channel, the running mean and variance are updated (Welford's method); Sampling stops as soon
+    as the variance of the mean is below var_max for all the facelets, or after n_max frames (the first included).
+    Frames not returned by the camera (None) are skipped, up to n_max times.
+    The consensus colors replace the last 4 entries of BGR_mean and HSV_mean; The frames quantity is stored on consensus_stats."""
+    
+    mean = np.array(BGR_mean[-4:], dtype=np.float64)            # colors from the frame where the face was detected
+    m2 = np.zeros_like(mean)                                    # sum of the squared differences from the mean
+    n = 1                                                       # quantity of frames sampled so far
+    missed = 0                                                  # quantity of frames not returned by the camera
+    while n < n_max and missed < n_max and not robot_stop:      # case more frames can be sampled
+        frame, w, h = read_camera()                             # camera frame (cropped, warped and resized as at detection)
+        if frame is None:                                       # case the camera did not return a frame
+            missed += 1                                         # missed frames counter is incremented
+            continue                                            # next frame
+        sample = np.zeros_like(mean)                            # colors of the facelets on this frame
+        for i, facelet in enumerate(facelets):                  # iteration over the 4 facelets
+            sample[i] = average_color(frame, facelet['cx'], facelet['cy'], edge)  # color is averaged as at detection
+        n += 1                                                  # frames counter is incremented
+        delta = sample - mean                                   # difference from the running mean
+        mean += delta/n                                         # running mean is updated
+        m2 += delta*(sample - mean)                             # sum of the squared differences is updated
+        if (m2/(n-1)/n).max() < var_max:                        # case the variance of the mean is small enough
+            break                                               # while loop is interrupted
+    
+    consensus_stats.append((sides[side], n))                    # frames used for the face colors
+    for i in range(4):                                          # iteration over the 4 facelets
+        b, g, r = (int(v) for v in mean[i])                     # consensus BGR color
+        BGR_mean[i-4] = (b, g, r)                               # consensus color replaces the single frame one
+        hsv = cv2.cvtColor(np.array([[[b,g,r]]], dtype=np.uint8), cv2.COLOR_BGR2HSV)  # HSV color space equilavent values
+        HSV_mean[i-4] = list(hsv[0][0])                         # the HSV value is stored on a list
+
+
+
+
+
+
+
 def face_image(frame, facelets, side, faces):
     """ Slice a frame rectangular portion to temporary store the cube face image.
     The cube face image is initialy cropped from the frame.
@@ -2901,6 +3943,63 @@ def face_image(frame, facelets, side, faces):
 
 
 
+def motion_start(func, *args, **kwargs):
+    """ Robot movements func(*args, **kwargs) are started on the motion worker, when the --pipeline argument is used,
+        so that the main thread keeps working while the servos move; Otherwise the movements are done right away.
+        Returns the handle to be passed to motion_wait."""
+    
+    if motion_pool is not None:                         # case the motion worker exists (--pipeline argument)
+        return motion_pool.submit(motion_task, time.time(), func, *args, **kwargs)  # movements are queued to the motion worker
+    return motion_task(time.time(), func, *args, **kwargs)  # movements are done right away
+
+
+
+
+def motion_task(t_start, func, *args, **kwargs):
+    """ Runs the robot movements func(*args, **kwargs), requested at t_start; Returns their start time, end time and result."""
+    
+    if virtual:                                         # case of the virtual hardware (--virtual argument)
+        vh.clock.task(t_start)                          # the motion worker sleeps on its own virtual clock
+    result = func(*args, **kwargs)                      # robot movements
+    return t_start, time.time(), result                 # start time, end time and result of the movements
+
+
+
+
+def motion_wait(handle, phase):
+    """ Waits for the robot movements started by motion_start, and returns their result.
+        The movements time, and the part of it used by the main thread for other work, are stored per phase."""
+    
+    t_wait = time.time()                                # time the main thread starts waiting for the movements
+    pipelined = hasattr(handle, 'result')               # case the movements run on the motion worker
+    t_start, t_end, result = handle.result() if pipelined else handle  # movements outcome
+    if virtual:                                         # case of the virtual hardware (--virtual argument)
+        vh.clock.wait_until(t_end)                      # main thread clock is aligned to the movements end
+    overlap = max(0, min(t_end, t_wait) - t_start) if pipelined else 0  # secs of work done while the servos moved
+    overlap_stats.append((phase, round(t_end - t_start, 2), round(overlap, 2)))  # phase, movements secs, overlapped secs
+    return result
+
+
+
+
+def overlap_report():
+    """ Prints to the terminal the per-phase movements time, and the part of it filled by other work (saved time)."""
+    
+    if len(overlap_stats) == 0:                         # case there are no movements statistics
+        return                                          # function is terminated
+    
+    saved = sum(stat[2] for stat in overlap_stats)      # time saved by the overlaps
+    moving = sum(stat[1] for stat in overlap_stats)     # time spent by the movements
+    print('Robot movements (phase: moving, overlapped secs): ' + 
+          ',  '.join(f'{phase}: {secs}, {o}' for phase, secs, o in overlap_stats))  # feedback is printed to the terminal
+    print(f'Overlaps saved {round(saved,2)} secs, over {round(moving,1)} secs of robot movements')  # feedback is printed to the terminal
+
+
+
+
+
+
+
 def robot_to_cube_side(side, cam_led_bright):
     """ Cube movements at robot, during the cube reading phase, to get access to all the faces.
     Cube is flipped 4 times to read the first 4 faces, then some spins and flippings are required to read the
@@ -2920,8 +4019,10 @@ def robot_to_cube_side(side, cam_led_bright):
     elif side in (1,2,3):                        # first 4 sides (3 sides apart the one already in front of the camera)
         servo.cam_led_Off()                      # led on top_cover is switched off, for power management
         if not robot_stop and not silent:        # case there are not request to stop the robot nor to silent the servos
-            servo.flip()                         # are reached by simply flipping the cube
+            fixed_wait = servo.flip(wait=not settle_detect)  # are reached by simply flipping the cube
             servo.cam_led_On(cam_led_bright)     # led on top_cover is switched on 
+            if fixed_wait > 0:                   # case the flip did not wait for the top cover to reach the read position
+                motion_settle(fixed_wait)        # waits for the motion to settle
     
     elif side == 4 :                             # at side 4 is needed to change approach to show side 5 to the camera
         servo.cam_led_Off()                      # led on top_cover is switched off, for power managements
@@ -2940,11 +4041,14 @@ def robot_to_cube_side(side, cam_led_bright):
             
     elif side == 5 :                             # when side5 is in front of the camera
         servo.cam_led_Off()                      # led on top_cover is switched off, for power management
+        fixed_wait = 0                           # skipped waiting time after the last flip
         for i in range(2):                       # at side 5 are needed two flips to show side 6 to the camera
             if not robot_stop and not silent:    # case there are not request to stop the robot nor to silentthe servos
-                servo.flip()                     # cube flipping
+                fixed_wait = servo.flip(wait=(i == 0 or not settle_detect))  # cube flipping
         if not robot_stop:                       # case there are not request to stop the robot
             servo.cam_led_On(cam_led_bright)     # led on top_cover is switched on
+            if fixed_wait > 0:                   # case the last flip did not wait for the top cover to reach the read position
+                motion_settle(fixed_wait)        # waits for the motion to settle
   
     elif side == 6 :                             # case side equal 6 (it is when the cube has been fully scanned)
         if not robot_stop and not silent:        # case there are not request to stop the robot nor to silent the servos
@@ -3055,41 +4159,45 @@ def robot_solve_cube(ffixWindPos, screen, frame, faces, ref_colors_BGR, cube_sta
     2) data log to a text files,
     3) and others."""
     
-    global robot_stop
+    global robot_stop, solved_time
 
     if solution_Text != 'Error':                # case the solver has returned an error
         print('Total robot movements: ', total_robot_moves)  # nice information to print at terminal, sometime useful to copy
     
     # cdw = color detection winner
-    if cdw == 'BGR':                            # case the cube status has been positively detected by the BGR color distance method
+    if cdw in ('BGR', 'LAB', 'LAB5'):           # case the cube status has been positively detected by the BGR or Lab color distance method
         facelets_data=BGR_mean                  # data to be later logged in a text file         
-    elif cdw == 'HSV':                          # case the cube status has been positively detected by the HSV color analysis
+    elif cdw in ('HSV', 'HSV_02'):              # case the cube status has been positively detected by the HSV color analysis
         facelets_data=URFDLB_facelets_HSV_mean  # data to be later logged in a text file
     else:                                       # case the solver has returned an error
         facelets_data=BGR_mean, URFDLB_facelets_HSV_mean    # data to be later logged in a text file includes BGR and HSV
     
     if screen:                                  # case screen variable is set True
-        try:                                    # tentative approach
-            cv2.destroyWindow('cube')           # cube windows is closed
-        except:                                 # case an exception is raised
-            pass                                # do nothing
+        win.destroy('cube')                     # cube windows is closed
      
     if not robot_stop:             # case there are no request to stop the robot
+        faces_copy = {k: v.copy() for k, v in faces.items()}  # compact copies of the faces images (slices would keep the frames alive)
+        deco_info = (fixWindPos, screen, None, faces_copy, ref_colors_BGR, cube_status, \
+                     cube_status_string, URFDLB_facelets_BGR_mean, \
+                     cdw, show_time, timestamp) # tuple of variables needed for the decoration function (the frame is not used)
+        
+        # cals the decoration function, that shows (or just saves, is screen=False) cube's faces pictures, on the post-solve worker
+        post.submit(decoration, deco_info)  # collage is made (and saved) while the robot solves the cube
+        
         # movements to the robot are finally applied
-        solved, tot_robot_time, robot_solving_time = robot_move_cube(robot_moves, total_robot_moves, solution_Text, start_time, cdw=cdw)
+        motion = motion_start(robot_move_cube, robot_moves, total_robot_moves, solution_Text, start_time, cdw=cdw)
+        solved, tot_robot_time, robot_solving_time = motion_wait(motion, 'solve')  # waits for the robot solving the cube
+        solved_time = time.time()  # time reference for the ready-for-next-cube latency
         
         if solution_Text != 'Error' and len(robot_moves) > 0 and not robot_stop:  # case the solver has not returned an error and no stop requests
             animation(screen, ref_colors_BGR, cube_status_string, robot_moves)  # plot on screen the facelets animation 
         
-        # some relevant info are logged into a text file
-        log_data(timestamp, facelets_data, cube_status_string, solution, cdw,
-                 tot_robot_time, start_time, camera_ready_time, cube_detect_time, cube_solution_time,
-                 robot_solving_time, slow_time_s, os_version, fcs)
+        # some relevant info are logged into a text file, by the post-solve worker
+        post.submit(log_data, timestamp, facelets_data, cube_status_string, solution, cdw,
+                    tot_robot_time, start_time, camera_ready_time, cube_detect_time, cube_solution_time,
+                    robot_solving_time, slow_time_s, os_version, fcs)
         
-        deco_info = (fixWindPos, screen, frame, faces, ref_colors_BGR, cube_status, \
-                     cube_status_string, URFDLB_facelets_BGR_mean, \
-                     cdw, show_time, timestamp) # tuple of variables needed for the decoration function
-        decoration(deco_info)      # cals the decoration function, that shows (or just saves, is screen=False) cube's faces pictures  
+        overlap_report()           # robot movements time, and the part of it filled by other work, are printed to the terminal
         
     else:                          # case there is a request to stop the robot
         tot_time_sec = 0           # robot solution time is forced to zero when the solving is interrupted by the stop button
@@ -3118,7 +4226,7 @@ def robot_timeout_func():
         servo.servo_start_pos(start_pos='read')  # top cover and cube lifter to start position
 
     if screen:                  # case screen variable is set True
-        cv2.destroyAllWindows() # all the windows are closed
+        win.destroy()           # all the windows are closed
     
     timeout=True                # boolean variable (also global) used to manage the timeout case
     return timeout              # timeout is returned
@@ -3252,7 +4360,10 @@ def log_data(timestamp, facelets_data, cube_status_string, solution, cdw, \
              tot_robot_time, start_time, camera_ready_time, cube_detect_time, cube_solution_time,\
              robot_solving_time, slow_time_s, os_version, fcs):
     
-    """ Main cube info are logged in a text file, to generate a database of usefull info for debug of just for fun."""
+    """ Main cube info are logged in a text file, to generate a database of usefull info for debug of just for fun.
+        As per the data_log setting, the info are logged to the text file, to the binary log, or to both."""
+    
+    global log_headers_checked
     
     folder = pathlib.Path().resolve()                   # active folder (should be home/pi/cubotino_pocket)  
     folder = os.path.join(folder,'CubesDataLog')        # folder to store the relevant cube data
@@ -3260,7 +4371,8 @@ def log_data(timestamp, facelets_data, cube_status_string, solution, cdw, \
         os.makedirs(folder)                             # folder is made if it doesn't exist
     
     fname = folder+'/Cubotino_solver_log.txt'           # folder+filename for the cube data
-    if not os.path.exists(fname):                       # if case the file does not exist, file with headers is generated
+    text_log = data_log != 'binary'                     # flag for the text log (data_log setting)
+    if text_log and not os.path.exists(fname):          # if case the file does not exist, file with headers is generated
         if debug:                                       # case debug variable is set True
             print('\nGenerated Cubotino_solver_log.txt file with headers') # feedback is printed to the terminal
         
@@ -3303,8 +4415,9 @@ def log_data(timestamp, facelets_data, cube_status_string, solution, cdw, \
             f.write(s)               # data is appended
 
   
-    else:                                               # case the file does exist
+    elif text_log and not log_headers_checked:          # case the file does exist, and its headers were not checked yet
         check_headers(folder, fname)                    # checks if necessary to add new headers to the log file
+        log_headers_checked = True                      # headers are checked once per session
 
     # cdw = color detection winner
     if cdw != 'Error':                                  # case the cube_detection_winner does not equal 'Error'
@@ -3347,12 +4460,24 @@ def log_data(timestamp, facelets_data, cube_status_string, solution, cdw, \
         else:                                           # case the iteration has reached the last tuple element
             s += '\n'                                   # end of line character is added to the string variable s
 
-    # 'a' means: file will be generated if it does not exist, and data will be appended at the end
-    with open(fname,'a') as f:   # text file is temporary opened
-        f.write(s)               # data is appended
-        
-        if debug:                # case debug variable is set True
-            print('\nData is saved in Cubotino_solver_log.txt') # feedback is printed to the terminal
+    if data_log != 'text':       # case the binary log is used (data_log setting)
+        try:                     # tentative
+            datalog.append(dict(zip(text_headers, log_data)), fname[:-4]+'.bin')  # record appended to the binary log
+        except Exception as e:   # case of exceptions (i.e. ValueError for a value not fitting the record)
+            print(f'\nAttention: Data not appended to Cubotino_solver_log.bin: {e}')  # feedback is printed to the terminal
+            if not text_log:     # case the text log is not used
+                print('Data is saved in Cubotino_solver_log.txt instead')  # feedback is printed to the terminal
+                text_log = True  # the text log is used for this record, to not loose it
+                if not os.path.exists(fname):  # case the text log does not exist
+                    s = '\t'.join(text_headers) + '\n' + s  # headers are written before the data
+    
+    if text_log:                 # case the text log is used (data_log setting, or binary log failure)
+        # 'a' means: file will be generated if it does not exist, and data will be appended at the end
+        with open(fname,'a') as f:   # text file is temporary opened
+            f.write(s)               # data is appended
+            
+            if debug:                # case debug variable is set True
+                print('\nData is saved in Cubotino_solver_log.txt') # feedback is printed to the terminal
 
 
 
@@ -3406,9 +4531,9 @@ def robot_set_servo(debug):
     
     if not silent:                      # case silent is set True
         # servos are initialized, and set to their starting positions
-        ret, timer = servo.init_servo(debug, start_pos = 'read', f_to_close_mode=flip_to_close_one_step)
+        ret, timer = servo.init_servo(debug, start_pos = 'read', f_to_close_mode=flip_to_close_one_step, overlap=motion_overlap)
     else:                               # case silent is set False
-        ret, timer = servo.init_servo(debug, start_pos = 'read', f_to_close_mode=flip_to_close_one_step, s_silent=True)
+        ret, timer = servo.init_servo(debug, start_pos = 'read', f_to_close_mode=flip_to_close_one_step, s_silent=True, overlap=motion_overlap)
         print("timer:", timer)
     
     return ret, timer
@@ -3500,12 +4625,13 @@ def cpu_temp(side, delay=5):
     """ Funtion to read/print CPU temperature at Raspberry pi.
     This gives an idea about the temperature into the robot case."""
     
+    cpu_temp = 0       # cpu_temp is set to zero, in case the temperature cannot be read (i.e. virtual hardware)
     try:
-        tFile = open('/sys/class/thermal/thermal_zone0/temp')      # file with the cpu temp, in mDegCelsius (text format)
-        cpu_temp = round(float(tFile.read()) /1000, 1)             # tempertaure is converted to (float) degCelsius
+        with open('/sys/class/thermal/thermal_zone0/temp') as tFile:  # file with the cpu temp, in mDegCelsius (text format)
+            cpu_temp = round(float(tFile.read()) /1000, 1)         # tempertaure is converted to (float) degCelsius
 
     except:            # case of errors
-        tFile.close()  # file is closed
+        pass           # no actions
     
     if side!=0:                                                    # case the cube side is not zero
         if not fahrenheit:                                         # case farenheiy is set False in __main__
@@ -3661,6 +4787,24 @@ def start_solving(solv_cycle):
 
 
 
+def ready_report():
+    """ Prints to the terminal the latency from the cube solved to the robot ready for the next cube.
+        The post-solve side effects (collage, data log, coordinates) are done meanwhile by the post-solve worker."""
+    
+    global solved_time
+    
+    if solved_time is None:     # case no cube has been solved since the last report
+        return                  # function is terminated
+    print(f'\nReady for the next cube in {round(time.time()-solved_time,2)} secs after the cube solved '
+          f'({post.pending()} post-solve jobs pending)')  # feedback is printed to the terminal
+    solved_time = None          # latency reference is cleared
+
+
+
+
+
+
+
 def start_automated_cycle(cycle, total, cycle_pause):
     """ 1) starts a scrambling cycles, followed by a solving cube cycle
         2) prints on terminal before and after the each of these cycles
@@ -3713,10 +4857,7 @@ def start_automated_cycle(cycle, total, cycle_pause):
                 if elapsed_t >= cycle_pause:   # case the time to wait is over
                     time.sleep(2)         # little time to let visible on screen/terminal that the timer is over
                     print("\r{}\n".format(' '*130))   # prints 100 empty characters to overwrite the progress bar at the terminal
-                    try:                  # tentative
-                        cv2.destroyAllWindows()   # closes al the graphical windows
-                    except:               # case an exception is raised
-                        pass              # no action
+                    win.destroy()         # closes al the graphical windows
                     break                 # the while loop is interrupted     
                 
                 else:                     # case there still is time to wait
@@ -3742,6 +4883,8 @@ def show_cube(date=None, cycle=None, total=None):
         time.sleep(1)                         # little delay to let the led and camera to stabilize
         frame, w, h = read_camera()           # camera start reading the cube, and adjusts the awb/exposure
         servo.cam_led_Off()                   # sets off the led at top_cover
+        if frame is None:                     # case the camera did not return a frame
+            return                            # function is terminated
         
         if date!=None:                        # case variable date is not None
             h, w = frame.shape[:2]            # frame height and width
@@ -3760,10 +4903,9 @@ def show_cube(date=None, cycle=None, total=None):
             frame=np.vstack([bg, frame])      # bg array (background with text) is vertically stack to frame 
         
         if fixWindPos:                        # case the fixWindPos variable is chosen
-            cv2.namedWindow('cube')           # create the cube window
-            cv2.moveWindow('cube', 0,0)       # move the window to (0,0)
-        cv2.imshow('cube', frame)             # shows the frame 
-        cv2.waitKey(2000)                     # refresh time
+            win.window('cube', (0,0))         # create the cube window, and move it to (0,0)
+        win.show('cube', frame)               # shows the frame 
+        win.wait(2000)                        # showing time
 
 
 
@@ -3860,9 +5002,9 @@ def quit_func(quit_script, error = False):
             pass
         
         try:
-            cv2.destroyAllWindows()     # closes al the graphical windows
+            win.destroy()               # closes al the graphical windows
         except:
-            print("Raised exception while cv2.destroyAllWindows at script quitting") # feedback is printed to the terminal
+            print("Raised exception while closing the windows at script quitting") # feedback is printed to the terminal
             pass
        
         try:
@@ -3916,9 +5058,10 @@ def quit_func(quit_script, error = False):
             pass
          
         try:
-            cv2.destroyAllWindows()   # closes al the graphical windows
+            win.destroy()             # closes al the graphical windows
+            win.wait(200)             # time for the windows worker to close the windows
         except:
-            print("Raised exception while cv2.destroyAllWindows at script quitting")   # feedback is printed to the terminal
+            print("Raised exception while closing the windows at script quitting")   # feedback is printed to the terminal
             pass
        
         try:
@@ -3927,6 +5070,36 @@ def quit_func(quit_script, error = False):
             print("Raised exception while servo.cam_led_Off at script quitting")   # feedback is printed to the terminal
             pass
         
+        try:
+            if edge_pool is not None:  # case the workers pool for the edges chains exists
+                edge_pool.shutdown(wait=False)  # workers pool is shut down
+        except:
+            pass
+        
+        try:
+            if solve_pool is not None:  # case the worker for the speculative solve exists
+                solve_pool.shutdown(wait=False)  # worker is shut down
+        except:
+            pass
+        
+        try:
+            if motion_pool is not None:  # case the worker for the robot movements exists
+                motion_pool.shutdown(wait=False)  # worker is shut down
+        except:
+            pass
+        
+        try:
+            post.flush()              # waits for the post-solve jobs (collage, data log, coordinates) to be done
+        except:
+            print('Issues at flushing the post-solve jobs while quitting')    # feedback is printed to the terminal
+            pass
+        
+        try:
+            datalog.close()           # buffered records of the binary data log are synced to the storage
+        except:
+            print('Issues at closing the binary data log while quitting')    # feedback is printed to the terminal
+            pass
+        
         try:
             close_camera()            # closes the camnera object (should be the latest command, as per close camera)
         except:
@@ -3941,6 +5114,7 @@ def quit_func(quit_script, error = False):
         
         try:
             disp.set_backlight(0)     # display backlight is turned off
+            disp.wait()               # queued display jobs are completed by the display worker
         except:
             pass
         
@@ -3965,6 +5139,7 @@ def quit_func(quit_script, error = False):
                 disp.show_on_display('SCRIPT', 'ENDED', fs1=24, fs2=26) # feedback is printed to the display
                 time.sleep(2)                           # some little delay
                 disp.set_backlight(0)                   # display backlight is turned off
+                disp.wait()                             # queued display jobs are completed by the display worker
                 sys.exit(2)                             # script is quitted with error 2 (right after killing the bash script)
         except:
             pass
@@ -4068,6 +5243,8 @@ def test_picamera():
     while time.time()-start < show_time:            # iteration until the elapsed time is smaller than show_time
         countdown = int(show_time-(time.time()-start))  # remaining time 
         frame, w, h = read_camera()                 # video stream and frame dimensions
+        if frame is None:                           # case the camera did not return a frame
+            continue                                # next frame
         background_h=42                             # height of a black bandwidth used as back ground for text
         cv2.rectangle(frame, (0, 0), (w, background_h), (0,0,0), -1)    # black background bandwidth at frame top
         cv2.rectangle(frame, (0, h-background_h), (w, h), (0,0,0), -1)  # black background bandwidth at frame bottom
@@ -4136,6 +5313,142 @@ def tune_image_setup(expo_shift, display, gui_debug):
 
 
 
+def record_params():
+    """ Returns a dict with the settings affecting the cube status detection, stored with the recorded frames.
+        These settings are applied back by replay_setup, when the recorded frames are replayed."""
+    
+    return {'frameless_cube': frameless_cube,                 # cube with/without black frame around the facelets
+            'square_ratio': square_ratio,                     # acceptance threshold for square sides difference
+            'rhombus_ratio': rhombus_ratio,                   # acceptance threshold for rhombus axes difference
+            'delta_area_limit': delta_area_limit,             # acceptance threshold for facelet area dev from median
+            'fcs_delay': fcs_delay,                           # delay in secs to switch to Fix Coordinates System
+            'roi_detection': roi_detection,                   # facelets search limited to a region around the learned coordinates
+            'f_coordinates': [int(c) for c in f_coordinates], # learned facelets coordinates
+            'ref_centers': ref_centers,                       # reference colors used to warm-start the colors clustering
+            'colors_calib': colors_calib,                     # per robot colors calibration
+            'Rpi_ZeroW': Rpi_ZeroW,                           # flag for the Rpi ZeroW board
+            'version': version}                               # script version
+
+
+
+
+
+
+
+def detection_init():
+    """ Sets the cube status detection variables kept across the cycles.
+        Called once by start_up, and by replay_setup at the first recorded cycle."""
+    
+    global sides, chain_history, edge_pool, font, fontScale, fontColor, lineType
+    
+    sides={0:'Empty',1:'U',2:'B',3:'D',4:'F',5:'R',6:'L'}  # cube side order used by the robot while detecting facelets colors
+    chain_history = deque(maxlen=3)                   # winning edges chains on the last faces (kept across cycles)
+    edge_pool = None if Rpi_ZeroW else ThreadPoolExecutor(max_workers=2)  # workers pool for the edges chains (not on single core)
+    font, fontScale, fontColor, lineType = text_font()  # setting text font paramenters
+
+
+
+
+
+
+
+def detection_reset():
+    """ Re-sets the cube status detection variables at each cycle; Called by start_up and by replay_setup."""
+    
+    global prev_side, roi_frames, roi_active, roi_stats, roi_origin, chain_winners, last_cannies, last_centers
+    
+    prev_side = 0                                     # set the initial previous side to zero
+    roi_frames = 0                                    # counter of the analyzed frames on the face under detection
+    roi_active = False                                # flag tracking whether the last frame was analyzed on the ROI
+    roi_stats = []                                    # empty list to be filled with the per-face detection statistics
+    roi_origin = (0, 0)                               # ROI origin on the frame
+    chain_winners = []                                # empty list to be filled with the edges chain producing the facelets, per face
+    last_cannies = {}                                 # empty dict to be filled with the canny images of the last frame, per edges chain
+    last_centers = {}                                 # empty dict to be filled with the clustered colors of this cycle
+
+
+
+
+
+
+
+def replay_setup(params, replay_debug):
+    """ Function used by the replay script (Cubotino_P_replay.py), to run the cube status detection on recorded frames.
+        Libraries are imported without the robot hardware, and the recorded settings are applied.
+        This function is called at the start of each recorded cycle."""
+    
+    global np, math, time, cv2, os, pathlib, median, ThreadPoolExecutor, deque, sv, FaceCube
+    global debug, screen, cv_wow, Rpi_ZeroW, robot_stop, side
+    global frameless_cube, square_ratio, rhombus_ratio, delta_area_limit, fcs_delay, roi_detection, f_coordinates
+    global ref_centers, colors_calib
+    
+    # import libraries
+    from statistics import median                     # median is used as sanity check while evaluating facelets contours
+    from concurrent.futures import ThreadPoolExecutor # pool of worker threads, to run some openCV functions concurrently
+    from collections import deque                     # bounded list, used to keep track of recent events
+    import os.path, pathlib                           # import libraries for file and folder management
+    import numpy as np                                # data array management
+    import math                                       # math package
+    import time                                       # time package
+    import cv2                                        # computer vision package
+    try:                                              # tentative
+        import solver2x2x2.solver as sv               # import Kociemba solver copied in sub-folder
+        from solver2x2x2.face import FaceCube         # import facelet level cube, to check the cube status validity
+    except:                                           # case the solver cannot be imported
+        sv, FaceCube = None, None                     # None is assigned to the solver and to the facelet level cube
+    
+    debug = replay_debug                              # debug variable set in the replay script
+    screen = False                                    # no windows are shown while replaying
+    cv_wow = False                                    # cw_wow is set false
+    robot_stop = False                                # false is assigned to robot_stop
+    Rpi_ZeroW = params['Rpi_ZeroW']                   # Rpi_ZeroW as at the recording time
+    frameless_cube = params['frameless_cube']         # recorded settings are applied
+    square_ratio = params['square_ratio']             # recorded settings are applied
+    rhombus_ratio = params['rhombus_ratio']           # recorded settings are applied
+    delta_area_limit = params['delta_area_limit']     # recorded settings are applied
+    fcs_delay = params['fcs_delay']                   # recorded settings are applied
+    roi_detection = params['roi_detection']           # recorded settings are applied
+    f_coordinates = params['f_coordinates']           # learned facelets coordinates at the recording time
+    ref_centers = params.get('ref_centers', {})       # reference colors at the recording time
+    colors_calib = params.get('colors_calib', {})     # colors calibration at the recording time
+    
+    try:                                              # tentative
+        edge_pool                                     # case the detection variables are already set (workers pool exists)
+    except NameError:                                 # case of the first recorded cycle
+        detection_init()                              # detection variables kept across the cycles
+    chain_history.clear()                             # each recorded cycle is replayed on its own
+    detection_reset()                                 # detection variables re-set at each cycle
+    side = 1                                          # cube side is set to the first one
+
+
+
+
+
+
+
+def virtual_setup(params, first_cycle=True):
+    """ Function used with the --virtual argument, at the start of each replayed cycle.
+        The recorded settings affecting the cube status detection are applied, as the replay script does.
+        The recorded colors calibration is applied only at the first replayed cycle, so that the calibration
+        updated by the solved cycles is carried over the next ones, as on the robot."""
+    
+    global frameless_cube, square_ratio, rhombus_ratio, delta_area_limit, f_coordinates, ref_centers, colors_calib
+    
+    frameless_cube = params['frameless_cube']         # recorded settings are applied
+    square_ratio = params['square_ratio']             # recorded settings are applied
+    rhombus_ratio = params['rhombus_ratio']           # recorded settings are applied
+    delta_area_limit = params['delta_area_limit']     # recorded settings are applied
+    f_coordinates = params['f_coordinates']           # learned facelets coordinates at the recording time
+    ref_centers = params.get('ref_centers', {})       # reference colors at the recording time
+    if first_cycle:                                   # case of the first replayed cycle
+        colors_calib = params.get('colors_calib', {}) # colors calibration at the recording time
+
+
+
+
+
+
+
 def cube_facelets_permutation(cube_status, move_type, direction):
     """Function that updates the cube status, according to the move type the robot does.
        The 'ref' tuples provide the current facelet reference position to be used on the updated position.
@@ -4201,21 +5514,17 @@ def plot_animation(wait, ref_colors_BGR, cube_status, startup=False, kill=False)
                           (facelets_start_a[i][0]+d_a, facelets_start_a[i][1]+d_a),
                           (0,0,0), 1)               # square black frame are plot to define the cube sketch
             
-        cv2.namedWindow('animation')                # create the cube window
-        cv2.moveWindow('animation', 0,0)            # move the window to (0,0)
-        for i in range(5):                          # iteration for 5 times (to refresh the new window on screen)
-            cv2.imshow("animation", sketch_a)       # sketch is plot to screen
-            cv2.waitKey(10)                         # refresh time is limited
+        win.window('animation', (0,0))              # create the cube window, and move it to (0,0)
 
     for i, color in enumerate(cube_status):         # iteration over the 24 facelets interpreted colors
         B,G,R = plot_colors_a[color]                # BGR values of the assigned colors for the corresponding detected color
         cv2.fillPoly(sketch_a, pts = [inner_points_a[i]], color=(B,G,R))  # inner square is colored with bright color    
     
-    cv2.imshow("animation", sketch_a)               # sketch_a is plot to screen
-    cv2.waitKey(wait)                               # refresh time
+    win.show("animation", sketch_a.copy())          # sketch_a copy is plot to screen (sketch_a gets later updated)
+    win.wait(wait)                                  # showing time
     
     if kill:                                        # case kill variable is set True
-        cv2.destroyAllWindows()                     # all the windows are closed
+        win.destroy()                               # all the windows are closed
 
 
 
@@ -4288,7 +5597,29 @@ def animation(screen, ref_colors_BGR, cube_status_string, robot_moves):
                     # the final cube status is plot to the screen, with kill instruction
                     plot_animation(t1, ref_colors_BGR, csa[i], kill=True)
             if robot_stop:                          # case there are requests to stop the robot 
-                cv2.destroyAllWindows()             # all the windows are closed
+                win.destroy()                       # all the windows are closed
+
+
+
+
+
+
+
+# vision functions timed when the --timings argument is used (function name: stage name)
+vision_stages = {'read_camera': 'camera', 'frame_cropping': 'crop', 'warp_image': 'warp',
+                 'frame_resize': 'resize', 'edge_analysis': 'edge_analysis', 'read_facelets': 'findContours',
+                 'contours_prefilter': 'contours_prefilter', 'get_approx_contours': 'get_approx_contours',
+                 'get_facelets': 'get_facelets', 'get_facelets_fcs': 'get_facelets_fcs',
+                 'estimate_facelets': 'estimate_facelets', 'distance_deviation': 'distance_deviation',
+                 'cube_facelets_colors': 'colour_sampling', 'face_image': 'face_image'}
+
+# robot phases timed when the --virtual argument is used (function name: phase name)
+virtual_phases = {'start_up': 'start_up', 'cpu_temp': 'cpu_temp', 'start_solving': 'cycle_other',
+                  'robot_consistent_camera_images': 'camera_setting', 'robot_to_cube_side': 'scan_moves',
+                  'read_camera': 'camera', 'cubeAF': 'detection', 'cube_colors_interpr_all': 'colors_interpretation',
+                  'cube_solution': 'solver', 'robot_solve_cube': 'post_solve', 'robot_move_cube': 'robot_solve',
+                  'animation': 'animation', 'log_data': 'log_data', 'decoration': 'collage',
+                  'save_coordinates': 'save_coordinates', 'motion_wait': 'motion_wait'}
 
 
 
@@ -4302,15 +5633,19 @@ def start_up(first_cycle=False, set_cropping=False):
     # global variables
     global camera, width, height, w, h                    # camera and frame related variables
     global show_time, cam_led_bright                      # camera and frame related variables
-    global sides, side, faces, prev_side, BGR_mean, HSV_mean, URFDLB_facelets_BGR_mean  # cube status detection related variables
+    global side, faces, BGR_mean, HSV_mean, URFDLB_facelets_BGR_mean  # cube status detection related variables
     global timeout, detect_timeout, robot_stop            # robot related variables
-    global font, fontScale, fontColor, lineType           # cv2 text related variables
     global timer, f_coordinates, fcs_delay
-
+    global solve_pool, motion_pool                        # workers for the speculative solve, and for the robot movements
+    global ref_centers                                    # reference colors, to warm-start the colors clustering
+    global colors_calib                                   # per robot colors calibration (Lab centroids and covariances)
+    global settle_stats, consensus_stats, overlap_stats   # motion-settle detection, colors consensus and overlaps statistics
+    global fcs_history                                    # per-face history, to learn the delay to switch to the fix coordinates
+    global camera_profiles, camera_profile_pending        # camera profiles (gains, AWB and shutter time) per led and exposure
+    global solved_time, log_headers_checked               # ready-for-next-cube latency reference, and log headers check
 
 
     # series of variables settings, to re-set at each cycle
-    prev_side=0                      # set the initial previous side to zero
     BGR_mean=[]                      # empty list to be filled with with 24 facelets BGR colors while reading cube status
     HSV_mean=[]                      # empty_ list to be filled with with 24 facelets HUE values, while reading cube status
     URFDLB_facelets_BGR_mean=[]      # empty list to be filled with with 24 facelets colors, ordered according URFDLB order
@@ -4320,11 +5655,24 @@ def start_up(first_cycle=False, set_cropping=False):
     cpu_temp(side)                   # cpu temp is checked at cube solving-end
     robot_stop = False               # flag to stop the robot movements
     timeout = False                  # timeout flag is initialli set on False
+    detection_reset()                # ROI, edges chains and clustered colors variables of the detection
+    tm.reset()                       # vision functions timings of the previous cycle are cleared
+    settle_stats = []                # empty list to be filled with the per-face motion-settle statistics
+    consensus_stats = []             # empty list to be filled with the per-face frames used for the colors consensus
+    overlap_stats = []               # empty list to be filled with the per-phase robot movements and overlapped time
+    camera_profile_pending = {}      # empty dict to be filled with the camera profile of a full auto-settle
     
     # series actions, or variables setting, to be done only at the first cycle
     if first_cycle and not set_cropping:
+        # camera, servos and data files tasks: on parallel init these run while cpu temp and time system are checked
+        boot.add('camera', set_camera)                         # camera object creation task
+        boot.add('servos', robot_set_servo, debug)             # servos initialization task
+        boot.add('data', load_data_files)                      # data files (learned on previous cycles) loading task
+        
         cpu_temp(side=10, delay=3)   # cpu temp is checked at start-up
+        boot.mark('cpu_temp')        # milestone on the boot timeline
         time_system_synchr()  # checks the time system status (if internet connected, it waits till synchronization)
+        boot.mark('time_sync')       # milestone on the boot timeline
         
         if screen:                                             # case there is a screen connected
             detect_timeout = int(2 * detect_timeout)           # cube status detection timeout is increased
@@ -4336,11 +5684,18 @@ def start_up(first_cycle=False, set_cropping=False):
             detect_timeout = int(3 * detect_timeout)           # cube status detection timeout is increased
             fcs_delay = 3*fcs_delay                            # delay to start the FCS (Fix Coordinates System)        
 
-        sides={0:'Empty',1:'U',2:'B',3:'D',4:'F',5:'R',6:'L'}  # cube side order used by the robot while detecting facelets colors
-        font, fontScale, fontColor, lineType = text_font()     # setting text font paramenters
-        camera, width, height = set_camera()                   # camera object is created
+        detection_init()                                       # cube sides, edges chains workers and text font
+        solve_pool = ThreadPoolExecutor(max_workers=1)         # worker for the speculative solve, while scanning the last face
+        motion_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='motion') if pipeline else None  # worker for the robot movements
+        solved_time = None                                     # time of the last cube solved (None when no cube is solved yet)
+        log_headers_checked = False                            # headers of the log file are checked at the first logging
+        if screen:                                             # case there is a screen connected
+            win.start()                                        # windows worker thread is started (it owns imshow and waitKey)
+        if stage_timings:                                      # case the vision functions timings are requested
+            tm.instrument(globals(), vision_stages)            # vision functions are wrapped by a timer
+        camera, width, height = boot.wait('camera')            # camera object is created
         robot_set_GPIO()                                       # GPIO settings used on the Raspberry pi
-        robot_init_status, timer = robot_set_servo(debug)      # settings for the servos
+        robot_init_status, timer = boot.wait('servos')         # settings for the servos
         if not robot_init_status:                              # case the servo init function returns False
             print("Error occurs at servos init")               # feedback is printed to the terminal
             disp.set_backlight(1)                              # display backlight is turned on, in case it wasn't
@@ -4350,7 +5705,68 @@ def start_up(first_cycle=False, set_cropping=False):
             time.sleep(5)
             quit_func(quit_script=True)                        # qutting function is called, with script clossure
         
-        f_coordinates = load_coordinates()                     # load the fix coordinates
+        # fix coordinates, reference colors, colors calibration, camera profiles and fix coordinates delay history
+        f_coordinates, ref_centers, colors_calib, camera_profiles, fcs_history = boot.wait('data')
+
+
+
+
+
+
+def face_detection(frame, w, h, side, elapsed, fcs_now, candidates, BGR_mean, HSV_mean):
+    """ Per-frame step of the cube status detection, shared by cubeAF and by the replay script (Cubotino_P_replay.py).
+        The frame is analyzed for contours compatible with the cube facelets; When fcs_now is True, the facelets are
+        also taken from the fix coordinates. Once the face is detected the statistics are stored, the facelets are
+        ordered as per viewer POW, and their colors are appended to BGR_mean and HSV_mean.
+        elapsed is the time since the face detection started, at the frame capture.
+        Returns the facelets (4 when the face is detected), the frame, the fix coordinates flag and the facelets
+        centers coordinates (before the rotation to the viewer POW)."""
+    
+    facelets, fcs_used, centers = [], False, []                  # facelets list, fix coordinates flag and facelets centers
+    (contours, hierarchy) = read_facelets(frame, w, h)           # reads cube's facelets and returns the contours
+    if hierarchy is None:                                        # case there are no contours
+        return facelets, frame, fcs_used, centers                # empty facelets are returned
+    
+    hierarchy = hierarchy[0]                                     # only top level contours (no childs)
+    prefiltered = contours_prefilter(contours, hierarchy, w, h)  # contours out of facelets range are discarded in one batch
+    indexes = prefiltered['idx'] if len(prefiltered) > 0 else (-1,)  # one iteration is anyhow kept for the fcs check
+    
+    for idx in indexes:                                          # each pre-filtered contour is analyzed
+        if idx >= 0:                                             # case of a pre-filtered contour
+            component = (contours[idx], hierarchy[idx])          # contour and its hierarchy
+            contour, child, corners = get_approx_contours(component)  # contours are approximated
+        else:                                                    # case no contours survived the pre-filter
+            corners = 0                                          # no corners are assigned
+        
+        if fcs_now:                                              # case the facelets detection takes more than the face delay
+            facelets, frame = get_facelets_fcs(facelets, frame)  # facelets info are based on fix coordinates
+            fcs_used = True                                      # fix coordinates flag is set True
+        
+        if corners==4:                                           # contours with 4 corners are of interest
+            facelets, frame = get_facelets(facelets, frame, contour, child) # returns a dict with cube compatible contours
+        
+        if len(facelets)==4:                                     # case there are 4 contours having facelets compatible characteristics
+            facelets = order_4contours(facelets, new_center=[])  # contours are ordered from top left
+            d_to_exclude = distance_deviation(facelets)          # facelets to remove due inter-distance not as regular 3x3 array
+            if len(d_to_exclude)>=1:                             # check if any contour is too far to be part of the cube
+                d_to_exclude.sort(reverse=True)                  # reverse the contours order
+                for i in d_to_exclude:                           # remove the contours too faar far to be part of the cube
+                    facelets.pop(i)                              # facelet is removed
+        
+        if len(facelets)==4:                                     # case having 4 contours compatible to a cube face
+            break                                                # for loop is interrupted
+    
+    if len(facelets)==4:                                         # case the face has been detected
+        roi_face_stats(side, elapsed, fcs_used)                  # face detection statistics are stored
+        auto_chain_update(facelets, fcs_used)                    # edges chain producing the facelets is tracked
+        for i in range(4):                                       # iteration over the 4 facelets
+            centers.append(facelets[i]['cx'])                    # x coordinate is retrieved and appended to the centers list
+            centers.append(facelets[i]['cy'])                    # y coordinate is retrieved and appended to the centers list
+        facelets = robot_facelets_rotation(facelets)             # order facelets as per viewer POW (due to cube/camera rotations on robot)
+        cube_facelets_colors(frame, facelets, candidates, BGR_mean, HSV_mean)    # each facelet is read for color
+    
+    return facelets, frame, fcs_used, centers
+
 
 
 
@@ -4371,6 +5787,8 @@ def cubeAF():
     global HSV_mean, URFDLB_facelets_HSV_mean                                             # cube status detection related variables
     global font, fontScale, fontColor, lineType                                           # cv2 text related variables
     global servo, robot_stop, robot_idle, timeout, detect_timeout                         # robot related variables
+    global skipped_flips                                                                  # scanning flips skipped by the last face deduction
+    global f_coordinates                                                                  # facelets fix coordinates
 
 
     robot_idle = False                                           # robot is not anymore idling
@@ -4386,6 +5804,9 @@ def cubeAF():
     faces.clear()                                                # empties the dict of images (6 sides) recorded during previous solving cycle
     facelets = []                                                # empties the list of contours having cube's square characteristics
     all_coordinates = []                                         # empties the list of contours centers coordinate as reference for next facelet search
+    skipped_flips = 0                                            # scanning flips skipped when the last face is deduced
+    deduced, scanned = {}, None                                  # deduced cube status (5-face scan), and scanned facelets (None for all)
+    spec_future = None                                           # speculative solve of the last face completions (worker thread)
     robot_to_cube_side(side, cam_led_bright)                     # robot set with camera on read position
     servo.cam_led_On(cam_led_bright)                             # led on top_cover is switched on before the PiCamera warmup phase
     
@@ -4393,9 +5814,17 @@ def cubeAF():
         timestamp = dt.datetime.now().strftime('%Y%m%d_%H%M%S')  # date_time variable is assigned, for file name and log purpose
         robot_consistent_camera_images(debug, os_version, camera, start_time)  # sets PiCamera to capture consistent images
         camera_ready_time=time.time()                            # time stored after picamera warmup and settings for consistent pictures
+        if not virtual:                                          # case of real hardware (virtual_setup applies the recorded coordinates)
+            f_coordinates = load_coordinates()                   # fix coordinates, including those saved at the previous cycle
+        settle_stats.clear()                                     # motion-settle statistics of the camera setting flips are discarded
         side = 1                                                 # side is changed to 1, as the cube faces are numbered from 1 to 6
         fcs = 0                                                  # fcs = fix coordinates system, is initially set False (0)
+        fcs_delays = adaptive_fcs_delays()                       # per-face delay to switch to the fix coordinates, from the history
+        if debug:                                                # case debug variable is set True
+            print('Fix coordinates delay per face:', {sides[k]: round(v,2) for k, v in fcs_delays.items()})  # feedback to the terminal
         t_ref = time.time()                                      # timer is reset (timer used on each face detection to eventually witch to fix coordinates)
+        if record:                                               # case the frames recording is activated
+            recorder.start(timestamp, record_params())           # frames recording is started
 
 
     while not robot_stop:                                        # substantially the main loop, it can be interrupted by quit_func() 
@@ -4403,192 +5832,197 @@ def cubeAF():
             break                                                # while loop is interrupted
         
         plot_to_display(side)                                    # feedback is printed to the display
+        tm.side = side                                           # cube side the vision functions timings refer to
+        if virtual:                                              # case of the virtual hardware (--virtual argument)
+            camera.side = side                                   # cube side the replayed frames refer to
         frame, w, h = read_camera()                              # video stream and frame dimensions
+        elapsed = time.time() - t_ref                            # time since the face detection started, at the frame capture
+        if record and frame is not None:                         # case the frames recording is activated
+            recorder.add(frame, side, elapsed)                   # frame is recorded, before being drawn by the detection
         
         if screen:                                               # case screen variable is set True
-            cv2.namedWindow('cube')                              # create the cube window
-            if fixWindPos:                                       # case the fixWindPos variable is chosen  
-                cv2.moveWindow('cube', 0,0)                      # move the window to (0,0)
+            win.window('cube', (0,0) if fixWindPos else None)    # create the cube window, moved to (0,0) if fixWindPos
         
-        if not robot_stop:                                       # case there are no requests to stop the robot
-            (contours, hierarchy)=read_facelets(frame, w, h)     # reads cube's facelets and returns the contours
-            candidates = []                                      # empties the list of potential contours
+        if not robot_stop and time.time() - camera_ready_time > detect_timeout:  # timeout is calculated for the robot during cube status reading
+            timeout = robot_timeout_func()                       # in case the timeout is reached
         
-        if not robot_stop and hierarchy is not None:             # analyze the contours in case these are previously retrieved
-            hierarchy = hierarchy[0]                             # only top level contours (no childs)
-            facelets = []                                        # empties the list of contours having cube's square characteristics
-            
-            if timeout or robot_stop:                            # in case of reached timeout or stop_button pressed
-                quit_func(quit_script=False)                     # quit function is called, withou forcing the script quitting
-                break                                            # while loop is interrupted
+        if not robot_stop and not timeout and frame is not None:  # case of no stop requests, no timeout, and a camera frame
+            candidates = []                                      # empties the list of potential contours
+            fcs_now = len(f_coordinates)>0 and elapsed > fcs_delays[side]  # case the facelets detection takes more than the face delay
+            facelets, frame, fcs_used, coordinates = face_detection(frame, w, h, side, elapsed, fcs_now,
+                                                                    candidates, BGR_mean, HSV_mean)  # facelets detection and colors reading
             
-            for component in zip(contours, hierarchy):           # each contour is analyzed   
-                contour, hierarchy, corners = get_approx_contours(component)  # contours are approximated
-    
-                if  time.time() - camera_ready_time > detect_timeout:  # timeout is calculated for the robot during cube status reading
-                    timeout = robot_timeout_func()               # in case the timeout is reached
-                    break                                        # for loop is interrupted
-                
-                if robot_stop:                                   # case the robot has been stopped
-                    break                                        # for loop is interrupted
+            if len(facelets)==4:                                 # case having 4 contours compatible to a cube face
+                fcs += int(fcs_used)                             # fcs (Fix Coordinates System) counts the faces detected via fix coordinates
+                if fcs == 0:                                     # case facelets were detected without the fix coordinates system method
+                    all_coordinates.append(coordinates)          # 4 facelets centers coordinates are appended to all_coordinates (all faces)
+                n_max = 1 if virtual else 2 if Rpi_ZeroW else 4  # replayed frames (virtual hardware) are left to the next face detection
+                facelets_colors_consensus(facelets, BGR_mean, HSV_mean, n_max=n_max)  # colors refined on the next frames
+                if side == 5:                                    # case the 5th face has just been detected
+                    outcome, completions, deduced_ref = last_face_deduction(URFDLB_facelets_order(BGR_mean))  # last face completions
+                deduce = five_faces and side == 5 and outcome == 'unique'  # case the last face is deduced, instead of scanned
+                motion = None                                    # movements to the next face are not started yet
+                if pipeline:                                     # case the robot movements run on the motion worker
+                    motion = motion_start(robot_to_cube_side, 6 if deduce else side, cam_led_bright)  # movements start, while the face is processed
+                URFDLB_facelets_BGR_mean = URFDLB_facelets_order(BGR_mean)     # facelets BGR are ordered as per URFDLB order
+                URFDLB_facelets_HSV_mean = URFDLB_facelets_order(HSV_mean)     # facelets HSV are ordered as per URFDLB order
+                plot_to_display(side, URFDLB_facelets_BGR_mean)   # detected colour are plot to the display
+
+                faces = face_image(frame, facelets, side, faces)  # image of the cube side is taken for later reference
                 
                 if screen and not robot_stop:                    # case screen variable is set True
-                    cv2.imshow('cube', frame)                    # shows the frame 
-                    cv2.waitKey(1)      # refresh time is minimized to 1ms, refresh time mostly depending to all other functions
-                
-                if len(f_coordinates)>0 and time.time() - t_ref > fcs_delay:  # case the facelets detection takes more than fcs_delay secs
-                    facelets, frame = get_facelets_fcs(facelets, frame)  # facelets info are based on fix coordinates
-                    fcs += 1                                     # fcs (Fix Coordinates System) is incremented
-                
-                if corners==4:                                   # contours with 4 corners are of interest
-                    facelets, frame = get_facelets(facelets, frame, contour, hierarchy) # returns a dict with cube compatible contours
+                    if cv_wow:                                   # case the cv image analysis plot is set true                              
+                        win.destroy('cube')                      # cube window is closed
+                        show_cv_wow(frame, time = 4000 if Rpi_ZeroW else 2000)  # call the function that shows the cv_wow image
+                    else:                                        # case the cv image analysis plot is set false
+                        win.show('cube', frame.copy(), hold=vnc_delay)  # detected face is held on screen, without delaying the robot
                 
-                if len(facelets)==4:                             # case there are 4 contours having facelets compatible characteristics
-                    facelets = order_4contours(facelets, new_center=[])  # contours are ordered from top left
-                    d_to_exclude = distance_deviation(facelets)  # facelets to remove due inter-distance not as regular 3x3 array
-                    if len(d_to_exclude)>=1:                     # check if any contour is too far to be part of the cube
-                        d_to_exclude.sort(reverse=True)          # reverse the contours order
-                        for i in d_to_exclude:                   # remove the contours too faar far to be part of the cube
-                            facelets.pop(i)                      # facelet is removed
+                if side == 5:                                    # case the 5th face has just been detected
+                    if five_faces:                               # case of 5-face scan
+                        print(f'\nLast face deduction: {outcome}')  # feedback is printed to the terminal
+                    if deduce:                                   # case the last face colors are deduced
+                        deduced = completions[0]                 # deduced cube status
+                        for f in (16, 17, 18, 19):               # iteration over the last face facelets (URFDLB order)
+                            b, g, r = deduced_ref[int(deduced[f][1])]  # deduced color, as reference BGR color
+                            BGR_mean.append((b, g, r))           # deduced color is appended, as if scanned
+                            hsv = cv2.cvtColor(np.array([[[b,g,r]]], dtype=np.uint8), cv2.COLOR_BGR2HSV)  # HSV equivalent
+                            HSV_mean.append(list(hsv[0][0])) # the HSV value is stored on a list
+                        URFDLB_facelets_BGR_mean = URFDLB_facelets_order(BGR_mean)  # facelets BGR are ordered as per URFDLB order
+                        URFDLB_facelets_HSV_mean = URFDLB_facelets_order(HSV_mean)  # facelets HSV are ordered as per URFDLB order
+                        faces[6] = last_face_image(faces[5], deduced, deduced_ref)  # last face image, for the collage
+                        scanned = [i for i in range(24) if i not in (16, 17, 18, 19)]  # scanned facelets
+                        skipped_flips = 2                        # the two flips showing the last face are skipped
+                        side = 6                                 # last face is not scanned
+                        plot_to_display(side, URFDLB_facelets_BGR_mean)  # deduced colour are plot to the display
+                    elif len(completions) > 0 and solve_pool is not None:  # case there are candidate completions
+                        spec_future = solve_pool.submit(speculative_solutions, completions)  # solved while scanning the last face
                 
-                if len(facelets)==4:                             # case having 4 contours compatible to a cube face
-                    if fcs == 0:                                 # case facelets were detected without the fix coordinates system method
-                        coordinates=[]                           # empty list to store the facelets coordinates of the last scanned face
-                        for i in range(4):                       # iteration over the 4 facelets
-                            coordinates.append(facelets[i]['cx'])  # x coordinate is retrieved and appended to the coordinates list
-                            coordinates.append(facelets[i]['cy'])  # y coordinate is retrieved and appended to the coordinates list
-                        all_coordinates.append(coordinates)      # 4 facelets centers coordinates are appended to all_coordinates (all faces)
-                    
-                    facelets = robot_facelets_rotation(facelets) # order facelets as per viewer POW (due to cube/camera rotations on robot)
-                    cube_facelets_colors(frame, facelets, candidates, BGR_mean, HSV_mean)    # each facelet is read for color
-                    URFDLB_facelets_BGR_mean = URFDLB_facelets_order(BGR_mean)     # facelets BGR are ordered as per URFDLB order
-                    URFDLB_facelets_HSV_mean = URFDLB_facelets_order(HSV_mean)     # facelets HSV are ordered as per URFDLB order
-                    plot_to_display(side, URFDLB_facelets_BGR_mean)   # detected colour are plot to the display
+                if motion is None:                               # case the movements to the next face are not started yet
+                    motion = motion_start(robot_to_cube_side, side, cam_led_bright)  # cube is rotated/flipped to the next face
 
-                    faces = face_image(frame, facelets, side, faces)  # image of the cube side is taken for later reference
+                if side < 6:                                     # actions when a face has been completely detected, and there still are other to come
+                    motion_wait(motion, sides[side+1])           # waits for the next face in front of the camera
+                    t_ref = time.time()                          # timer is reset (used on each face detection to eventually use fix coordinates)
+                    side +=1                                     # cube side index is incremented
+                    continue                                     # the process re-starts from contour detection at the next cube face
+
+                if side == 6:                                    # case last cube's face is acquired
+                    disp.clean_display()                         # cleans the display
+                    servo.cam_led_Off()                          # led at top_cover is set off         
+                    cube_detect_time = time.time()               # time stored after detecteing all the cube facelets
+                    roi_report()                                 # per-face detection time and ROI hit rate are printed to the terminal
+                    settle_report()                              # per-face time saved by the motion-settle detection is printed
+                    tm.cycle_end(timestamp, sides)               # vision functions timings are printed and logged (if activated)
+                    if screen:                                   # case screen variable is set True
+                        win.destroy()                            # cube window and eventual other open windows are closed
                     
-                    if screen and not robot_stop:                # case screen variable is set True
-                        if cv_wow:                               # case the cv image analysis plot is set true                              
-                            cv2.destroyWindow('cube')            # cube window is closed
-                            show_cv_wow(frame, time = 4000 if Rpi_ZeroW else 2000)  # call the function that shows the cv_wow image
-                        else:                                    # case the cv image analysis plot is set false
-                            for i in range(4):                   # iteration
-                                cv2.imshow('cube', frame)        # shows the frame 
-                                cv2.waitKey(10)                  # refresh time is minimized (1ms), yet real time is much higher
-                            time.sleep(vnc_delay)                # delay for cube face change, to compensate VNC viewer delay
+                    # initializing some variables
+                    solution_Text = ''                           # empty text is assigned to solution_Text
+                    moves = []                                   # empty list is assigned to moves
+                    cdw = 'Error'                                # Error is assigned to cdw variable (color detection winner)
                     
-                    robot_to_cube_side(side, cam_led_bright)     # cube is rotated/flipped to the next face
-                    t_ref = time.time()                          # timer is reset (used on each face detection to eventually use fix coordinates)
-
-                    if side < 6:                                 # actions when a face has been completely detected, and there still are other to come
-                        side +=1                                 # cube side index is incremented
-                        break                                    # with this break the process re-starts from contour detection at the next cube face
-
-                    if side == 6:                                # case last cube's face is acquired
-                        disp.clean_display()                     # cleans the display
-                        servo.cam_led_Off()                      # led at top_cover is set off         
-                        cube_detect_time = time.time()           # time stored after detecteing all the cube facelets
-                        if screen:                               # case screen variable is set True
-                            try:                                 # tentative
-                                cv2.destroyAllWindows()          # cube window and eventual other open windows are closed
-                            except:                              # in case of exceptions
-                                pass                             # do nothing
-                        
-                        # initializing some variables
-                        solution_Text = ''                       # empty text is assigned to solution_Text
-                        moves = []                               # empty list is assigned to moves
-                        cdw = 'Error'                            # Error is assigned to cdw variable (color detection winner)
-                        
-                        # getting the dominant colors
-                        label, ref_colors_BGR = cube_colors_clusters(URFDLB_facelets_BGR_mean, vectors=3, clusters=6)  # six reference BGR colors out of the 24 facelets
-                        ref_colors_BGR = np.uint8(ref_colors_BGR).tolist()  # clustered colors convertered to 8bit and assigned to a list
-                        cube_status = cube_colors_interpr_BGR(URFDLB_facelets_BGR_mean, ref_colors_BGR)  # cube status via BGR color space analysis
-                        
-                        if len(cube_status) == 24:               # case the cube_status has 24 elements 
-                            cube_status_string = cube_string(cube_status) # cube string for the solver
-
-                            # Kociemba solver is called to have the solution string
-                            solution, solution_Text, robot_moves, total_robot_moves, est_time, tot_s = cube_solution(cube_status_string)
-                            cdw = 'BGR'                          # variable used to log which method gave the solution
-                            cube_solution_time = time.time()     # time stored after getting the cube solution
-                            print(f'\nCube status (Via BGR): {cube_status_string}')   # feedback is printed to the terminal
-                            
-                        elif len(cube_status) == 0:              # case the cube_status has 0 elements
-                            solution_Text = 'Error'              # 'Error' is assigned to the solution_Text
+                    # all the color interpreters run on the same facelets colors, and only the best candidate is solved
+                    if len(deduced) == 24:                       # case the last face has been deduced (5-face scan)
+                        candidates = [{'name': 'LAB5', 'cube_status': deduced, 'ref_colors_BGR': deduced_ref,
+                                       'css': cube_string(deduced), 'valid': True, 'margin': None, 'votes': 1}]  # single candidate
+                    else:                                        # case all the faces have been scanned
+                        candidates = cube_colors_interpr_all(URFDLB_facelets_BGR_mean, URFDLB_facelets_HSV_mean)  # scored candidates
+                    best = candidates[0]                         # candidate with the largest assignment margin (or the least bad)
+                    cube_status, ref_colors_BGR = best['cube_status'], best['ref_colors_BGR']  # cube status and reference colors
 
 ################ DEBUG ################
-#                         solution_Text = 'Error'                # uncoment these rows to force HSV color analysis method
-#                         ref_colors_BGR = []                    # uncoment these rows to force HSV color analysis method
+#                         best = candidates[-1]                  # uncoment this row to force the weakest candidate
 #######################################
 
-                        if solution_Text == 'Error':             # case the cube solution, from BGR analysis, returned Error
-                            cube_status, ref_colors_BGR = cube_colors_interpr_HSV(URFDLB_facelets_HSV_mean)  # cube status via HSV color space analysis
+                    speculative = {}                             # solutions of the last face candidate completions
+                    if spec_future is not None:                  # case the speculative solve has been started
+                        t_wait = time.time()                     # time reference for the wait on the worker
+                        speculative, spec_secs, spec_cpu = spec_future.result()  # waits for the worker (robot moves planning is not thread safe)
+                        print(f'Speculative solve of {len(speculative)} candidates: {spec_secs:.2f} secs ({spec_cpu:.2f} cpu secs '
+                              f'taken from the last face detection), {time.time() - t_wait:.2f} secs waited after the scan')  # feedback to the terminal
+
+                    if best['valid']:                            # case the cube status passed the validity check
+                        cube_status_string = best['css']         # cube string for the solver
+
+                        if canonical_string(cube_status_string) in speculative:  # case the scanned cube status was solved in advance
+                            solution, solution_Text, robot_moves, total_robot_moves, est_time, tot_s = speculative[canonical_string(cube_status_string)]
+                            print(f'Speculative solve confirmed by the last face ({len(speculative)} candidates)')  # feedback to the terminal
+                        else:                                    # case the cube status was not solved in advance
+                            # Kociemba solver is called to have the solution string
+                            solution, solution_Text, robot_moves, total_robot_moves, est_time, tot_s = cube_solution(cube_status_string)
+                        cdw = best['name']                       # variable used to log which method gave the solution
+                        cube_solution_time = time.time()         # time stored after getting the cube solution
+                        print(f'\nCube status (via {cdw}): {cube_status_string}')   # feedback is printed to the terminal
+                    else:                                        # case no one interpreter returned a valid cube status
+                        solution_Text = 'Error'                  # 'Error' is assigned to the solution_Text
                             
-                            if len(cube_status) == 24:           # case the cube_status has 24 elements 
-                                cube_status_string = cube_string(cube_status) # cube string for the solver
-
-                                # Kociemba solver is called to have the solution string
-                                solution, solution_Text, robot_moves, total_robot_moves, est_time, tot_s = cube_solution(cube_status_string)
-                                cdw = 'HSV'                      # variable used to log which method gave the solution
-                                cube_solution_time = time.time() # time stored after getting the cube solution
-                                print(f'\nCube status (via HSV): {cube_status_string}')   # feedback is printed to the terminal
                             
-                            elif len(cube_status) == 0:          # case the cube_status has 0 elements
-                                solution_Text = 'Error'          # 'Error' is assigned to the solution_Text
-                                
-                                
-                        if solution_Text != 'Error' and len(moves) > 0:  # case there is not errors and the cube is not already solved
-                            s = ''                               # empty string is assigned to the variable s
-                            for i in range(len(solution)//2):    # iteration over the solution, in step of two chracters
-                                s += solution[i:i+2] + " "       # an enpty space is added every two characters, to improve readability
-                            if 'B'in solution or 'D' in solution or 'L' in solution:  # case of a DBL solution
-                                print(f'Selected (optimized) solution : {s}')   # feedback is printed to the terminal
-                            else:                                # case of URF solution
-                                print(f'Selected solution : {s}')  # feedback is printed to the terminal
-
-                        if len(cube_status) == 0 or solution_Text == 'Error':  # case the cube_status is empty or cube detection error
-                            solution = ''                        # empty text is assigned to the solution variable
-                            solution_Text = 'Error'              # Error is assigned to solution_Text variable
-                            robot_moves = ''                     # empty text is assigned to the robot_moves variable
-                            total_robot_moves = 0                # zero is assigned to total_robot_moves variable
-                            est_time = 0                         # zero is assigned to est_time variable
-                            tot_s = 0                            # zero is assigned to tot_s variable
-                            cdw = 'Error'                        # Error is assigned to cdw variable
-                            cube_status_string = cube_string(cube_status)  #  cube_status_string (of the incoherent cube status)
-                            cube_solution_time = time.time()     # time reference
-                        
-                        # feedback is printed to the terminal
-                        if tot_s > 1:                            # case of multiple solutions were available
-                            print('Total of possible solving solutions:', tot_s)
-                        print(f'Camera warm-up, camera setting, cube status ({cdw}), and solution, in: {round(time.time()-start_time,1)} secs')
-                        
-                        # call the function taking care of solving the cube, making the cube sketch, animation, saving the logs, etc
-                        robot_solve_cube(fixWindPos, screen, frame, faces, ref_colors_BGR, cube_status, 
-                                         URFDLB_facelets_BGR_mean, URFDLB_facelets_HSV_mean, font, fontScale,
-                                         lineType, show_time, timestamp, solution, solution_Text, robot_moves,
-                                         total_robot_moves, est_time, cdw, cube_status_string,
-                                         BGR_mean, start_time, camera_ready_time, cube_detect_time,
-                                         cube_solution_time, slow_time_s, os_version, fcs)
-                        
-                        if fcs == 0:   # (fcs = fix coordinates system) case the all facelets were detected without the fix coordinates method
-                            save_coordinates(all_coordinates)    # saves the coordinates of the 4 facelets found during scanning
-
-                        return                       # closes the cube reading/solver function in case it reaches the end
-                
-    
-                # case there are less than 4 contours detected, yet shown on screen as feedback
-                if screen and not robot_stop:        # case screen variable is set True
-                    cv2.imshow('cube', frame)        # shows the frame 
-                    cv2.waitKey(1)                   # refresh time is minimized to 1ms, real refresh time depends on other functions
-              
+                    if solution_Text != 'Error' and len(moves) > 0:  # case there is not errors and the cube is not already solved
+                        s = ''                                   # empty string is assigned to the variable s
+                        for i in range(len(solution)//2):        # iteration over the solution, in step of two chracters
+                            s += solution[i:i+2] + " "           # an enpty space is added every two characters, to improve readability
+                        if 'B'in solution or 'D' in solution or 'L' in solution:  # case of a DBL solution
+                            print(f'Selected (optimized) solution : {s}')   # feedback is printed to the terminal
+                        else:                                    # case of URF solution
+                            print(f'Selected solution : {s}')  # feedback is printed to the terminal
+
+                    if len(cube_status) == 0 or solution_Text == 'Error':  # case the cube_status is empty or cube detection error
+                        solution = ''                            # empty text is assigned to the solution variable
+                        solution_Text = 'Error'                  # Error is assigned to solution_Text variable
+                        robot_moves = ''                         # empty text is assigned to the robot_moves variable
+                        total_robot_moves = 0                    # zero is assigned to total_robot_moves variable
+                        est_time = 0                             # zero is assigned to est_time variable
+                        tot_s = 0                                # zero is assigned to tot_s variable
+                        cdw = 'Error'                            # Error is assigned to cdw variable
+                        cube_status_string = cube_string(cube_status)  #  cube_status_string (of the incoherent cube status)
+                        cube_solution_time = time.time()         # time reference
+                    
+                    # feedback is printed to the terminal
+                    if tot_s > 1:                                # case of multiple solutions were available
+                        print('Total of possible solving solutions:', tot_s)
+                    print(f'Camera warm-up, camera setting, cube status ({cdw}), and solution, in: {round(time.time()-start_time,1)} secs')
+                    
+                    if solution_Text != 'Error' and cdw in ('BGR', 'HSV'):  # case the cube status led to a solution
+                        save_ref_colors('BGR' if cdw == 'BGR' else 'Hue')  # reference colors are saved, to warm-start the next cycle
+                    if solution_Text != 'Error' and cdw != 'Error':  # case the cube status led to a solution
+                        update_colors_calib(colors_calib, URFDLB_facelets_BGR_mean, cube_status_string, facelets=scanned)  # calibration is updated
+                        save_colors_calib(colors_calib)          # colors calibration is saved
+                        save_camera_profile()                    # camera profile is saved, when measured on this cycle
+                    update_fcs_history(solution_Text != 'Error', fcs_delays)  # per-face history for the fix coordinates delay is updated
+                    
+                    if record:                                   # case the frames recording is activated
+                        recorder.stop({'cube_status_string': cube_status_string, 'cdw': cdw, 'margin': best['margin']})  # recording is closed with the detection result
+                    
+                    motion_wait(motion, 'open')                  # waits for the top cover to be open, before solving
+                    
+                    # call the function taking care of solving the cube, making the cube sketch, animation, saving the logs, etc
+                    robot_solve_cube(fixWindPos, screen, frame, faces, ref_colors_BGR, cube_status, 
+                                     URFDLB_facelets_BGR_mean, URFDLB_facelets_HSV_mean, font, fontScale,
+                                     lineType, show_time, timestamp, solution, solution_Text, robot_moves,
+                                     total_robot_moves, est_time, cdw, cube_status_string,
+                                     BGR_mean, start_time, camera_ready_time, cube_detect_time,
+                                     cube_solution_time, slow_time_s, os_version, fcs)
+                    
+                    if fcs == 0:   # (fcs = fix coordinates system) case the all facelets were detected without the fix coordinates method
+                        post.submit(save_coordinates, all_coordinates)  # saves the coordinates of the 4 facelets found during scanning
+
+                    return                       # closes the cube reading/solver function in case it reaches the end
+            
+            elif screen and not robot_stop:                      # case the face is not detected, yet the frame is shown on screen as feedback
+                win.show('cube', frame)                          # frame is queued to the windows worker (latest frame wins)
+        
         
         # AF_cube function closing part
         if timeout==True or robot_stop ==True:       # timeout or robot being stopped
+            if record:                               # case the frames recording is activated
+                recorder.stop({'cube_status_string': '', 'cdw': 'Timeout' if timeout else 'Stop'})  # recording is closed
             quit_func(quit_script=False)             # quit function is called, withou forcing the script quitting
             return                                   # cubeAF function is terminated
     
     # AF_cube function closing part
     if timeout==True or robot_stop ==True:           # timeout or robot being stopped
+        if record:                                   # case the frames recording is activated
+            recorder.stop({'cube_status_string': '', 'cdw': 'Timeout' if timeout else 'Stop'})  # recording is closed
         quit_func(quit_script=False)                 # quit function is called, withou forcing the script quitting
         return                                       # cubeAF function is terminated
 
@@ -4608,6 +6042,7 @@ if __name__ == "__main__":
     global Rpi_ZeroW, cycles_num, picamera_test, quit_script
 
     import sys, time
+    from Cubotino_P_boot import boot   # initialization tasks orchestrator, and boot timeline
     
     
     ################    general settings on how the robot is operated ###############################
@@ -4661,6 +6096,55 @@ if __name__ == "__main__":
         if args.silent:               # case the Cubotino_P.py has been launched with 'silent' argument
             silent = True             # flag to enable/disable the servos is set True
     
+    stage_timings = False             # flag to enable/disable the vision functions timings
+    if args.timings != None:          # case 'timings' argument exists
+        if args.timings:              # case the Cubotino_P.py has been launched with 'timings' argument
+            stage_timings = True      # flag to enable/disable the vision functions timings is set True
+    
+    record = False                    # flag to enable/disable the frames recording at the cube status detection
+    if args.record != None:           # case 'record' argument exists
+        if args.record:               # case the Cubotino_P.py has been launched with 'record' argument
+            record = True             # flag to enable/disable the frames recording is set True
+    
+    settle_detect = False             # flag to enable/disable the motion-settle detection after the flips
+    if args.settle != None:           # case 'settle' argument exists
+        if args.settle:               # case the Cubotino_P.py has been launched with 'settle' argument
+            settle_detect = True      # flag to enable/disable the motion-settle detection is set True
+    
+    five_faces = False                # flag to enable/disable the deduction of the last face, from 5 scanned faces
+    if args.five_faces != None:       # case 'five_faces' argument exists
+        if args.five_faces:           # case the Cubotino_P.py has been launched with 'five_faces' argument
+            five_faces = True         # flag to enable/disable the last face deduction is set True
+    
+    motion_overlap = False            # flag to enable/disable the servos movements via the timeline (with overlaps)
+    if args.overlap != None:          # case 'overlap' argument exists
+        if args.overlap:              # case the Cubotino_P.py has been launched with 'overlap' argument
+            motion_overlap = True     # flag to enable/disable the servos movements via the timeline is set True
+    
+    pipeline = False                  # flag to enable/disable the robot movements on the motion worker (overlapped to other work)
+    if args.pipeline != None:         # case 'pipeline' argument exists
+        if args.pipeline:             # case the Cubotino_P.py has been launched with 'pipeline' argument
+            pipeline = True           # flag to enable/disable the robot movements on the motion worker is set True
+    
+    virtual = False                   # flag to enable/disable the virtual hardware (simulated hardware, replayed frames)
+    if args.virtual != None:          # case 'virtual' argument exists
+        import Cubotino_P_virtual as vh   # virtual hardware backend
+        vh.install(args.virtual)      # simulated modules replace the hardware ones, main thread sleeps on the virtual clock
+        vh.phases.instrument(globals(), virtual_phases)  # robot phases are timed on the virtual clock and on the cpu time
+        virtual = True                # flag to enable/disable the virtual hardware is set True
+        btn = False                   # solving cycles start automatically, one per recorded cycle
+    
+    parallel_init = False             # flag to enable/disable the concurrent initialization of the subsystems
+    if args.parallel_init != None:    # case 'parallel_init' argument exists
+        if args.parallel_init:        # case the Cubotino_P.py has been launched with 'parallel_init' argument
+            parallel_init = True      # flag to enable/disable the concurrent initialization is set True
+    boot.set_parallel(parallel_init)  # initialization tasks run on threads, when parallel_init is set True
+    if parallel_init:                 # case of concurrent initialization
+        import importlib              # used to import the heavy libraries via the boot tasks
+        boot.add('numpy', importlib.import_module, 'numpy')  # numpy import starts now, on a thread
+        boot.add('cv2', importlib.import_module, 'cv2', after=('numpy',))  # openCV import starts after numpy
+        boot.add('solver', import_solver)  # solver import, and its tables loading, starts now on a thread
+    
     slow_time_s = 0                   # slow_time_s is set to zero
     if args.slow_t != None:           # case 'slow_t' argument exists
         slow_time_s = abs((args.slow_t)/10)  # 'slow_t' argument (divided by 10) is assigned to  variable
@@ -4680,6 +6164,7 @@ if __name__ == "__main__":
     param_imported, settings = import_parameters(debug) # imports the parameter from a json file
     if not param_imported:            # case the function import_parameters returns False
         quit_func(quit_script=True)   # qutting function is called, with script clossure
+    boot.mark('settings')             # milestone on the boot timeline
     # ##############################################################################################
 
 
@@ -4692,6 +6177,7 @@ if __name__ == "__main__":
     ################    Display setting       ######################################################
     from Cubotino_P_display import display as disp # sets the display object (the one on the robot)             
     disp.clean_display()                    # cleans the display
+    boot.mark('display')                    # milestone on the boot timeline
     # ##############################################################################################
         
     
@@ -4706,7 +6192,10 @@ if __name__ == "__main__":
 
         
     ################    processor version info    ###################################################
-    with open('/proc/device-tree/model') as f:   # Raspberry Pi board is verified
+    if virtual:                             # case of the virtual hardware (--virtual argument)
+        print("Board: virtual hardware")    # feedback is printed to the terminal
+    else:                                   # case of the robot hardware
+        with open('/proc/device-tree/model') as f:   # Raspberry Pi board is verified
             print("Board:", f.read())       # feedback is printed to the terminal
     
     # when Rpi_ZeroW it uses slightly different openCV comands to prevent crashing (not Zero2W)
@@ -4751,6 +6240,8 @@ if __name__ == "__main__":
     
     ################    screen presence, a pre-requisite for graphical   ############################
     screen_presence = check_screen_presence()             # checks if a screen is connected (also via VNC)
+    if virtual:                                           # case of the virtual hardware (--virtual argument)
+        screen_presence = False                           # cycles run headless
     
     if debug:                                             # case the debug print-out are requested
         print("Screen_presence: ",screen_presence)        # feedback is printed to the terminal
@@ -4793,7 +6284,31 @@ if __name__ == "__main__":
             print('\nCube status detection set for frameless cube') # feedback is printed to the terminal
         elif frameless_cube == 'auto':                    # case the frameless string variale equals to 'auto'
             print('\nCube status detection set for both cubes with and without black frame')   # feedback is printed to the terminal 
-            print('This setting takes slightly longer time for the cube status detection')   # feedback is printed to the terminal
+            print('Edges chains run concurrently, or only the one that worked on the last faces')   # feedback is printed to the terminal
+        
+        if roi_detection and not cv_wow:                  # case the ROI facelets detection is activated
+            print('Facelets search limited to a region around the learned facelets coordinates')  # feedback is printed to the terminal
+        
+        if record:                                        # case the frames recording is activated
+            print('Frames at cube status detection are recorded in FramesRecording folder')  # feedback is printed to the terminal
+        
+        if stage_timings:                                 # case the vision functions timings are activated
+            print('Vision functions timings are logged to CubesDataLog/Cubotino_timings_log.txt')  # feedback is printed to the terminal
+        
+        if settle_detect:                                 # case the motion-settle detection is activated
+            print('Fixed waits after the flips are replaced by the motion-settle detection')  # feedback is printed to the terminal
+        
+        if five_faces:                                    # case the last face deduction is activated
+            print('Last face is deduced from 5 scanned faces, when the completion is unique')  # feedback is printed to the terminal
+        
+        if motion_overlap:                                # case the servos movements via the timeline are activated
+            print('Servos movements via the timeline: top servo moves while the bottom servo releases')  # feedback is printed to the terminal
+        
+        if pipeline:                                      # case the robot movements run on the motion worker
+            print('Robot movements on a worker: faces analysis, solver and collage are done while the servos move')  # feedback is printed to the terminal
+        
+        if parallel_init:                                 # case the subsystems are initialized concurrently
+            print('Heavy imports, solver tables, camera, servos and data files are initialized concurrently')  # feedback is printed to the terminal
         
         if slow_time_s > 0:                               # case slow_time_s is bigger than zero
             print(f'\nEach servo movement is delayed by {slow_time_s} secs')   # feedback is printed to the terminal 
@@ -4811,6 +6326,7 @@ if __name__ == "__main__":
     ###################################    import libraries    ######################################
     print('\nImport libraries:')            # feedback is printed to the terminal    
     import_libraries()                      # imports libraries
+    boot.mark('libraries')                  # milestone on the boot timeline
     # ###############################################################################################
     
     
@@ -4819,6 +6335,9 @@ if __name__ == "__main__":
     print('\nOther settings and environment status:')  # feedback is printed to the terminal
     cycles_num = 0                          # zero is assigned to the (automated) cycles_num variable
     start_up(first_cycle = True)            # sets the initial variables, in this case it is the first cycle
+    boot.mark('ready')                      # milestone on the boot timeline: robot ready for the first cube
+    boot.report()                           # boot timeline is printed to the terminal
+    print(f'CV2 version: {cv2.__version__}')  # print to terminal the cv2 version (imported now, if not used yet)
     solv_cycle = 0                          # variable to count the solving cycles per session is set to zero
     scramb_cycle = 0                        # variable to count the scrambling cycles per session is set to zero
     quit_script = False                     # quit_script is set False
@@ -4863,6 +6382,12 @@ if __name__ == "__main__":
             elif not btn:                   # case the variable btn is set False (testing without the touch button)
                 print('\n\n\n\nCycle is started without using the touch sensor')  # feedback is printed to the terminal
                 cycle = 'solve'             # string 'solve' is returned to start a solving cycle
+                if virtual:                 # case of the virtual hardware (--virtual argument)
+                    meta = camera.next_cycle()  # frames of the next recorded cycle are loaded to the replay camera
+                    if meta is None:        # case all the recorded cycles have been replayed
+                        vh.phases.report()  # phases and simulated hardware counters are printed to the terminal
+                        quit_func(quit_script=True)  # qutting function is called, with script clossure
+                    virtual_setup(meta['params'], camera.cycles_done == 1)  # recorded settings are applied to the cube status detection
             
             if cycle == 'scramble':         # case the chosen cycle is cube scrambling
                 # scramble can be done more times within this inner while loop
@@ -4872,7 +6397,10 @@ if __name__ == "__main__":
             elif cycle == 'solve':          # case the chosen cycle is cube scrambling
                 solv_cycle += 1             # counter, for the number of solving cycles perfomed within a session, is incremented
                 start_solving(solv_cycle)   # start_solving function is called
+                if virtual:                 # case of the virtual hardware (--virtual argument)
+                    vh.phases.cycle_end(solv_cycle)  # phases of the cycle are printed to the terminal
                 start_up(first_cycle = False)  # sets the initial variables, to use the camera in manual mode
+                ready_report()              # ready-for-next-cube latency is printed to the terminal
                 break      # (inner) infinite loop is interrupted once cube solving cycle is done or stopped
       
         if automated:                           # case automated variable is true
@@ -4902,3 +6430,4 @@ if __name__ == "__main__":
                         automated = False       # automated variable is set false, robot waits for solve button commands
                 
                 start_up(first_cycle = False)   # sets the initial variables, to use the camera in manual modeL
+                ready_report()                  # ready-for-next-cube latency is printed to the terminal
@@ -0,0 +1,185 @@
+#!/usr/bin/python
+# coding: utf-8
+
+"""
+#############################################################################################################
+#  Andrea Favero 29 March 2024
+#
+# This script relates to CUBOTino Pocket, a very small and simple Rubik's cube solver robot 3D printed
+# CUBOTino autonomous is the CUBOTino versions for the Rubik's cube 2x2x2.
+# This specific script orchestrates the robot initialization: Each subsystem (heavy imports, solver tables,
+# camera, servos, data files) is declared as a task, with the tasks it depends on.
+# When the parallel initialization is enabled, each task starts on its own thread as soon as declared (after its
+# dependencies are done), and the main thread waits for it only at first use; Otherwise the tasks run on the
+# main thread at first use, in the same order as the sequential initialization.
+# Heavy imports can be assigned as placeholders (lazy), so that the first use is the first attribute access.
+# Every task, and the milestones marked by the main thread, is recorded to a boot timeline printed at the end.
+# This file is imported by Cubotino_P.py
+#
+#############################################################################################################
+"""
+
+import threading, time
+
+
+class Task:
+
+    def __init__(self, name, func, args, kwargs, after):
+        """ Task variables."""
+
+        self.name = name                           # task name
+        self.func = func                           # function executed by the task
+        self.args = args                           # function arguments
+        self.kwargs = kwargs                       # function keyword arguments
+        self.after = after                         # names of the tasks to be done before this one
+        self.done = threading.Event()              # event set when the task is done
+        self.started = False                       # flag tracking whether the task is started
+        self.result = None                         # value returned by func
+        self.error = None                          # exception raised by func
+        self.thread = ''                           # name of the thread executing the task
+        self.t_start = 0                           # task start time, in secs from the boot start
+        self.t_end = 0                             # task end time, in secs from the boot start
+
+
+
+
+class Lazy:
+
+    def __init__(self, boot, name, namespace, var):
+        """ Placeholder of the module returned by the task name, assigned to the variable var of namespace.
+            At the first attribute access the task is waited (or executed), and the variable is replaced by the module."""
+
+        self._boot = boot                          # boot orchestrator
+        self._name = name                          # task name
+        self._namespace = namespace                # namespace (globals dict) holding the variable
+        self._var = var                            # variable name
+
+
+    def __getattr__(self, attr):
+        module = self._boot.wait(self._name)      # task result (the imported module)
+        self._namespace[self._var] = module        # later accesses get the module directly
+        return getattr(module, attr)
+
+
+
+
+class Boot:
+
+    def __init__(self):
+        """ Boot variables; The time reference is the import of this module."""
+
+        self.clock = time.monotonic                # real clock (kept also when the virtual hardware patches time)
+        self.t0 = self.clock()                     # boot start time reference
+        self.parallel = False                      # flag for the parallel initialization
+        self.tasks = {}                            # declared tasks, by name
+        self.marks = []                            # main thread milestones (name, secs from the boot start)
+        self.lock = threading.Lock()               # lock on the tasks start
+
+
+    def now(self):
+        """ Returns the secs since the boot start."""
+        return self.clock() - self.t0
+
+
+    def set_parallel(self, parallel):
+        """ Enables, or disables, the parallel initialization (tasks already declared are not affected)."""
+        self.parallel = parallel
+
+
+    def add(self, name, func, *args, after=(), **kwargs):
+        """ Declares the task name, executing func(*args, **kwargs) after the tasks in after.
+            In parallel mode the task is immediately started on a thread; Tasks already declared are not replaced."""
+
+        with self.lock:                            # tasks dict is not changed by other threads meanwhile
+            if name in self.tasks:                 # case the task is already declared
+                return self.tasks[name]            # the declared task is returned
+            task = Task(name, func, args, kwargs, tuple(after))  # task object
+            task.started = self.parallel           # in parallel mode the task is started right away
+            self.tasks[name] = task                # task is stored
+        if self.parallel:                          # case of parallel initialization
+            threading.Thread(target=self.run, args=(task,), name='boot_'+name, daemon=True).start()  # task thread
+        return task
+
+
+    def run(self, task):
+        """ Executes the task, after waiting for the tasks it depends on."""
+
+        for dep in task.after:                     # iteration over the tasks to be done before
+            self.wait(dep)                         # task dependency is waited (or executed)
+        task.thread = threading.current_thread().name  # thread executing the task
+        task.t_start = self.now()                  # task start time
+        try:                                       # tentative
+            task.result = task.func(*task.args, **task.kwargs)  # task function is executed
+        except BaseException as e:                 # case an exception is raised (SystemExit included)
+            task.error = e                         # exception is stored, and raised at wait()
+        task.t_end = self.now()                    # task end time
+        task.done.set()                            # task is flagged as done
+
+
+    def wait(self, name):
+        """ Returns the result of the task name: A task not yet started is executed by the calling thread,
+            otherwise the task end is waited. Exceptions raised by the task are raised here."""
+
+        task = self.tasks[name]                    # task object
+        with self.lock:                            # the task is not started by two threads
+            start = not task.started               # case the task is not started yet
+            task.started = True                    # task is flagged as started
+        if start:                                  # case the task is not started yet
+            self.run(task)                         # task is executed by the calling thread
+        else:                                      # case the task is started
+            task.done.wait()                       # task end is waited
+        if task.error is not None:                 # case the task raised an exception
+            raise task.error                       # exception is raised to the caller
+        return task.result                         # task result is returned
+
+
+    def lazy(self, name, namespace, var):
+        """ Returns a placeholder for the module imported by the task name, to be assigned to namespace[var]:
+            The task is waited only when the module is used the first time."""
+        return Lazy(self, name, namespace, var)
+
+
+    def mark(self, name):
+        """ Records a main thread milestone in the boot timeline."""
+        self.marks.append((name, self.now()))      # milestone and time are appended
+
+
+    def report(self, width=50):
+        """ Prints the boot timeline: tasks with thread, start, end and duration, followed by the milestones."""
+
+        mode = 'parallel' if self.parallel else 'sequential'  # initialization mode
+        t_end = max([t.t_end for t in self.tasks.values()] + [t for n, t in self.marks] + [0.001])  # timeline end
+        scale = width / t_end                      # chars per sec on the bars
+        print(f'\nBoot timeline ({mode} initialization), secs from the script start:')
+        print(f"{'task':<14}{'thread':<16}{'start':>7}{'end':>7}{'secs':>7}  timeline")
+        for task in sorted(self.tasks.values(), key=lambda t: t.t_start):  # tasks by start time
+            if not task.done.is_set():             # case the task is not done (i.e. never waited in sequential mode)
+                print(f"{task.name:<14}{'-':<16}{'not run':>7}")
+                continue
+            bar = ' '*int(task.t_start*scale) + '#'*max(1, int((task.t_end - task.t_start)*scale))  # task bar
+            print(f'{task.name:<14}{task.thread:<16}{task.t_start:>7.2f}{task.t_end:>7.2f}'
+                  f'{task.t_end - task.t_start:>7.2f}  |{bar}')
+        for name, t in self.marks:                 # iteration over the milestones
+            print(f"{name:<14}{'MainThread':<16}{'':>7}{t:>7.2f}{'':>7}  |{' '*int(t*scale)}^")
+
+
+
+
+boot = Boot()
+
+if __name__ == "__main__":
+    """the main function can be used to test the orchestrator. """
+
+    import sys
+    boot.set_parallel('--sequential' not in sys.argv)
+    boot.add('numpy', time.sleep, 0.5)
+    boot.add('cv2', time.sleep, 1.0, after=('numpy',))
+    boot.add('solver', time.sleep, 0.8)
+    boot.add('camera', time.sleep, 1.2, after=('cv2',))
+    boot.add('servos', time.sleep, 1.0)
+    time.sleep(0.5)
+    boot.mark('display')
+    for name in ('numpy', 'cv2', 'solver', 'camera', 'servos'):
+        boot.wait(name)
+    boot.mark('ready')
+    boot.report()
@@ -0,0 +1,365 @@
+#!/usr/bin/python
+# coding: utf-8
+
+"""
+#############################################################################################################
+#  Andrea Favero 29 March 2024
+#
+# This script relates to CUBOTino Pocket, a very small and simple Rubik's cube solver robot 3D printed
+# CUBOTino autonomous is the CUBOTino versions for the Rubik's cube 2x2x2.
+# This specific script keeps a compact binary cube data log (CubesDataLog/Cubotino_solver_log.bin), written
+# in place of (or next to) the text file Cubotino_solver_log.txt, as per the data_log setting.
+# Each solving cycle is appended as a fixed size record (112 bytes), with the timings as float32 and the date
+# as epoch secs; Records are buffered, and fsync is done once every few records (or secs) and at closing.
+# Text values longer than their field (i.e. a solution longer than 40 chars) raise ValueError, never truncated.
+# Because of the fixed size records, the file can be memory mapped as numpy structured array, and the timings
+# distribution over any time window is computed in a fraction of a second also for millions of cycles.
+#
+# From terminal:
+#   python Cubotino_P_datalog.py stats [--since 20240301] [--until 20240331_235959] [--days 7]
+#   python Cubotino_P_datalog.py export [out.txt]      (text export of the binary log, tab separated)
+#   python Cubotino_P_datalog.py import [log.txt]      (one time build of the binary log from the text log)
+#   python Cubotino_P_datalog.py bench [rows]          (query timing on a synthetic log)
+#
+# This file is imported by Cubotino_P.py
+#
+#############################################################################################################
+"""
+
+import os, struct, time
+import datetime as dt
+
+
+magic = b'CUBPLOG1'                        # file signature, 8 bytes
+head = struct.Struct('<8sII')              # file header: signature, record size, reserved
+rec = struct.Struct('<q6f6B8s24s40s2x')    # record: epoch, 6 timings, 6 small ints, cdw, css, solution, padding
+
+# fields as per rec, also used as numpy structured dtype by the queries
+fields = [('ts','<i8'), ('tot','<f4'), ('warmup','<f4'), ('detect','<f4'), ('solution_t','<f4'),
+          ('solving','<f4'), ('slow','<f4'), ('fcs','u1'), ('screen','u1'), ('flip','u1'),
+          ('frameless','u1'), ('urf_dbl','u1'), ('os','u1'), ('cdw','S8'), ('css','S24'),
+          ('solution','S40'), ('pad','V2')]
+
+# columns of the text log Cubotino_solver_log.txt (CubeColor is not stored in the binary log)
+text_headers = ('Date', 'Screen', 'Flip2close', 'FramelessCube', 'ColorAnalysisWinner', 'TotRobotTime(s)',
+                'CameraWarmUpTime(s)', 'FaceletsDetectionTime(s)', 'CubeSolutionTime(s)', 'RobotSolvingTime(s)',
+                'SlowTime(s)', 'FCS', 'URF/DBL', 'OS_ver', 'CubeStatus', 'CubeSolution', 'CubeColor(BGR or HSV or BRG,HSV)')
+
+# timings columns: (field, header of the text log)
+timings = (('tot', 'TotRobotTime(s)'), ('warmup', 'CameraWarmUpTime(s)'), ('detect', 'FaceletsDetectionTime(s)'),
+           ('solution_t', 'CubeSolutionTime(s)'), ('solving', 'RobotSolvingTime(s)'))
+
+frameless_codes = ('false', 'true', 'auto')  # frameless_cube setting, stored as index
+urf_dbl_codes = ('URF', 'DBL', 'Error')      # URF/DBL column, stored as index
+date_format = '%Y%m%d_%H%M%S'                # date format used by the text log
+
+
+
+
+def default_fname():
+    """ Returns the binary log filename, in the CubesDataLog folder of the active folder."""
+    return os.path.join(os.getcwd(), 'CubesDataLog', 'Cubotino_solver_log.bin')
+
+
+
+
+def to_epoch(timestamp):
+    """ Converts a date string, as per the text log (or only the date part), to epoch secs."""
+    fmt = date_format if '_' in timestamp else date_format[:6]  # format with or without the time
+    return int(dt.datetime.strptime(timestamp, fmt).timestamp())  # local time to epoch secs
+
+
+def to_float(value):
+    """ Converts value to float, nan when not possible."""
+    try:                                   # tentative
+        return float(value)                # value as float
+    except:                                # case the value is not a number
+        return float('nan')                # nan is returned
+
+
+def to_code(value, codes):
+    """ Returns the index of value in the codes tuple, 255 when not in there."""
+    return codes.index(value) if value in codes else 255
+
+
+def from_code(code, codes):
+    """ Returns the codes element at index code, '?' for unknown codes."""
+    return codes[code] if code < len(codes) else '?'
+
+
+
+
+class DataLog:
+
+    def __init__(self, sync_every=8, sync_secs=60):
+        """ Appending variables; The file is opened at the first appended record."""
+
+        self.f = None                      # binary file object
+        self.fname = None                  # binary file name
+        self.sync_every = sync_every       # max quantity of records before fsync
+        self.sync_secs = sync_secs         # max secs before fsync
+        self.unsynced = 0                  # records appended since the last fsync
+        self.t_sync = 0                    # time of the last fsync
+        self.appended = 0                  # records appended in this session
+
+
+    def open(self, fname):
+        """ Opens fname for appending; The header is written to new files, while a trailing partial record
+            (i.e. from a power cut) is truncated away."""
+
+        os.makedirs(os.path.dirname(fname), exist_ok=True)  # folder is made if it doesn't exist
+        os.umask(0)                        # default umask 0o22 turns off write permission of group and others
+        fd = os.open(fname, os.O_CREAT | os.O_RDWR, 0o777)  # file is generated if it does not exist
+        size = os.fstat(fd).st_size        # file size
+        if size < head.size:               # case of new (or truncated header) file
+            os.ftruncate(fd, 0)            # file is emptied
+            os.write(fd, head.pack(magic, rec.size, 0))  # header is written
+        else:                              # case the file has data
+            extra = (size - head.size) % rec.size  # bytes of a partial record
+            if extra:                      # case of a partial record
+                os.ftruncate(fd, size - extra)  # partial record is removed
+                print(f'Removed a partial record from {fname}')  # feedback is printed to the terminal
+        os.lseek(fd, 0, os.SEEK_END)       # position at the file end
+        self.f = os.fdopen(fd, 'ab', buffering=16*rec.size)  # buffered binary file object
+        self.fname = fname                 # file name is stored
+        self.t_sync = time.time()          # time reference for the fsync
+
+
+    def append(self, row, fname=None):
+        """ Appends row (dict with the text log values, keyed by text_headers) to the binary log; fsync is done
+            once every sync_every records, or when more than sync_secs have passed since the previous one.
+            ValueError is raised, and nothing is appended, when a text value does not fit its field."""
+
+        texts = []                         # encoded text values
+        for header, size in (('ColorAnalysisWinner', 8), ('CubeStatus', 24), ('CubeSolution', 40)):  # text fields
+            value = row[header].encode()   # text value as bytes
+            if len(value) > size:          # case the value does not fit the field
+                raise ValueError(f'{header} has {len(value)} chars, the binary log field has {size}: {row[header]}')
+            texts.append(value)            # value is appended to the list
+
+        if self.f is None:                 # case the file is not open yet
+            self.open(fname if fname is not None else default_fname())  # file is opened
+
+        self.f.write(rec.pack(to_epoch(row['Date']),
+                              to_float(row['TotRobotTime(s)']), to_float(row['CameraWarmUpTime(s)']),
+                              to_float(row['FaceletsDetectionTime(s)']), to_float(row['CubeSolutionTime(s)']),
+                              to_float(row['RobotSolvingTime(s)']), to_float(row['SlowTime(s)']),
+                              min(255, int(row['FCS'])) if row['FCS'].isdigit() else 255,
+                              1 if row['Screen'] == 'screen' else 0,
+                              1 if row['Flip2close'] == '1' else 2,
+                              to_code(row['FramelessCube'], frameless_codes),
+                              to_code(row['URF/DBL'], urf_dbl_codes),
+                              min(255, int(row['OS_ver'])) if row['OS_ver'].isdigit() else 255,
+                              *texts))
+        self.appended += 1                 # counter of the appended records
+        self.unsynced += 1                 # counter of the records not yet synced
+        if self.unsynced >= self.sync_every or time.time() - self.t_sync > self.sync_secs:  # case fsync is due
+            self.sync()                    # data is flushed and synced to storage
+
+
+    def sync(self):
+        """ Flushes the buffered records and syncs them to the storage."""
+        if self.f is not None and self.unsynced:  # case of records not yet synced
+            self.f.flush()                 # python buffer is flushed to the OS
+            os.fsync(self.f.fileno())      # OS buffer is written to storage
+            self.unsynced = 0              # counter of the records not yet synced is reset
+        self.t_sync = time.time()          # time reference for the fsync
+
+
+    def close(self):
+        """ Syncs and closes the binary log."""
+        if self.f is not None:             # case the file is open
+            self.sync()                    # pending records are synced
+            self.f.close()                 # file is closed
+            self.f = None                  # file object is reset
+
+
+
+
+def load(fname=None):
+    """ Returns the binary log as numpy structured array (memory mapped, read only)."""
+
+    import numpy as np                     # numpy is imported only when querying
+    fname = fname if fname is not None else default_fname()  # binary log filename
+    with open(fname, 'rb') as f:           # file is temporary opened
+        sign, size, _ = head.unpack(f.read(head.size))  # file header
+    if sign != magic or size != rec.size:  # case of unexpected header
+        raise ValueError(f'{fname} is not a binary cube data log (or it has a different record layout)')
+    rows = (os.path.getsize(fname) - head.size) // rec.size  # quantity of complete records
+    if rows == 0:                          # case of no records
+        return np.zeros(0, dtype=np.dtype(fields))  # empty array
+    return np.memmap(fname, dtype=np.dtype(fields), mode='r', offset=head.size, shape=(rows,))
+
+
+
+
+def window(data, since=None, until=None):
+    """ Returns the records with epoch in [since, until]; Records are appended in time order, so the window
+        edges are found by binary search (a boolean mask is used if the clock went back at some point)."""
+
+    import numpy as np
+    ts = data['ts']                        # epoch column
+    if len(ts) > 1 and np.all(ts[1:] >= ts[:-1]):  # case of sorted epochs
+        lo = 0 if since is None else np.searchsorted(ts, since, side='left')  # first row in window
+        hi = len(ts) if until is None else np.searchsorted(ts, until, side='right')  # last row in window +1
+        return data[lo:hi]                 # rows in window (view, no copy)
+    mask = np.ones(len(ts), dtype=bool)    # case of unsorted epochs: boolean mask
+    if since is not None:
+        mask &= ts >= since
+    if until is not None:
+        mask &= ts <= until
+    return data[mask]                      # rows in window
+
+
+
+
+def stats(data):
+    """ Returns a dict with the distribution (n, mean, min, p5, p25, p50, p75, p95, max) of each timing column."""
+
+    import numpy as np
+    out = {}                               # dict to be returned
+    for field, header in timings:          # iteration over the timings columns
+        col = np.asarray(data[field], dtype=np.float64)  # column values
+        col = col[~np.isnan(col)]          # nan values are removed
+        if len(col) == 0:                  # case of no values
+            out[header] = None             # None is assigned
+            continue
+        p = np.percentile(col, (0, 5, 25, 50, 75, 95, 100))  # percentiles
+        out[header] = {'n':len(col), 'mean':float(col.mean()), 'min':p[0], 'p5':p[1], 'p25':p[2],
+                       'p50':p[3], 'p75':p[4], 'p95':p[5], 'max':p[6]}
+    return out
+
+
+
+
+def print_stats(out, since=None, until=None, rows=0, secs=0):
+    """ Prints the distributions returned by stats()."""
+
+    frm = dt.datetime.fromtimestamp(since).strftime(date_format) if since is not None else 'first'
+    to = dt.datetime.fromtimestamp(until).strftime(date_format) if until is not None else 'last'
+    print(f'\nCycles from {frm} to {to}: {rows} (query in {round(secs*1000, 1)} ms)')
+    keys = ('n', 'mean', 'min', 'p5', 'p25', 'p50', 'p75', 'p95', 'max')
+    print(f"{'column':<26}" + ''.join(f'{k:>8}' for k in keys))
+    for header, d in out.items():
+        if d is None:
+            print(f'{header:<26}' + f"{'-':>8}")
+        else:
+            print(f'{header:<26}' + f"{d['n']:>8}" + ''.join(f'{d[k]:>8.1f}' for k in keys[1:]))
+
+
+
+
+def export(fname=None, out_fname=None):
+    """ Writes the binary log as tab separated text file, with the Cubotino_solver_log.txt columns;
+        CubeColor column is not in the binary log, therefore it is not exported."""
+
+    data = load(fname)                     # binary log as numpy structured array
+    out_fname = out_fname if out_fname is not None else default_fname()[:-4] + '_export.txt'
+    with open(out_fname, 'w') as f:        # text file is temporary opened
+        f.write('\t'.join(text_headers[:-1]) + '\n') # headers, without CubeColor
+        for r in data:                     # iteration over the records
+            f.write('\t'.join((dt.datetime.fromtimestamp(int(r['ts'])).strftime(date_format),
+                               'screen' if r['screen'] else 'no screen',
+                               str(r['flip']),
+                               from_code(r['frameless'], frameless_codes),
+                               r['cdw'].decode(),
+                               *(str(round(float(r[k]), 1)) for k in ('tot', 'warmup', 'detect', 'solution_t', 'solving', 'slow')),
+                               str(r['fcs']) if r['fcs'] != 255 else '',
+                               from_code(r['urf_dbl'], urf_dbl_codes),
+                               str(r['os']) if r['os'] != 255 else '',
+                               r['css'].decode(),
+                               r['solution'].decode())) + '\n')
+    print(f'Exported {len(data)} records to {out_fname}')
+    return out_fname
+
+
+
+
+def import_text(txt_fname=None, fname=None):
+    """ Builds the binary log from the text log Cubotino_solver_log.txt (i.e. one time, for the cycles logged
+        before the binary log existed); Older text logs, with less columns, are handled via the headers."""
+
+    txt_fname = txt_fname if txt_fname is not None else default_fname()[:-4] + '.txt'
+    fname = fname if fname is not None else default_fname()
+    if os.path.exists(fname):              # case the binary log already exists
+        print(f'{fname} already exists, import skipped')
+        return 0
+    binlog = DataLog(sync_every=4096)      # appender with large fsync batches
+    binlog.open(fname)                     # binary log is generated
+    defaults = {'Screen':'screen', 'Flip2close':'2', 'FramelessCube':'?', 'ColorAnalysisWinner':'',
+                'SlowTime(s)':'0', 'FCS':'', 'URF/DBL':'?', 'OS_ver':'', 'CubeStatus':'', 'CubeSolution':''}
+    skipped = 0                            # counter of the not imported lines
+    with open(txt_fname, 'r') as f:        # text log is temporary opened
+        headers = f.readline().rstrip('\n').split('\t')  # headers of the text log
+        for line in f:                     # iteration over the data lines
+            row = dict(defaults)           # default values, for the columns missing in older logs
+            row.update(zip(headers, line.rstrip('\n').split('\t')))  # values of the line
+            try:                           # tentative
+                binlog.append(row)         # record is appended
+            except:                        # case the line cannot be converted
+                skipped += 1               # counter of the not imported lines is incremented
+    binlog.close()                         # binary log is synced and closed
+    print(f'Imported {binlog.appended} records from {txt_fname} to {fname}' + (f', {skipped} lines skipped' if skipped else ''))
+    return binlog.appended
+
+
+
+
+datalog = DataLog()
+
+if __name__ == "__main__":
+    """the main function is the query tool of the binary log. """
+
+    import argparse, tempfile
+
+    def parse_date(s):
+        return None if s is None else to_epoch(s)
+
+    parser = argparse.ArgumentParser(description='Query tool for the CUBOTino binary cube data log')
+    parser.add_argument('cmd', choices=('stats', 'export', 'import', 'bench'), help='action')
+    parser.add_argument('arg', nargs='?', default=None, help='export: out file, import: text log, bench: rows')
+    parser.add_argument('--file', type=str, default=None, help='binary log (default CubesDataLog/Cubotino_solver_log.bin)')
+    parser.add_argument('--since', type=str, default=None, help='window start, YYYYmmdd or YYYYmmdd_HHMMSS')
+    parser.add_argument('--until', type=str, default=None, help='window end, YYYYmmdd or YYYYmmdd_HHMMSS')
+    parser.add_argument('--days', type=float, default=None, help='window of the last days (overrides --since)')
+    args = parser.parse_args()
+
+    if args.cmd == 'import':
+        import_text(args.arg, args.file)
+
+    elif args.cmd == 'export':
+        export(args.file, args.arg)
+
+    elif args.cmd == 'stats':
+        since, until = parse_date(args.since), parse_date(args.until)
+        if args.until is not None and '_' not in args.until:  # case of date only: whole day is included
+            until += 86399
+        if args.days is not None:
+            since = int(time.time() - args.days * 86400)
+        t_ref = time.perf_counter()
+        data = window(load(args.file), since, until)
+        out = stats(data)
+        print_stats(out, since, until, len(data), time.perf_counter() - t_ref)
+
+    elif args.cmd == 'bench':
+        import numpy as np
+        rows = int(args.arg) if args.arg is not None else 2000000
+        fname = os.path.join(tempfile.mkdtemp(), 'bench_log.bin')
+        arr = np.zeros(rows, dtype=np.dtype(fields))
+        arr['ts'] = int(time.time()) - rows * 60 + np.arange(rows) * 60  # one cycle per minute
+        rng = np.random.default_rng(0)
+        for k, mu in (('tot', 60), ('warmup', 2), ('detect', 15), ('solution_t', 1), ('solving', 40)):
+            arr[k] = rng.normal(mu, mu * 0.1, rows)
+        with open(fname, 'wb') as f:
+            f.write(head.pack(magic, rec.size, 0))
+            arr.tofile(f)
+        print(f'Synthetic log with {rows} records ({round(os.path.getsize(fname)/1e6, 1)} MB)')
+        t_ref = time.perf_counter()
+        data = load(fname)
+        full = stats(data)
+        print_stats(full, None, None, len(data), time.perf_counter() - t_ref)
+        since = int(arr['ts'][rows//2])
+        t_ref = time.perf_counter()
+        data = window(load(fname), since, None)
+        print_stats(stats(data), since, None, len(data), time.perf_counter() - t_ref)
+        os.remove(fname)
@@ -7,6 +7,10 @@
 #
 # This script relates to CUBOTino Pocket, a small and simple solver robot for a 2x2x2 Rubik's cube
 # This specific script manages the display, and it's imported by Cubotino_P.py and Cubotino_P_servos.py
+# A worker thread renders the frames and sends them to the display (SPI), so that the servos and the cube
+# detection never wait on the display; A newer frame replaces the queued ones not yet sent (latest wins).
+# The progress bar, the cube sketch and the logo are converted once to RGB565 bytes (the display format), and
+# cached: Following updates only send the changed window of the display, instead of the full frame.
 #
 #############################################################################################################
 """
@@ -16,14 +20,31 @@ from Cubotino_P_pigpiod import pigpiod as pigpiod # start the pigpiod server
 from PIL import Image, ImageDraw, ImageFont  # classes from PIL for image manipulation
 import ST7735                                # library for the TFT display with ST7735 driver
 import os.path, pathlib                      # library for path management
+import threading                             # library for the display worker thread
+from collections import deque                # library for the display jobs queue
 
 
 class Display:
     display_initialized = False
+    thread = None
     def __init__(self):
         """ Imports and set the display (128 x 160 pixels) https://www.az-delivery.de/it/products/1-77-zoll-spi-tft-display.
             In my (AF) case was necessary to play with offset and display dimensions (pixels) to get an acceptable result.
-            For a faster display init: Reduce the time.sleep to 0.1 (3 times, iso 0.5) at reset at __init__ of ST7735 module."""
+            For a faster display init: Reduce the time.sleep to 0.1 (3 times, iso 0.5) at reset at __init__ of ST7735 module.
+            The worker thread is started at the first init; At re-init, the queued jobs are completed first."""
+        
+        if self.thread is None:                                       # case the worker thread has not been started yet
+            self.fonts = {}                                           # dict of the loaded fonts, with font size as key
+            self.jobs = deque()                                       # queue of the display jobs (frames and backlight)
+            self.cond = threading.Condition()                         # condition to synchronize the worker thread
+            self.busy = False                                         # flag tracking whether the worker is executing a job
+            self.frames_sent = 0                                      # counter of the frames sent to the display
+            self.frames_dropped = 0                                   # counter of the frames replaced before being sent
+            self.rotation = 270                                       # display image orientation
+            self.thread = threading.Thread(target=self.run, name='display', daemon=True)  # worker thread
+            self.thread.start()                                       # worker thread is started
+        else:                                                         # case of display re-initialization
+            self.wait()                                               # queued jobs are completed, before touching the hardware
             
         if not self.display_initialized:
             s = settings.get_settings()                               # settings are retrieved from the settings Class
@@ -46,20 +67,26 @@ class Display:
                                 height=self.disp_height,   #(AF 162)  # see note above for width and height !!!                         
                                 offset_left=self.disp_offsetL,        # see note above for offset  !!!
                                 offset_top=self.disp_offsetT,         # see note above for offset  !!!
-                                rotation=270,                         # image orientation
+                                rotation=self.rotation,               # image orientation
                                 invert=False,                         # image invertion,
                                 spi_speed_hz=10000000)                # SPI frequence
         
             self.disp.set_backlight(0)                                # display backlight is set off
             self.disp_w = self.disp.width                             # display width, retrieved by display setting
             self.disp_h = self.disp.height                            # display height, retrieved by display setting
-            disp_img = Image.new('RGB', (self.disp_w, self.disp_h),color=(0, 0, 0))   # display image generation, full black
-            self.disp.display(disp_img)                               # image is displayed
+            self.canvas = Image.new('RGB', (self.disp_w, self.disp_h),color=(0, 0, 0))   # display image generation, full black
+            self.disp.display(self.canvas)                            # image is displayed
+            self.cache = {}                                           # cache of the RGB565 buffers, emptied at every (re)init
+            self.bar_rows = {}                                        # rows of the progress bar filling, per scrambling flag
+            self.shown = None                                         # key of the (cached) frame on display, None if other
+            self.last = None                                          # key of the frame on display, before the current job
+            self.windowed = hasattr(self.disp, 'set_window') and hasattr(self.disp, 'image_to_data')  # windowed writes check
             if not self.display_initialized:                          # case display_initialized is set False
                 print("\nDisplay initialized\n")                      # feedback is printed to the terminal
                 self.display_initialized = True                       # display_initialized is set True
         
         # loading the CUBOTino logo
+        self.logo_by = None                                           # built_by text drawn on the logo (None when not drawn)
         folder = pathlib.Path().resolve()                             # active folder (should be home/pi/cube)
         fname = "Cubotino_P_Logo_265x212_BW.jpg"                      # file name with logo image
         fname = os.path.join(folder,fname)                            # folder and file name for the logo image
@@ -71,25 +98,131 @@ class Display:
             print("Cubotino logo image is missed\n")                  # feedback is printedto terminal
             self.logo = Image.new('RGB', (self.disp_w, self.disp_h), color=(0, 0, 0))  # full black screen as new image
             logo_text = ImageDraw.Draw(self.logo)                     # image is drawned
-            f1 = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 26)  # font and size
-            f2 = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 22)  # font and size
-            logo_text.text((10, 44), "CUBOT", font=f1, fill=(255, 255, 255))  # text, font, white color
-            logo_text.text((112, 48), "ino", font=f2, fill=(255, 255, 255))   # text, font, white color
+            logo_text.text((10, 44), "CUBOT", font=self.font(26), fill=(255, 255, 255))  # text, font, white color
+            logo_text.text((112, 48), "ino", font=self.font(22), fill=(255, 255, 255))   # text, font, white color
+
+
+
+
+    def font(self, fs):
+        """ Returns the font with size fs; Fonts are loaded once, and kept in the fonts dict."""
+        
+        font = self.fonts.get(fs)                                  # font is retrieved from the loaded ones
+        if font is None:                                           # case the font size has not been loaded yet
+            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", fs)  # font and size
+            self.fonts[fs] = font                                  # font is added to the loaded ones
+        return font
+
+
+
+
+    def blank(self):
+        """ Returns the (reused) display image, set to full black, and its draw object.
+            This is only called by the worker thread, once the previous frame has been sent to the display."""
+        
+        self.canvas.paste((0, 0, 0), (0, 0, self.disp_w, self.disp_h))  # image is set to full black
+        return self.canvas, ImageDraw.Draw(self.canvas)            # image and its draw object are returned
+
+
+
+
+    def put(self, func, *args, frame=True):
+        """ Queues a job for the worker thread: func(*args) is executed by the worker, in the queued order.
+            When frame is True, the queued frames not yet sent are dropped (latest wins), as they'd be replaced anyway."""
+        
+        with self.cond:                                            # condition lock is acquired
+            if frame:                                              # case the job is a frame
+                stale = [job for job in self.jobs if job[0]]       # queued frames not yet sent
+                for job in stale:                                  # iteration over the stale frames
+                    self.jobs.remove(job)                          # stale frame is dropped
+                self.frames_dropped += len(stale)                  # counter of the dropped frames is updated
+            self.jobs.append((frame, func, args))                  # job is queued
+            self.cond.notify_all()                                 # worker thread is notified
+
+
+
+
+    def wait(self, timeout=2):
+        """ Waits (max timeout secs) for the queued jobs to be done, i.e. before quitting or re-init the display."""
+        
+        with self.cond:                                            # condition lock is acquired
+            self.cond.wait_for(lambda: len(self.jobs) == 0 and not self.busy, timeout)  # waits for empty queue and idle worker
+
+
+
+
+    def run(self):
+        """ Worker thread: executes the queued jobs, rendering the frames and sending them to the display."""
+        
+        while True:                                                # infinite loop
+            with self.cond:                                        # condition lock is acquired
+                self.cond.wait_for(lambda: len(self.jobs) > 0)     # waits for a queued job
+                frame, func, args = self.jobs.popleft()            # oldest job is retrieved
+                self.busy = True                                   # flag tracking the worker activity is set True
+            if frame:                                              # case the job is a frame
+                self.last, self.shown = self.shown, None           # cached frames set shown, after sending their frame
+            try:                                                   # tentative
+                func(*args)                                        # job is executed
+                if frame:                                          # case the job is a frame
+                    self.frames_sent += 1                          # counter of the frames sent is incremented
+            except Exception as e:                                 # case an exception is raised
+                print(f'Exception at the display worker: {e}')     # feedback is printed to the terminal
+            with self.cond:                                        # condition lock is acquired
+                self.busy = False                                  # flag tracking the worker activity is set False
+                self.cond.notify_all()                             # waiting threads are notified
+
+
+
+
+    def to565(self, image):
+        """ Returns the image converted to the display RGB565 format (bytes, rotated as the display)."""
+        return bytes(self.disp.image_to_data(image, self.rotation))
+
+
+
+
+    def send(self, box, buf):
+        """ Sends the RGB565 bytes buf to the box window (x0, y0, x1, y1 with end excluded) of the display.
+            box is in the image coordinates, converted here to the display coordinates (rotation)."""
+        
+        x0, y0, x1, y1 = box                                       # window coordinates, as per image
+        w, h = self.disp_w, self.disp_h                            # image width and height
+        k = (self.rotation//90)%4                                  # quantity of 90deg rotations (CCW, as per np.rot90)
+        corners = []                                               # window corners in the display coordinates
+        for x, y in ((x0, y0), (x1-1, y1-1)):                      # iteration over the window corners (end included)
+            if k == 0:                                             # case of no rotation
+                corners.append((x, y))                             # display coordinates
+            elif k == 1:                                           # case of 90deg rotation
+                corners.append((y, w-1-x))                         # display coordinates
+            elif k == 2:                                           # case of 180deg rotation
+                corners.append((w-1-x, h-1-y))                     # display coordinates
+            else:                                                  # case of 270deg rotation
+                corners.append((h-1-y, x))                         # display coordinates
+        (a, b), (c, d) = corners                                   # window corners in the display coordinates
+        self.disp.set_window(min(a, c), min(b, d), max(a, c), max(b, d))  # display window is set
+        self.disp.data(list(buf))                                  # pixels data are sent to the display window
 
 
 
 
     def set_backlight(self, value):
         """Set the backlight on/off."""
-        self.disp.set_backlight(value)
+        self.put(self.disp.set_backlight, value, frame=False)      # backlight command is queued
 
 
 
 
     def clean_display(self):
         """ Cleans the display by settings all pixels to black."""
-        disp_img = Image.new('RGB', (self.disp_w, self.disp_h), color=(0, 0, 0))  # full black screen as new image
-        self.disp.display(disp_img)                                               # display is shown to display
+        self.put(self.draw_clean)                                  # frame is queued
+
+
+
+
+    def draw_clean(self):
+        """ Worker side of clean_display."""
+        disp_img, disp_draw = self.blank()                         # full black image
+        self.disp.display(disp_img)                                # display is shown to display
 
 
 
@@ -101,33 +234,79 @@ class Display:
             y1, y2, y3: y coordinate for text at row1, row2 and row3
             fs1, fs2, fs3: font size for text at row1, row2 and row3
             """
+        self.put(self.draw_text, r1, r2, x1, y1, x2, y2, fs1, fs2, r3, x3, y3, fs3)  # frame is queued
+
+
+
+
+    def draw_text(self, r1, r2, x1, y1, x2, y2, fs1, fs2, r3, x3, y3, fs3):
+        """ Worker side of show_on_display."""
         
-        font1 = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", fs1)  # font and size for first text row
-        font2 = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", fs2)  # font and size for second text row
-        disp_img = Image.new('RGB', (self.disp_w, self.disp_h), color=(0, 0, 0))  # full black image
-        disp_draw = ImageDraw.Draw(disp_img)                               # image is drawned
-        disp_draw.text((x1, y1), r1, font=font1, fill=(255, 255, 255))     # first text row start coordinate, text, font, white color
-        disp_draw.text((x2, y2), r2, font=font2, fill=(255, 255, 255))     # second text row start coordinate, text, font, white color
+        disp_img, disp_draw = self.blank()                                 # full black image
+        disp_draw.text((x1, y1), r1, font=self.font(fs1), fill=(255, 255, 255))  # first text row start coordinate, text, font, white color
+        disp_draw.text((x2, y2), r2, font=self.font(fs2), fill=(255, 255, 255))  # second text row start coordinate, text, font, white color
         if r3 != '':                                                       # case r3 differs from empty string
-            font3 = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", fs3)  # font and size for third text row
-            disp_draw.text((x3, y3), r3, font=font3, fill=(255, 255, 255)) # third text row start coordinate, text, font, white color
+            disp_draw.text((x3, y3), r3, font=self.font(fs3), fill=(255, 255, 255)) # third text row start coordinate, text, font, white color
         self.disp.display(disp_img)                                        # image is plot to the display
 
 
 
 
     def display_progress_bar(self, percent, scrambling=False):
-        """ Function to print a progress bar on the display."""
+        """ Function to print a progress bar on the display.
+            Called at every robot move: When the display is slower than the servos, the older progress frames are dropped."""
+        self.put(self.draw_progress_bar, percent, scrambling)      # frame is queued
+
+
+
+
+    def draw_progress_bar(self, percent, scrambling):
+        """ Worker side of display_progress_bar.
+            When the progress bar is already on display, only the percent text (cached per percent value) and
+            the bar filling difference are sent to the display."""
+        
+        key = ('progress', scrambling)                             # cache key for the progress bar frames
+        if not self.windowed or percent not in range(101):         # case of no windowed writes, or unexpected percent value
+            disp_img, filled = self.render_progress_bar(percent, scrambling)  # progress bar image
+            self.disp.display(disp_img)                            # image is plotted to the display
+            return                                                 # function is terminated
+        
+        cache = self.cache.setdefault(key, {})                     # cached text windows for this progress bar
+        if percent not in cache:                                   # case the percent value has not been rendered yet
+            disp_img, filled = self.render_progress_bar(percent, scrambling)  # progress bar image
+            cache[percent] = (filled, self.to565(disp_img.crop(self.text_box)))  # bar filling and text window, as RGB565
+        else:                                                      # case the percent value is cached
+            disp_img = None                                        # full image is not needed (unless for the first frame)
+        
+        if self.last is None or self.last[0] != key:               # case the progress bar is not on display
+            if disp_img is None:                                   # case the full image has not been rendered
+                disp_img, filled = self.render_progress_bar(percent, scrambling)  # progress bar image
+            self.disp.display(disp_img)                            # full image is plotted to the display
+        else:                                                      # case the progress bar is on display
+            filled, text = cache[percent]                          # bar filling and text window of the new percent
+            self.send(self.text_box, text)                         # percent text window is sent to the display
+            filled_old = cache[self.last[1]][0]                    # bar filling of the percent on display
+            if filled != filled_old:                               # case the bar filling changes
+                x0, x1 = min(filled, filled_old)+1, max(filled, filled_old)+1   # columns changing
+                y0, y1 = self.bar_rows[scrambling]                 # rows of the bar filling
+                color = b'\xff\xff' if filled > filled_old else b'\x00\x00'  # white when filling, black otherwise (RGB565)
+                self.send((x0, y0, x1, y1), color*((x1-x0)*(y1-y0)))  # bar filling difference is sent to the display
+        self.shown = (key, percent)                                # progress bar frame on display
+
+
+
+
+    def render_progress_bar(self, percent, scrambling):
+        """ Returns the progress bar image, and the x coordinate of the bar filling end."""
         
         w = self.disp_w                                            # display width, retrieved by display setting
         
         # percent value printed as text 
         fs = 40                 # font size
-        font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", fs)     # font and its size
+        font = self.font(fs)    # font and its size
         text_x = int(w/2 - (fs*len(str(percent))+1)/2)             # x coordinate for the text starting location         
         text_y = 15                                                # y coordinate for the text starting location
-        disp_img = Image.new('RGB', (w, self.disp_h), color=(0, 0, 0)) # full black image
-        disp_draw = ImageDraw.Draw(disp_img)                        # image is drawned
+        disp_img, disp_draw = self.blank()                         # full black image
         disp_draw.text((text_x, text_y), str(percent)+'%', font=font, fill=(255, 255, 255))    # text with percent value
         
         # percent value printed as progress bar filling 
@@ -139,7 +318,7 @@ class Display:
         elif scrambling:        # case the robot is scrambling a cube
             barWidth = 18       # width of the bar, in pixels
             fs = 18             # font size
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", fs)  # font and its size
+            font = self.font(fs)  # font and its size
             disp_draw.text((15, 85), 'SCRAMBLING', font=font, fill=(255, 255, 255))                # SCRAMBLING text
             
         barLength = w-2*x-4 #135   # lenght of the bar, in pixels
@@ -147,31 +326,50 @@ class Display:
         disp_draw.rectangle((x, y, x+barLength, y+barWidth), outline="white", fill=(0,0,0))      # outer bar border
         disp_draw.rectangle((x+gap, y+gap, filledPixels, y+barWidth-gap), fill=(255,255,255)) # bar filling
         
-        self.disp.display(disp_img) # image is plotted to the display
+        self.text_box = (max(0, int(w/2 - (40*3+1)/2)), text_y, w, y)   # window with the percent text (up to 3 digits)
+        self.bar_rows[scrambling] = (y+gap, y+barWidth-gap+1)      # rows of the bar filling (end excluded)
+        return disp_img, filledPixels
 
 
 
 
     def show_cubotino(self, built_by='', x=25, fs=22):
         """ Shows the Cubotino logo on the display."""
+        self.put(self.draw_cubotino, built_by, x, fs)                  # frame is queued
+
+
+
+
+    def draw_cubotino(self, built_by, x, fs):
+        """ Worker side of show_cubotino."""
         
-        if built_by != '': 
+        if built_by != '' and self.logo_by != (built_by, x, fs):      # case the built_by text is not on the logo yet
             disp_draw = ImageDraw.Draw(self.logo)                      # logo is plotted to display
-            font1 = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 14)  # font1
-            disp_draw.text((15, 10), "Andrea FAVERO's", font=font1, fill=(0, 0, 255)) # first row text test
-            
-            font2 = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 10)  # font1
-            disp_draw.text((60, 85), "Built by", font=font2, fill=(255, 255, 255))    # second row text test
-            
-            font3 = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", fs)  # font1
-            disp_draw.text((x, 106), built_by, font=font3, fill=(255, 0, 0))          # third row text test
-        self.disp.display(self.logo)                                   # draws the logo on the display hardware.
+            disp_draw.text((15, 10), "Andrea FAVERO's", font=self.font(14), fill=(0, 0, 255)) # first row text test
+            disp_draw.text((60, 85), "Built by", font=self.font(10), fill=(255, 255, 255))    # second row text test
+            disp_draw.text((x, 106), built_by, font=self.font(fs), fill=(255, 0, 0))          # third row text test
+            self.logo_by = (built_by, x, fs)                           # built_by text drawn on the logo
+            self.cache.pop('logo', None)                               # cached logo is outdated
+        
+        if not self.windowed:                                          # case of no windowed writes
+            self.disp.display(self.logo)                               # draws the logo on the display hardware.
+        else:                                                          # case of windowed writes
+            if 'logo' not in self.cache:                               # case the logo is not cached
+                self.cache['logo'] = self.to565(self.logo)             # logo is converted to RGB565, and cached
+            self.send((0, 0, self.disp_w, self.disp_h), self.cache['logo'])  # draws the logo on the display hardware.
 
 
 
 
     def show_face(self, side, colours=[]):
         """ Function to print a sketch of the cube face colours."""
+        self.put(self.draw_face, side, list(colours))      # frame is queued (with a copy of the colours)
+
+
+
+
+    def draw_face(self, side, colours):
+        """ Worker side of show_face."""
         
         w = self.disp_w                                    # display width, retrieved by display setting
         h = self.disp_h                                    # display height, retrieved by display setting
@@ -181,12 +379,9 @@ class Display:
         x_start = w-10-2*d                                 # x coordinate for face top-left corner
         gap = 3                                            # gap betwen the facelets border and facelets coloured part
         
-        font1 = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 17)  # font1
-        font2 = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 70)  # font1
-        disp_img = Image.new('RGB', (w, h), color=(0, 0, 0))  # full black image
-        disp_draw = ImageDraw.Draw(disp_img)               # image is drawned
-        disp_draw.text((12, 25), 'FACE', font=font1, fill=(255, 255, 255))   # first row text test
-        disp_draw.text((9, 40), faces[side], font=font2, fill=(255, 255, 255))   # first row text test
+        disp_img, disp_draw = self.blank()                 # full black image
+        disp_draw.text((12, 25), 'FACE', font=self.font(17), fill=(255, 255, 255))   # first row text test
+        disp_draw.text((9, 40), faces[side], font=self.font(70), fill=(255, 255, 255))   # first row text test
         self.disp.set_backlight(1)                         # display backlight is set on
         
         fclt = 0
@@ -209,7 +404,8 @@ class Display:
     
     
     def plot_status(self, cube_status, ref_colors_BGR={}, startup=False):
-        """ Function to print the cube sketch of the cube colors."""
+        """ Function to print the cube sketch of the cube colors.
+            The startup settings are done on the caller side, the facelets drawing by the worker thread."""
         
         if startup:
             self.c = {'U':(ref_colors_BGR[0]), 'R':(ref_colors_BGR[1]), 'F':(ref_colors_BGR[2]),
@@ -242,22 +438,46 @@ class Display:
                         x = x+self.d                       # x coordinate is increased by square side
                         if j == 1: y = y+self.d            # once at the second column the row is incremented
             self.tlc = tuple(tlc)                          # tlc list is converted to tuple
-            
+        
+        self.put(self.draw_status, list(cube_status), self.c, startup)  # frame is queued (with a copy of the cube status)
+        self.set_backlight(1)                              # display backlight is set on
+
+
+
+
+    def draw_status(self, cube_status, c, startup):
+        """ Worker side of plot_status.
+            When the cube sketch is already on display, only the facelets changing color are sent to the display,
+            with the RGB565 facelet squares cached per color."""
+        
+        if startup or self.last is None or self.last[0] != 'status':   # case the cube sketch is not on display
             self.disp_img = Image.new('RGB', (self.disp_w, self.disp_h), color=(0, 0, 0))  # full black image
             self.disp_draw = ImageDraw.Draw(self.disp_img) # image is drawned
-            
+            self.status_shown = [None]*len(cube_status)    # no facelets colors on display
+            full = True                                    # full image has to be sent to the display
+        else:                                              # case the cube sketch is on display
+            full = not self.windowed                       # full image is sent only without windowed writes
         
         # below part gets updated at every new cube_status sent
         for i, color in enumerate(cube_status):            # iteration over the 24 facelets interpreted colors
-            B,G,R = self.c[color]                          # BGR values of the assigned colors for the corresponding detected color
+            if color == self.status_shown[i]:              # case the facelet color is already on display
+                continue                                   # next facelet
+            B,G,R = c[color]                               # BGR values of the assigned colors for the corresponding detected color
             x = self.tlc[i][0]+self.g                      # x coordinate for the origin-square colored facelet
             y = self.tlc[i][1]+self.g                      # y coordinate for the origin-square colored facelet
             dx = x + self.d - self.gg                      # x coordinate for the end-square colored facelet
             dy = y + self.d - self.gg                      # y coordinate for the end-square colored facelet
             self.disp_draw.rectangle((x, y, dx, dy), (B,G,R))   # cube sketch grid
+            self.status_shown[i] = color                   # facelet color on display
+            if not full:                                   # case of windowed writes
+                key = ('facelet', (B,G,R), dx-x+1)         # cache key for the facelet square
+                if key not in self.cache:                  # case the facelet square is not cached
+                    self.cache[key] = self.to565(self.disp_img.crop((x, y, dx+1, dy+1)))  # facelet square, as RGB565
+                self.send((x, y, dx+1, dy+1), self.cache[key])  # facelet square is sent to the display
         
-        self.disp.display(self.disp_img)                   # image is drawned
-        self.disp.set_backlight(1)                         # display backlight is set on
+        if full:                                           # case the full image has to be sent
+            self.disp.display(self.disp_img)               # image is drawned
+        self.shown = ('status',)                           # cube sketch frame on display
 
     
     
@@ -273,11 +493,11 @@ class Display:
         w = self.disp_w                                            # display width, retrieved by display setting
         h = self.disp_h                                            # display height, retrieved by display setting
         
-        font1 = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 20)  # font1
-        font2 = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 16)  # font2
+        font1 = self.font(20)                                      # font1
+        font2 = self.font(16)                                      # font2
         disp_img = Image.new('RGB', (w, h), color=(0, 0, 0))      # full black image
         
-        self.disp.set_backlight(1)                                        # display backlight is set on
+        self.set_backlight(1)                                             # display backlight is set on
         start = time.time()                                               # time refrence for countdown
         timeout = 20.5                                                    # timeout
         while time.time() < start + timeout:                              # while loop until timeout
@@ -298,7 +518,7 @@ class Display:
                 disp_draw.text((pos, h-36), t_left_str , font=font2, fill=(0, 0, 255))  # timeout text
                 disp_draw.text((30, 25), 'DISPLAY', font=font1, fill=(255, 255, 255))  # first row text test
                 disp_draw.text((33, 75), 'TEST', font=font1, fill=(255, 255, 255))  # second row text test
-                self.disp.display(disp_img)                               # image is drawned
+                self.put(self.disp.display, disp_img)                     # image is drawned
                 time.sleep(0.1)                                           # little sleeping time   
             else:                                                         # case the time left is odd
                 self.show_cubotino(self.built_by, self.built_by_x, self.built_by_fs)  # cubotino logo is displayed
@@ -310,7 +530,7 @@ class Display:
         self.show_cubotino(self.built_by, self.built_by_x, self.built_by_fs)  # cubotino logo is show to display
         time.sleep(2)                                                     # little delay
         self.clean_display()                                              # display is set to full black
-        self.disp.set_backlight(0)                                        # display backlight is set off
+        self.set_backlight(0)                                             # display backlight is set off
         print("Display test1 finished\n")                                 # feedback is printed to the terminal
 
 
@@ -332,7 +552,7 @@ class Display:
             display.show_face(f+1, bgr)                               # display shows the face letter and facelets colours
             time.sleep(3)                                             # sleep time to let user time to evaluate the display
         self.clean_display()                                          # display is set to full black
-        self.disp.set_backlight(0)                                    # display backlight is set off
+        self.set_backlight(0)                                         # display backlight is set off
         print("Display test2 finished\n")                             # feedback is printed to the terminal
 
 
@@ -354,6 +574,7 @@ if __name__ == "__main__":
     display.test1_display()
     display.test2_display()
     display.set_backlight(0)
+    display.wait()
 
 
 ##### test show_face, random colors #####
@@ -0,0 +1,324 @@
+#!/usr/bin/python
+# coding: utf-8
+
+"""
+#############################################################################################################
+#  Andrea Favero 29 March 2024
+#
+# This script relates to CUBOTino Pocket, a very small and simple Rubik's cube solver robot 3D printed
+# CUBOTino autonomous is the CUBOTino versions for the Rubik's cube 2x2x2.
+# This specific script expands the robot moves string into a timeline of servo events, and runs it.
+# Each event depends on the events that have to be completed before (safety interlocks):
+#  - the bottom servo rotates the first layer only with the top cover steady at close position,
+#  - the bottom servo spins the cube only with the top cover steady at open position,
+#  - the top servo moves only when the bottom servo is steady, or while it is releasing the tensions.
+# The last rule is the only overlap: the top cover starts moving while the bottom servo backs off.
+# Events are executed on a monotonic clock, via a servo backend; A simulated backend (virtual clock)
+# checks the interlocks, and it is used to predict the time saving without the robot.
+# This file is imported by Cubotino_P_servos.py
+# When launched, this script prints the serial and scheduled time of a moves string (simulated backend).
+#
+#############################################################################################################
+"""
+
+import time
+
+
+class Timeline:
+
+    def __init__(self, p, cover='read', holder='home', overlap=True, slow_time=0):
+        """ Timeline variables are initialized.
+            p is a dict with the servos positions and timers, cover and holder are the starting positions
+            of the top cover and of the cube holder; When overlap is False the events are fully serialized."""
+
+        self.p = p                                 # servos positions and timers
+        self.cover = cover                         # top cover position ('close', 'open', 'read', 'flip')
+        self.holder = holder                       # cube holder position ('home', 'CW', 'CCW')
+        self.overlap = overlap                     # flag to allow the top servo moving while the bottom releases
+        self.slow_time = slow_time                 # additional time per servo movement (as per the servos functions)
+        self.events = []                           # list of the servo events
+        self.last = {'top': None, 'bottom': None, 'main': None}  # index of the last top, bottom and bottom main events
+        self.progress = None                       # progress percent, assigned to the next event
+
+
+    def add(self, servo, value, secs, kind, pos=''):
+        """ Appends a servo event, with its dependencies (indexes of the events to be completed before).
+            kind is 'top' for the top servo, 'rotate', 'spin' or 'release' for the bottom servo."""
+
+        after = [self.last[servo]]                 # events on the same servo are serialized
+        if servo == 'top':                         # case of a top servo event
+            after.append(self.last['main'] if self.overlap else self.last['bottom'])  # bottom steady (or releasing)
+        elif kind != 'release':                    # case of a bottom servo rotation or spin
+            after.append(self.last['top'])         # top cover steady at its position
+        idx = len(self.events)                     # index of the new event
+        self.events.append({'servo': servo, 'value': value, 'time': secs, 'kind': kind, 'pos': pos,
+                            'after': [i for i in after if i is not None], 'progress': self.progress,
+                            'state': None})        # event is appended
+        self.progress = None                       # progress is assigned once
+        self.last[servo] = idx                     # last event on this servo
+        if kind in ('rotate', 'spin'):             # case of a bottom servo main event
+            self.last['main'] = idx                # last bottom main event
+
+
+    def end(self):
+        """ Adds the slow_time to the last event, and stores the positions reached at the end of the servos function."""
+        if len(self.events) > 0:                   # case there are events
+            self.events[-1]['time'] += self.slow_time  # additional time to slow down the robot
+            self.events[-1]['state'] = (self.cover, self.holder)  # top cover and holder positions
+
+
+    def top(self, pos, secs):
+        """ Top servo event, to the pos position."""
+        self.add('top', self.p['t_' + pos], secs, 'top', pos)
+
+
+    # below functions follow the servos functions at Cubotino_P_servos (robot use, not the GUI tests)
+    def flip_up(self):
+        if self.cover == 'close':                  # cover/lifter position variable set to close
+            self.top('flip', self.p['t_close_to_flip_time'])
+        elif self.cover in ('open', 'read'):       # cover/lifter position variable set to open or read positions
+            self.top('flip', self.p['t_flip_open_time'])
+        self.cover = 'flip'                        # cover/lifter position variable set to flip
+        self.end()
+
+
+    def flip_to_read(self):
+        self.top('read', self.p['t_flip_open_time'])
+        self.cover = 'read'                        # variable to track the top cover/lifter position
+        self.end()
+
+
+    def flip_to_open(self):
+        self.top('open', self.p['t_flip_open_time'])
+        self.cover = 'open'                        # variable to track the top cover/lifter position
+        self.end()
+
+
+    def flip_to_close(self):
+        if not self.p['one_step']:                 # case the flip to close is not set to one step
+            self.top('read', 2*self.p['t_flip_to_close_time'])
+        if self.cover in ('flip', 'read'):         # cover/lifter position variable set to flip or read
+            self.top('close', self.p['t_flip_to_close_time'])
+        elif self.cover == 'open':                 # cover/lifter position variable set to open
+            self.top('close', self.p['t_open_close_time'])
+        if self.p['t_rel'] < self.p['t_close']:    # case the t_servo_rel_delta is > zero
+            self.top('rel', self.p['t_rel_time'])
+        self.cover = 'close'                       # cover/lifter position variable set to close
+        self.end()
+
+
+    def open_cover(self):
+        self.top('open', self.p['t_open_close_time'])
+        self.cover = 'open'                        # variable to track the top cover/lifter position
+        self.end()
+
+
+    def close_cover(self):
+        self.top('close', self.p['t_open_close_time'])
+        if self.p['t_rel'] < self.p['t_close']:    # case the t_servo_rel_delta is > zero
+            self.top('rel', self.p['t_rel_time'])
+        self.cover = 'close'                       # cover/lifter position variable set to close
+        self.end()
+
+
+    def spin(self, direction):
+        if self.cover in ('read', 'flip'):         # case the top cover is not open (as per spin_out)
+            self.flip_to_open()
+        elif self.cover == 'close':                # case the top cover is closed (as per spin_home)
+            self.open_cover()
+        if self.holder == 'home':                  # case the holder is at home (spin_out)
+            self.add('bottom', self.p['b_' + direction + '_rel'], self.p['b_spin_time'], 'spin')
+            self.holder = direction                # holder position
+        else:                                      # case the holder is at CW or CCW (spin_home)
+            self.add('bottom', self.p['b_home'], self.p['b_spin_time'], 'spin')
+            self.holder = 'home'                   # holder position
+        self.end()
+
+
+    def rotate(self, direction):
+        if self.holder != 'home' and self.holder == direction:  # case the rotation is not possible (as per servo_solve_cube)
+            return
+        if self.cover != 'close':                  # case the top cover is not in close position
+            self.close_cover()
+        if self.holder == 'home':                  # case the holder is at home (rotate_out)
+            self.add('bottom', self.p['b_' + direction], self.p['b_rotate_time'], 'rotate')
+            self.add('bottom', self.p['b_' + direction + '_rel'], self.p['b_rel_time'], 'release')
+            self.holder = direction                # holder position
+        else:                                      # case the holder is at CW or CCW (rotate_home)
+            self.add('bottom', self.p['b_home_from_' + self.holder], self.p['b_rotate_time'], 'rotate')
+            self.add('bottom', self.p['b_home'], self.p['b_rel_time'], 'release')
+            self.holder = 'home'                   # holder position
+        self.end()
+        self.open_cover()                          # top cover is raised in open position
+
+
+    def expand(self, moves, progress={}):
+        """ Expands the moves string into servo events, as servo_solve_cube does.
+            progress is the dict of move index -> percent (from check_moves), assigned to the first event of the move."""
+
+        if len(moves) > 0:                         # case there are moves
+            if moves[0] == 'S':                    # case the first move requires a cube spin
+                self.flip_to_open()
+            elif moves[0] == 'R':                  # case the first move requires a cube layer rotation
+                self.flip_to_close()
+
+        for i in range(len(moves)):                # iteration over the characters of the moves string
+            if i%2 != 0:                           # case of the direction, or number of flips, characters
+                continue                           # next character
+            self.progress = progress.get(i)        # progress percent for the first event of this move
+            if moves[i] == 'F':                    # case there is a flip on the move string
+                flips = int(moves[i+1])            # number of flips
+                for f in range(flips):             # iterates over the number of requested flips
+                    self.flip_up()
+                    if f < flips-1:                # case there are further flippings to do
+                        self.flip_to_read()
+                    if f == flips-1 and len(moves)-(i+2) > 0:  # case it's the last flip and there is a following move
+                        if moves[i+2] == 'R':      # case the next action is a 1st layer cube rotation
+                            self.flip_to_close()
+                        elif moves[i+2] == 'S':    # case the next action is a cube spin
+                            self.flip_to_open()
+            elif moves[i] == 'S':                  # case there is a cube spin on the move string
+                self.spin('CCW' if moves[i+1] == '3' else 'CW')
+            elif moves[i] == 'R':                  # case there is a cube 1st layer rotation
+                self.rotate('CCW' if moves[i+1] == '3' else 'CW')
+        return self.schedule()
+
+
+    def schedule(self):
+        """ Assigns the start time to each event (as soon as its dependencies are completed).
+            Returns the scheduled total time, and the serial one (sum of the events time)."""
+
+        for ev in self.events:                     # iteration over the events (dependencies precede the event)
+            ev['start'] = max([self.events[i]['start'] + self.events[i]['time'] for i in ev['after']], default=0)
+        scheduled = max([ev['start'] + ev['time'] for ev in self.events], default=0)  # scheduled total time
+        serial = sum(ev['time'] for ev in self.events)  # serial total time
+        return scheduled, serial
+
+
+
+
+class ServoBackend:
+
+    def __init__(self, t_servo, b_servo):
+        """ Backend setting the gpiozero servos, on the monotonic clock."""
+        self.servos = {'top': t_servo, 'bottom': b_servo}  # servo objects
+
+
+    def now(self):
+        return time.monotonic()
+
+
+    def sleep(self, secs):
+        time.sleep(secs)
+
+
+    def set(self, ev):
+        self.servos[ev['servo']].value = ev['value']   # servo is positioned
+
+
+
+
+class SimBackend:
+
+    def __init__(self, cover='read'):
+        """ Simulated servos on a virtual clock: Each event is checked against the safety interlocks."""
+
+        self.t = 0.0                               # virtual clock
+        self.busy = {'top': 0.0, 'bottom': 0.0}    # time until each servo is moving
+        self.kind = {'top': 'top', 'bottom': ''}   # kind of the last event per servo
+        self.cover = cover                         # top cover position
+        self.violations = []                       # list of the interlocks violations
+
+
+    def now(self):
+        return self.t
+
+
+    def sleep(self, secs):
+        self.t += max(0, secs)                     # virtual clock is moved forward
+
+
+    def set(self, ev):
+        eps = 1e-6                                 # tolerance on the virtual clock
+        servo, other = ('top', 'bottom') if ev['servo'] == 'top' else ('bottom', 'top')
+        if self.busy[servo] > self.t + eps:        # case the servo is still moving
+            self.violations.append(f"{self.t:.3f}s {servo} servo moved while moving")
+        if servo == 'top':                         # case of a top servo event
+            if self.busy['bottom'] > self.t + eps and self.kind['bottom'] != 'release':  # case the holder rotates or spins
+                self.violations.append(f"{self.t:.3f}s top cover moved while the holder {self.kind['bottom']}")
+            self.cover = ev['pos']                 # top cover position, once reached
+        elif ev['kind'] != 'release':              # case of a bottom servo rotation or spin
+            if self.busy['top'] > self.t + eps:    # case the top cover is moving
+                self.violations.append(f"{self.t:.3f}s holder {ev['kind']} while the top cover moves")
+            elif ev['kind'] == 'rotate' and self.cover not in ('close', 'rel'):  # case the cube is not constrained
+                self.violations.append(f"{self.t:.3f}s holder rotate with top cover at {self.cover}")
+            elif ev['kind'] == 'spin' and self.cover != 'open':  # case the cube is constrained
+                self.violations.append(f"{self.t:.3f}s holder spin with top cover at {self.cover}")
+        self.busy[servo] = self.t + ev['time']     # servo moving until
+        self.kind[servo] = ev['kind']              # kind of the last event
+
+
+
+
+def run(events, backend, stop=None, progress=None):
+    """ Executes the scheduled events via the backend, on its clock.
+        stop is a function returning True to interrupt, progress a function called with the progress percent.
+        Returns the measured time and the index of the last executed event (-1 if none)."""
+
+    t0 = backend.now()                             # time reference
+    last = -1                                      # index of the last executed event
+    for idx in sorted(range(len(events)), key=lambda i: (events[i]['start'], i)):  # events by start time
+        ev = events[idx]                           # event
+        if stop is not None and stop():            # case of a stop request
+            break                                  # for loop is interrupted
+        delay = t0 + ev['start'] - backend.now()   # time to wait before the event start
+        if delay > 0:                              # case the event start is ahead
+            backend.sleep(delay)                   # waits until the event start
+        if progress is not None and ev['progress'] is not None:  # case the event starts a new move
+            progress(ev['progress'])               # progress is notified
+        backend.set(ev)                            # servo is positioned
+        last = max(last, idx)                      # index of the last executed event
+    else:                                          # case all the events have been executed
+        if len(events) > 0:                        # case there are events
+            delay = t0 + max(ev['start'] + ev['time'] for ev in events) - backend.now()  # time to the last event end
+            if delay > 0:                          # case the last events are not completed
+                backend.sleep(delay)               # waits until the last event end
+    return backend.now() - t0, last
+
+
+
+
+def params_from_settings(s, one_step=False):
+    """ Returns the dict of servos positions and timers, as derived at Cubotino_P_servos, from the servos settings s."""
+
+    p = {'t_close': s['t_servo_close'], 't_open': s['t_servo_open'], 't_read': s['t_servo_read'],
+         't_flip': s['t_servo_flip'], 't_rel': round(s['t_servo_close'] - s['t_servo_rel_delta'], 3),
+         'b_home': s['b_home'], 'b_CW': s['b_servo_CW'], 'b_CCW': s['b_servo_CCW'],
+         'b_CW_rel': round(s['b_servo_CW'] - s['b_rel_CW'], 3), 'b_CCW_rel': round(s['b_servo_CCW'] + s['b_rel_CCW'], 3),
+         'b_home_from_CW': round(s['b_home'] - s['b_extra_home_CW'], 3),
+         'b_home_from_CCW': round(s['b_home'] + s['b_extra_home_CCW'], 3), 'one_step': one_step}
+    for key in ('t_flip_to_close_time', 't_close_to_flip_time', 't_flip_open_time', 't_open_close_time',
+                't_rel_time', 'b_spin_time', 'b_rotate_time', 'b_rel_time'):
+        p[key] = s[key]                            # timers
+    return p
+
+
+
+
+if __name__ == "__main__":
+    """the main function prints the serial and scheduled time of a moves string, on the simulated backend. """
+
+    import sys
+    from Cubotino_P_settings_manager import settings as settings
+    moves = sys.argv[1] if len(sys.argv) > 1 else 'F2R1S3R1S3S3F1R1F2R1S3S3F1R1S3R1F3R1S3R1S3S3F3R1S3F1R1S3R1F3R1S3R1S3F3R1S3R1'
+    p = params_from_settings(settings.get_servos_settings())
+
+    for overlap in (False, True):
+        tl = Timeline(p, overlap=overlap)
+        scheduled, serial = tl.expand(moves)
+        sim = SimBackend()
+        measured, last = run(tl.events, sim)
+        print(f"overlap={overlap}:  events {len(tl.events)}  serial {serial:.2f}s  scheduled {scheduled:.2f}s"
+              f"  simulated {measured:.2f}s  interlocks violations {len(sim.violations)}")
+        for v in sim.violations[:10]:
+            print('   ', v)
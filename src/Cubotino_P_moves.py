@@ -44,13 +44,15 @@ moves_dict = {'U1':'F2R1S3', 'U2':'F2R1S3R1S3', 'U3':'F2S1R3',
 
 
 
-def starting_cube_orientation(simulation=False):
+def starting_cube_orientation(simulation=False, skipped_flips=0):
     """ Cube orientation at the start, later updated after every cube movement on the robot
         Dict key is the the "stationary" side, while the dict value is the cube side
         
         After scanning the cube is not URF oriented.
         When simulating, the cube is considered as URF facing Up Right Front.
         By knowing 5 faces, the 6th face is also known ;-)
+        When the last face is deduced (not scanned), the scanning flips are skipped_flips less; These flips are
+        undone from the orientation after scanning (4 flips bring the cube back to the same orientation).
         
         
         Case of simulation:
@@ -113,6 +115,8 @@ def starting_cube_orientation(simulation=False):
         h_faces={'L':'F','F':'U','R':'B'}   # dict with faces around the bottom/upper positioned faces
         v_faces={'U':'L','F':'U','D':'R'}   # dict with faces around the left/right positioned faces
         dbl = 2                             # dbl cubie at start (cube after the scanning)
+        for i in range((4 - skipped_flips) % 4):  # iteration over the flips undoing the skipped ones
+            flip_effect(h_faces,v_faces)    # re-order the cube orientation on the robot due to the flip
     
 
     
@@ -494,7 +498,7 @@ def alt_solutions(solution):
 
 
 
-def robot_required_moves(solution, solution_Text, simulation, informative=False):
+def robot_required_moves(solution, solution_Text, simulation, informative=False, skipped_flips=0):
     """ This function splits the cube manouvre from Kociemba solver string, and generates a dict with all the robot movements.
         Based on the dict with all the robot moves, a string with all the movements is generated.
         The string with the robot movements might differ from the dict, when optimizing is possible."""
@@ -503,7 +507,7 @@ def robot_required_moves(solution, solution_Text, simulation, informative=False)
     
     solution=solution.strip()                     # eventual empty spaces are removed from the string
     solution=solution.replace(" ", "")            # eventual empty spaces are removed from the string
-    starting_cube_orientation(simulation)         # Cube orientation at the start, later updated after every cube movement on the robot
+    starting_cube_orientation(simulation, skipped_flips)  # Cube orientation at the start, later updated after every cube movement on the robot
     robot={}                                      # empty dict to store all the robot moves
     moves=''                                      # empty string to store all the robot moves
     robot_tot_moves = 0                           # counter for all the robot movements
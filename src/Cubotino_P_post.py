@@ -0,0 +1,85 @@
+#!/usr/bin/python
+# coding: utf-8
+
+"""
+#############################################################################################################
+#  Andrea Favero 29 March 2024
+#
+# This script relates to CUBOTino Pocket, a very small and simple Rubik's cube solver robot 3D printed
+# CUBOTino autonomous is the CUBOTino versions for the Rubik's cube 2x2x2.
+# This specific script runs the post-solve side effects (pictures collage, data log, coordinates file) on a
+# background worker thread, so that the robot gets ready for the next cube without waiting for them.
+# Jobs are executed in the submission order; The queue is bounded, so that a slow storage slows the robot down
+# instead of piling up jobs. flush() waits for the queued jobs, and it is called before quitting the script.
+# This file is imported by Cubotino_P.py
+#
+#############################################################################################################
+"""
+
+import threading, queue, time
+
+
+class PostSolve:
+
+    def __init__(self, maxsize=8):
+        """ Worker variables are initialized; The worker thread is started at the first submitted job."""
+
+        self.jobs = queue.Queue(maxsize=maxsize)   # bounded queue of the jobs (func, args, kwargs)
+        self.thread = None                         # worker thread executing the jobs
+        self.done = 0                              # counter of the executed jobs
+        self.busy_time = 0.0                       # secs spent by the worker on the jobs
+
+
+    def submit(self, func, *args, **kwargs):
+        """ Queues func(*args, **kwargs) to the worker; It blocks only when the queue is full.
+            Arguments are used by the worker later on, so they must not be changed after the submission."""
+
+        if self.thread is None:                    # case the worker thread has not been started yet
+            self.thread = threading.Thread(target=self.run, name='post_solve', daemon=True)  # worker thread
+            self.thread.start()                    # worker thread is started
+        self.jobs.put((func, args, kwargs))        # job is queued
+
+
+    def pending(self):
+        """ Returns the quantity of queued jobs, not yet completed."""
+        return self.jobs.unfinished_tasks
+
+
+    def flush(self):
+        """ Waits for all the queued jobs to be executed."""
+        if self.thread is not None:                # case the worker thread exists
+            self.jobs.join()                       # waits until all the queued jobs are done
+
+
+    def run(self):
+        """ Worker thread: executes the queued jobs."""
+
+        while True:                                # infinite loop
+            func, args, kwargs = self.jobs.get()   # job is retrieved (blocking)
+            t_ref = time.perf_counter()            # time reference
+            try:                                   # tentative
+                func(*args, **kwargs)              # job is executed
+            except Exception as e:                 # case an exception is raised
+                print(f'Exception at post-solve job {func.__name__}: {e}')  # feedback is printed to the terminal
+            self.busy_time += time.perf_counter() - t_ref  # time spent on the job is added
+            self.done += 1                         # counter of the executed jobs is incremented
+            self.jobs.task_done()                  # job is marked as done
+
+
+
+
+post = PostSolve()
+
+if __name__ == "__main__":
+    """the main function can be used to test the worker. """
+
+    def job(i):
+        time.sleep(0.2)
+        print('job', i, 'done')
+
+    t_ref = time.time()
+    for i in range(10):
+        post.submit(job, i)
+    print(f'10 jobs submitted in {round(time.time()-t_ref, 2)} secs, {post.pending()} pending')
+    post.flush()
+    print(f'Jobs flushed in {round(time.time()-t_ref, 2)} secs, worker busy for {round(post.busy_time, 2)} secs')
@@ -0,0 +1,153 @@
+#!/usr/bin/python
+# coding: utf-8
+
+"""
+#############################################################################################################
+#  Andrea Favero 29 March 2024
+#
+# This script relates to CUBOTino Pocket, a very small and simple Rubik's cube solver robot 3D printed
+# CUBOTino autonomous is the CUBOTino versions for the Rubik's cube 2x2x2.
+# This specific script records the camera frames used at the cube status detection, with some metadata.
+# Frames are saved in chunks (compressed .npz files), by a worker thread not to slow down the robot.
+# Recordings can later be replayed, on any computer, via Cubotino_P_replay.py
+# This file is imported by Cubotino_P.py and Cubotino_P_replay.py
+#
+#############################################################################################################
+"""
+
+import threading, queue, json, os, pathlib
+
+
+class Recorder:
+
+    def __init__(self):
+        """ Recorder variables are initialized; np is imported when the recording starts."""
+
+        self.chunk_size = 16                       # frames per chunk file
+        self.folder = None                         # folder of the recording in progress (None when not recording)
+        self.jobs = None                           # queue of the chunks to be saved by the worker thread
+        self.thread = None                         # worker thread saving the chunks
+
+
+    def start(self, timestamp, params):
+        """ Starts a new recording, in a folder named after timestamp.
+            params is a dict with the settings affecting the cube status detection, saved in the recording metadata."""
+
+        import numpy as np                         # data array management
+        self.np = np                               # np is assigned to an instance variable
+
+        folder = pathlib.Path().resolve()          # active folder (should be home/pi/cubotino_pocket/src)
+        self.folder = os.path.join(folder, 'FramesRecording', timestamp)  # folder for this recording
+        if not os.path.exists(self.folder):        # case the folder does not exist
+            os.makedirs(self.folder)               # folder is made
+
+        self.meta = {'timestamp': timestamp, 'params': params, 'chunks': [], 'frames': 0}  # recording metadata
+        self.frames, self.sides, self.elapsed = [], [], []  # lists for the frames (and their info) of the current chunk
+
+        if self.thread is None:                    # case the worker thread has not been started yet
+            self.jobs = queue.Queue()              # queue of the chunks to be saved
+            self.thread = threading.Thread(target=self.run, name='recorder', daemon=True)  # worker thread
+            self.thread.start()                    # worker thread is started
+
+
+    def add(self, frame, side, elapsed):
+        """ Adds a frame (copy) to the recording, with the cube side and the secs elapsed since the side detection start."""
+
+        if self.folder is None:                    # case there is no recording in progress
+            return                                 # function is terminated
+        if len(self.frames) > 0 and frame.shape != self.frames[0].shape:  # case the frame size changes
+            self.flush()                           # chunk is closed, as frames in a chunk must share the size
+        self.frames.append(frame.copy())           # frame copy is stored (frame gets later drawn by the detection)
+        self.sides.append(side)                    # cube side is stored
+        self.elapsed.append(elapsed)               # elapsed time is stored
+        if len(self.frames) >= self.chunk_size:    # case the chunk is complete
+            self.flush()                           # chunk is queued for saving
+
+
+    def flush(self):
+        """ Queues the frames collected so far, as a chunk to be saved by the worker thread."""
+
+        if len(self.frames) == 0:                  # case there are no frames to save
+            return                                 # function is terminated
+        np = self.np                               # np is assigned to a local variable
+        fname = os.path.join(self.folder, 'chunk_{:03d}.npz'.format(len(self.meta['chunks'])))  # chunk file name
+        chunk = {'frames': np.stack(self.frames),  # frames of the chunk, stacked on a single array
+                 'sides': np.array(self.sides, dtype=np.uint8),        # cube side of each frame
+                 'elapsed': np.array(self.elapsed, dtype=np.float32)}  # secs since each side detection start
+        self.jobs.put((fname, chunk))              # chunk is queued for saving
+        self.meta['chunks'].append(os.path.basename(fname))  # chunk file name is added to the metadata
+        self.meta['frames'] += len(self.frames)    # frames counter is increased
+        self.frames, self.sides, self.elapsed = [], [], []  # lists are emptied
+
+
+    def stop(self, result=None):
+        """ Stops the recording in progress, and saves the metadata (result is a dict with the cube status detection outcome).
+            Returns the recording folder, or None when there was no recording in progress."""
+
+        if self.folder is None:                    # case there is no recording in progress
+            return None                            # None is returned
+        self.flush()                               # last frames are queued for saving
+        self.meta['result'] = result if result is not None else {}  # detection outcome is added to the metadata
+        self.jobs.put((os.path.join(self.folder, 'meta.json'), self.meta))  # metadata is queued for saving
+        folder, self.folder = self.folder, None    # recording is closed
+        return folder                              # recording folder is returned
+
+
+    def wait(self):
+        """ Waits for all the queued chunks to be saved."""
+        if self.jobs is not None:                  # case the worker thread exists
+            self.jobs.join()                       # waits until all the queued jobs are done
+
+
+    def run(self):
+        """ Worker thread: saves the queued chunks (compressed npz) and the metadata (json)."""
+
+        while True:                                # infinite loop
+            fname, data = self.jobs.get()          # job is retrieved (blocking)
+            try:                                   # tentative
+                if fname.endswith('.npz'):         # case of a frames chunk
+                    self.np.savez_compressed(fname, **data)  # chunk is saved as compressed npz
+                else:                              # case of the metadata
+                    with open(fname, 'w') as f:    # metadata file is opened in writing mode
+                        json.dump(data, f, indent=0)  # metadata is saved as json
+            except Exception as e:                 # case an exception is raised
+                print(f'Exception while saving {fname}: {e}')  # feedback is printed to the terminal
+            self.jobs.task_done()                  # job is marked as done
+
+
+
+
+def load_meta(folder):
+    """ Returns the metadata of the recording in folder."""
+    with open(os.path.join(folder, 'meta.json'), 'r') as f:  # metadata file is opened in reading mode
+        return json.load(f)                        # metadata is returned
+
+
+
+
+def load_frames(folder, meta):
+    """ Generator returning (frame, side, elapsed) of the recording in folder, loading one chunk at the time."""
+
+    import numpy as np                             # data array management
+    for chunk in meta['chunks']:                   # iteration over the chunks
+        with np.load(os.path.join(folder, chunk)) as data:  # chunk is opened (arrays are loaded when accessed)
+            frames, sides, elapsed = data['frames'], data['sides'], data['elapsed']  # chunk arrays are loaded
+        for i in range(len(sides)):                # iteration over the frames of the chunk
+            yield frames[i], int(sides[i]), float(elapsed[i])  # frame, cube side and elapsed time are returned
+
+
+
+
+recorder = Recorder()
+
+if __name__ == "__main__":
+    """the main function can be used to list the recordings. """
+
+    folder = os.path.join(pathlib.Path().resolve(), 'FramesRecording')
+    if os.path.exists(folder):
+        for rec in sorted(os.listdir(folder)):
+            try:
+                meta = load_meta(os.path.join(folder, rec))
+                print(rec, meta['frames'], 'frames', meta['result'].get('cube_status_string', ''))
+            except:
+                print(rec, 'incomplete recording')
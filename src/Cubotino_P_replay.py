@@ -0,0 +1,189 @@
+#!/usr/bin/python
+# coding: utf-8
+
+"""
+#############################################################################################################
+# Andrea Favero 29 March 2024
+#
+# Script to replay, on any computer, the frames recorded by CUBOTino_P at the cube status detection.
+#
+# Frames are recorded by launching Cubotino_P.py with the --record argument (FramesRecording folder).
+# Each recorded cycle is fed, at full speed, through the same functions the robot uses to detect the cube
+# status: face_detection (the per-frame step of cubeAF) and cube_colors_interpr_all.
+# Per each cycle the script prints the per-stage timings, the resulting cube status string, and whether
+# it matches the one the robot got at the recording time.
+# This makes possible to measure (and to regression test) changes on the vision code, without the robot.
+#
+#############################################################################################################
+"""
+
+
+
+################  setting argparser for robot remote usage, and other settings  #################
+import argparse
+
+# argument parser object creation
+parser = argparse.ArgumentParser(description='Replay the frames recorded at the cube status detection')
+
+# folder argument is added to the parser
+parser.add_argument("folder", nargs='?', type=str, default='FramesRecording',
+                    help="A recorded cycle folder, or a folder with recorded cycles (default FramesRecording)")
+
+# --debug argument is added to the parser
+parser.add_argument("-d", "--debug", action='store_true',
+                    help="Activates printout of settings, variables and info for debug purpose")
+
+# --runs argument is added to the parser
+parser.add_argument("-r", "--runs", type=int,
+                    help="Input the number of times each recorded cycle is replayed (timings are averaged)")
+
+args = parser.parse_args()   # argument parsed assignement
+# ###############################################################################################
+
+
+import sys, os, time
+folder = os.path.abspath(args.folder)              # recordings folder, before changing the active folder
+os.chdir(os.path.dirname(os.path.abspath(__file__)))  # active folder is set to the scripts folder (as on the robot)
+sys.argv = sys.argv[:1]                            # Cubotino_P parses the CLI arguments at import, these are removed
+import Cubotino_P as cp                            # script with the cube status detection functions
+from Cubotino_P_recorder import load_meta, load_frames   # functions to load the recorded frames
+from Cubotino_P_timings import timings as tm       # timer of the Cubotino_P functions
+
+
+stages = ('edges_contours', 'prefilter', 'facelets', 'colors', 'interpretation', 'solver')  # timed stages
+
+# Cubotino_P functions timed per stage (function name: stage name), time on nested functions excluded
+replay_stages = {'face_detection': 'facelets', 'read_facelets': 'edges_contours',
+                 'contours_prefilter': 'prefilter', 'cube_facelets_colors': 'colors'}
+tm.instrument(vars(cp), replay_stages)          # Cubotino_P functions are wrapped by a timer
+
+
+
+
+
+def solver_ok(cube_status_string):
+    """ Returns True when the solver finds a solution for the cube status string, or None when the solver is missing."""
+
+    if cp.sv is None:                              # case the solver could not be imported
+        return None                                # None is returned
+    solutions = cp.sv.solve(cube_status_string)    # solver is called
+    return solutions.splitlines()[0].replace(" ","")[:5] != 'Error'  # True when the solver does not return Error
+
+
+
+
+
+def replay_cycle(rec_folder, debug):
+    """ Replays the frames of a recorded cycle, as done by the robot at cube status detection.
+        Returns a dict with the timings per stage, the resulting cube status and the recorded one."""
+
+    meta = load_meta(rec_folder)                   # metadata of the recorded cycle
+    cp.replay_setup(meta['params'], debug)         # recorded settings are applied to the detection functions
+
+    timings = dict.fromkeys(stages, 0.0)           # dict to store the time spent per stage
+    BGR_mean, HSV_mean = [], []                    # lists filled with the facelets colors
+    frames_num, fcs_faces = 0, 0                   # counters for the analyzed frames and for the faces detected via fix coordinates
+
+    tm.reset()                                     # timings of the previous cycle are cleared
+    for frame, side, elapsed in load_frames(rec_folder, meta):  # iteration over the recorded frames
+        if side < cp.side:                         # case the face has already been detected on a previous frame
+            continue                               # the remaining frames of that face are skipped
+        if side > cp.side:                         # case the face was not detected, while it was at the recording time
+            break                                  # for loop is interrupted
+
+        frames_num += 1                            # frames counter is incremented
+        cp.h, cp.w = frame.shape[:2]               # frame dimensions (global at Cubotino_P)
+        tm.side = cp.side                          # cube side the timings refer to
+        fcs_now = len(cp.f_coordinates) > 0 and elapsed > cp.fcs_delay  # case the robot was already using the fix coordinates
+        facelets, frame, fcs_used, coordinates = cp.face_detection(frame, cp.w, cp.h, cp.side, elapsed, fcs_now,
+                                                                   [], BGR_mean, HSV_mean)  # same per-frame step of the robot
+        if len(facelets) == 4:                     # case the face has been detected
+            fcs_faces += int(fcs_used)             # counter of faces detected via fix coordinates
+            cp.side += 1                           # next cube side
+            if cp.side > 6:                        # case all the faces have been detected
+                break                              # for loop is interrupted
+
+    for stage, per_side in tm.samples.items():     # iteration over the timed stages
+        timings[stage] += sum(sum(v) for v in per_side.values())  # time spent on the stage, over the cube sides
+
+    cube_status_string, cdw = '', 'Error'          # cube status string and color detection winner are initialized
+    if cp.side > 6:                                # case all the faces have been detected
+        URFDLB_facelets_BGR_mean = cp.URFDLB_facelets_order(BGR_mean)  # facelets BGR are ordered as per URFDLB order
+        URFDLB_facelets_HSV_mean = cp.URFDLB_facelets_order(HSV_mean)  # facelets HSV are ordered as per URFDLB order
+        
+        t4 = time.perf_counter()                   # time reference
+        candidates = cp.cube_colors_interpr_all(URFDLB_facelets_BGR_mean, URFDLB_facelets_HSV_mean)  # color interpreters, as at the robot
+        t5 = time.perf_counter()                   # time reference
+        timings['interpretation'] += t5 - t4       # time spent on the colors interpretation
+        best = candidates[0]                       # best candidate, as selected by the robot
+        if best['valid'] and solver_ok(best['css']) != False:  # case the best candidate is solved
+            cube_status_string, cdw = best['css'], best['name']  # cube status string and winner
+        timings['solver'] += time.perf_counter() - t5  # time spent on the solver
+
+    recorded = meta['result'].get('cube_status_string', '')  # cube status string at the recording time
+    return {'name': os.path.basename(rec_folder), 'frames': frames_num, 'recorded_frames': meta['frames'],
+            'faces': min(cp.side, 7) - 1, 'fcs_faces': fcs_faces, 'timings': timings,
+            'cube_status_string': cube_status_string, 'cdw': cdw, 'recorded': recorded,
+            'match': cube_status_string == recorded}
+
+
+
+
+
+def print_report(res, runs):
+    """ Prints to the terminal the replay result of a recorded cycle."""
+
+    print(f"\nRecording {res['name']}:  {res['frames']} of {res['recorded_frames']} frames analyzed,"
+          f"  faces detected {res['faces']}/6  (via fix coordinates: {res['fcs_faces']})")
+    tot = 0                                        # total time
+    for stage in stages:                           # iteration over the stages
+        secs = res['timings'][stage] / runs        # average time per run
+        tot += secs                                # total time is updated
+        per_frame = 1000 * secs / max(1, res['frames'])  # average time per analyzed frame
+        print(f"   {stage:<16} {1000*secs:9.1f} ms  {per_frame:7.2f} ms/frame")
+    print(f"   {'total':<16} {1000*tot:9.1f} ms")
+    print(f"   cube status ({res['cdw']}): {res['cube_status_string']}")
+    print(f"   recorded status   : {res['recorded']}   {'MATCH' if res['match'] else 'MISMATCH'}")
+
+
+
+
+
+if __name__ == "__main__":
+    """ Replays the recorded cycles found in folder, and prints timings and results."""
+
+    debug = False                                  # flag to enable/disable the debug related prints
+    if args.debug != None:                         # case 'debug' argument exists
+        if args.debug:                             # case the script has been launched with 'debug' argument
+            debug = True                           # flag to enable/disable the debug related prints is set True
+
+    runs = 1                                       # number of replays per recorded cycle
+    if args.runs != None:                          # case 'runs' argument exists
+        runs = max(1, args.runs)                   # 'runs' argument is assigned to variable
+
+    if os.path.exists(os.path.join(folder, 'meta.json')):  # case folder is a single recorded cycle
+        rec_folders = [folder]                     # list with the single recorded cycle
+    elif os.path.isdir(folder):                    # case folder contains recorded cycles
+        rec_folders = [os.path.join(folder, f) for f in sorted(os.listdir(folder))
+                       if os.path.exists(os.path.join(folder, f, 'meta.json'))]  # list of the recorded cycles
+    else:                                          # case the folder does not exist
+        rec_folders = []                           # empty list
+
+    if len(rec_folders) == 0:                      # case there are no recorded cycles
+        print(f"No recorded cycles found in {folder}")  # feedback is printed to the terminal
+        sys.exit(1)                                # script is quitted
+
+    matches = 0                                    # counter of cycles with matching cube status
+    for rec_folder in rec_folders:                 # iteration over the recorded cycles
+        timings = dict.fromkeys(stages, 0.0)       # dict to store the time spent per stage, over the runs
+        for run in range(runs):                    # iteration over the runs
+            res = replay_cycle(rec_folder, debug)  # recorded cycle is replayed
+            for stage in stages:                   # iteration over the stages
+                timings[stage] += res['timings'][stage]  # timings are summed over the runs
+        res['timings'] = timings                   # summed timings are assigned to the result
+        print_report(res, runs)                    # result is printed to the terminal
+        matches += int(res['match'])               # counter is updated
+
+    print(f"\nReplayed {len(rec_folders)} recorded cycles, cube status matching on {matches}")
+    if cp.sv is None:                              # case the solver could not be imported
+        print("Solver not found: cube status strings were not checked by the solver")
@@ -30,6 +30,7 @@ import RPi.GPIO as GPIO                # import RPi GPIO library
 GPIO.setmode(GPIO.BCM)                 # setting GPIO pins as "Broadcom SOC channel" number, these are the numbers after "GPIO"
 GPIO.setwarnings(False)                # setting GPIO to don't return allarms
 from gpiozero import Servo, PWMLED     # import modules for the PWM part
+import Cubotino_P_motion as motion     # servos movements timeline, with overlaps and safety interlocks
 # ##################################################################################
 
 
@@ -50,6 +51,7 @@ fun_status=False                # boolean to track the robot fun status, it is T
 s_debug=False                   # boolean to print out info when debugging
 flip_to_close_one_step = False  # f_to_close steps (steps from flip up to close) is set false (=2 steps)
 led_init_status = False         # boolean to track the led (PWM) inititialization status
+motion_overlap = False          # boolean to execute the servos movements via the timeline (top servo overlaps bottom release)
 # ##################################################################################
 
 
@@ -164,14 +166,17 @@ def load_servos_parameters(print_out):
 
 
 
-def init_servo(print_out=s_debug, start_pos=0, f_to_close_mode=False, s_silent=False):
+def init_servo(print_out=s_debug, start_pos=0, f_to_close_mode=False, s_silent=False, overlap=False):
     """ Function to initialize the robot (servos position) and some global variables, do be called once, at the start."""
     
     global robot_init_status, fun_status, flip_to_close_one_step, led_init_status, top_cover_led
-    global flip_to_close_one_step
+    global flip_to_close_one_step, motion_overlap
     
     set_display()
     
+    if overlap:                               # case the servos movements have to be executed via the timeline
+        motion_overlap = True                 # motion_overlap is set True
+    
     if s_silent and not led_init_status:      # case s_silent is se True
         led_init_status, top_cover_led = init_top_cover_led()  # the GPIO for the led is initialized
         timer = load_servos_parameters(print_out)  # upload the servos parameters
@@ -583,8 +588,10 @@ def flip_to_close(slow_time=0):
 
 
 
-def flip():
-    """ Flips the cube during the cube detection phase, and places the top_cover (piCamera) in read position."""
+def flip(wait=True):
+    """ Flips the cube during the cube detection phase, and places the top_cover (piCamera) in read position.
+        When wait is False, the function returns without waiting for the top cover to reach the read position;
+        In this case the skipped waiting time is returned, to be replaced by a motion-settle detection."""
     
     global t_top_cover, b_servo_operable, b_servo_stopped, b_servo_home
     
@@ -594,9 +601,13 @@ def flip():
         if b_servo_stopped==True:              # boolean of bottom servo at location the lifter can be operated
             b_servo_operable=False             # variable to block/allow bottom servo operation
             t_servo.value = t_servo_read       # top servo is positioned in top cover read position
+            if not wait:                       # case the caller detects the motion settle
+                t_top_cover='read'             # variable to track the top cover/lifter position
+                return t_flip_open_time+0.1    # skipped time for the top servo to reach the top cover read position
             time.sleep(t_flip_open_time+0.1)   # time for the top servo to reach the top cover read position
             t_top_cover='read'                 # variable to track the top cover/lifter position
             b_servo_operable=False             # variable to block/allow bottom servo operation
+    return 0                                   # no skipped waiting time
 
 
 
@@ -967,6 +978,11 @@ def estimate_time(moves, timer, slow_time=0):
     b_rotate_time = timer['b_rotate_time']
     b_rel_time = timer['b_rel_time']
     
+    k=1.08                                         # correction coefficient (see the end of this function)
+    
+    if motion_overlap:                             # case the servos movements are executed via the timeline
+        scheduled, serial = motion.Timeline(motion_params(), slow_time=slow_time).expand(moves)  # timeline scheduled time
+        return round(scheduled*k,1)
     
     t_top_cover = 'read'                           # variable to track the top cover/lifter position
     tot_time=0                                     # counter for the total time
@@ -1118,95 +1134,99 @@ def servo_solve_cube(moves, scrambling=False, print_out=s_debug, test=False, slo
     if print_out:                                  # case the print_out variable is set true
         print(f'Total amount of servo movements: {tot_moves}\n')   # feedback is printed to the terminal   
     
-    if len(moves)>0:                               # case moves > 0 (there are moves)
-        if moves[0] == 'S':                        # case the first move requires a cube spin
-            flip_to_open(slow_time)                # Top_cover is set to open position
-        elif moves[0] == 'R':                      # case the first move requires a cube layer rotation
-            flip_to_close(slow_time)               # Top_cover is set to close position
+    if motion_overlap and not test:                # case the servos movements are executed via the timeline
+        servo_solve_timeline(moves, remaining_moves, scrambling, print_out, slow_time)  # timeline is expanded and executed
     
-    string_len=len(moves)                          # number of characters in the moves string
-    for i in range(string_len):                    # iteration over the characters of the moves string
-        if test:                                   # case test is set True (function is called for test by CLI or GUI)
-            if not touch_btn.is_pressed:           # case the touch button is pressed
-                stopping_servos()                  # servos are stopped
-                s_disp.show_cubotino()             # show cubotino logo on display, when this script is imported
-                s_disp.set_backlight(1)            # activates the display backlight
-                break                              # for loop is interrupted
-        
-        if stop_servos:                            # case there is a stop request for servos
-            break                                  # the foor loop in interrupted
-        
-        if i%2==0 and not stop_servos:             # string index having robot movements
-            # calls the display progress bar function. SCRAMBLING is displayed when that fuction is used
-            s_disp.display_progress_bar(remaining_moves[i], scrambling)
-        
-        if moves[i]=='F':                          # case there is a flip on the move string
-            flips=int(moves[i+1])                  # number of flips
-            if print_out:                          # case the print_out variable is set true
-                print(f'To do F{flips}')           # for print_out
-            
-            for f in range(flips):                 # iterates over the number of requested flips        
-                if test:                           # case test is set True (function is called for test by CLI or GUI)
-                    if not touch_btn.is_pressed:   # case the touch button is pressed
-                        stopping_servos()          # servos are stopped
-                        s_disp.show_cubotino()     # show cubotino logo on display, when this script is imported
-                        s_disp.set_backlight(1)    # activates the display backlight
-                        break                      # for loop is interrupted
-                
-                if stop_servos:                    # case there is a stop request for servos
-                    break                          # the foor loop in interrupted
-                
-                flip_up(slow_time=slow_time)                 # lifter is operated to flip the cube
+    else:                                          # case the servos movements are executed in sequence
+        if len(moves)>0:                           # case moves > 0 (there are moves)
+            if moves[0] == 'S':                    # case the first move requires a cube spin
+                flip_to_open(slow_time)            # Top_cover is set to open position
+            elif moves[0] == 'R':                  # case the first move requires a cube layer rotation
+                flip_to_close(slow_time)           # Top_cover is set to close position
 
-                if f<(flips-1):                    # case there are further flippings to do
-                    flip_to_read(slow_time=slow_time)        # lifter is lowered stopping the top cover in read position (cube not constrained)
+        string_len=len(moves)                      # number of characters in the moves string
+        for i in range(string_len):                # iteration over the characters of the moves string
+            if test:                               # case test is set True (function is called for test by CLI or GUI)
+                if not touch_btn.is_pressed:       # case the touch button is pressed
+                    stopping_servos()              # servos are stopped
+                    s_disp.show_cubotino()         # show cubotino logo on display, when this script is imported
+                    s_disp.set_backlight(1)        # activates the display backlight
+                    break                          # for loop is interrupted
 
-                if f==(flips-1) and string_len-(i+2)>0:   # case it's the last flip and there is a following command on the move string
-                    if moves[i+2]=='R':            # case the next action is a 1st layer cube rotation
-                        flip_to_close(slow_time=slow_time)   # top cover is lowered to close position
-                    elif moves[i+2]=='S':          # case the next action is a cube spin
-                        flip_to_open(slow_time=slow_time)    # top cover is lowered to open position
+            if stop_servos:                        # case there is a stop request for servos
+                break                              # the foor loop in interrupted
 
+            if i%2==0 and not stop_servos:         # string index having robot movements
+                # calls the display progress bar function. SCRAMBLING is displayed when that fuction is used
+                s_disp.display_progress_bar(remaining_moves[i], scrambling)
 
-        elif moves[i]=='S':                        # case there is a cube spin on the move string
-            direction=int(moves[i+1])              # rotation direction is retrived
-            if print_out:                          # case the print_out variable is set true
-                print(f'To do S{direction}')       # for print_out
-
-            if direction==3:                       # case the direction is CCW
-                set_dir='CCW'                      # CCW directio is assigned to the variable
-            else:                                  # case the direction is CW
-                set_dir='CW'                       # CW directio is assigned to the variable
-            
-            if b_servo_home==True:                 # case bottom servo is at home
-                spin_out(set_dir,slow_time=slow_time)  # call to function to spin the full cube to full CW or CCW
-            
-            else:                                  # case the bottom servo is at full CW or CCW position
-                spin_home(slow_time=slow_time)     # call to function to spin the full cube toward home position
+            if moves[i]=='F':                      # case there is a flip on the move string
+                flips=int(moves[i+1])              # number of flips
+                if print_out:                      # case the print_out variable is set true
+                    print(f'To do F{flips}')       # for print_out
 
+                for f in range(flips):             # iterates over the number of requested flips        
+                    if test:                       # case test is set True (function is called for test by CLI or GUI)
+                        if not touch_btn.is_pressed:   # case the touch button is pressed
+                            stopping_servos()      # servos are stopped
+                            s_disp.show_cubotino() # show cubotino logo on display, when this script is imported
+                            s_disp.set_backlight(1)    # activates the display backlight
+                            break                  # for loop is interrupted
+
+                    if stop_servos:                # case there is a stop request for servos
+                        break                      # the foor loop in interrupted
+
+                    flip_up(slow_time=slow_time)             # lifter is operated to flip the cube
+
+                    if f<(flips-1):                # case there are further flippings to do
+                        flip_to_read(slow_time=slow_time)    # lifter is lowered stopping the top cover in read position (cube not constrained)
+
+                    if f==(flips-1) and string_len-(i+2)>0:   # case it's the last flip and there is a following command on the move string
+                        if moves[i+2]=='R':        # case the next action is a 1st layer cube rotation
+                            flip_to_close(slow_time=slow_time)   # top cover is lowered to close position
+                        elif moves[i+2]=='S':      # case the next action is a cube spin
+                            flip_to_open(slow_time=slow_time)    # top cover is lowered to open position
+
+
+            elif moves[i]=='S':                    # case there is a cube spin on the move string
+                direction=int(moves[i+1])          # rotation direction is retrived
+                if print_out:                      # case the print_out variable is set true
+                    print(f'To do S{direction}')   # for print_out
+
+                if direction==3:                   # case the direction is CCW
+                    set_dir='CCW'                  # CCW directio is assigned to the variable
+                else:                              # case the direction is CW
+                    set_dir='CW'                   # CW directio is assigned to the variable
+
+                if b_servo_home==True:             # case bottom servo is at home
+                    spin_out(set_dir,slow_time=slow_time)  # call to function to spin the full cube to full CW or CCW
+
+                else:                              # case the bottom servo is at full CW or CCW position
+                    spin_home(slow_time=slow_time) # call to function to spin the full cube toward home position
+
+
+            elif moves[i]=='R':                    # case there is a cube 1st layer rotation
+                direction=int(moves[i+1])          # rotation direction is retrived   
+                if print_out:                      # case the print_out variable is set true
+                    print(f'To do R{direction}')   # for print_out
+
+                if direction==3:                   # case the direction is CCW
+                    set_dir='CCW'                  # CCW directio is assigned to the variable
+                else:                              # case the direction is CW
+                    set_dir='CW'                   # CW directio is assigned to the variable
+
+                if b_servo_home==True:             # case bottom servo is at home
+                    rotate_out(set_dir, slow_time=slow_time)  # call to function to rotate cube 1st layer on the set direction, moving out from home
+
+                elif b_servo_CW_pos==True:         # case the bottom servo is at full CW position
+                    if set_dir=='CCW':             # case the set direction is CCW
+                        rotate_home(set_dir, slow_time=slow_time)  # call to function to spin the full cube toward home position
+
+                elif b_servo_CCW_pos==True:        # case the bottom servo is at full CCW position
+                    if set_dir=='CW':              # case the set direction is CW
+                        rotate_home(set_dir, slow_time=slow_time)  # call to function to spin the full cube toward home position
 
-        elif moves[i]=='R':                        # case there is a cube 1st layer rotation
-            direction=int(moves[i+1])              # rotation direction is retrived   
-            if print_out:                          # case the print_out variable is set true
-                print(f'To do R{direction}')       # for print_out
-
-            if direction==3:                       # case the direction is CCW
-                set_dir='CCW'                      # CCW directio is assigned to the variable
-            else:                                  # case the direction is CW
-                set_dir='CW'                       # CW directio is assigned to the variable
-            
-            if b_servo_home==True:                 # case bottom servo is at home
-                rotate_out(set_dir, slow_time=slow_time)  # call to function to rotate cube 1st layer on the set direction, moving out from home
-            
-            elif b_servo_CW_pos==True:             # case the bottom servo is at full CW position
-                if set_dir=='CCW':                 # case the set direction is CCW
-                    rotate_home(set_dir, slow_time=slow_time)  # call to function to spin the full cube toward home position
-                
-            elif b_servo_CCW_pos==True:            # case the bottom servo is at full CCW position
-                if set_dir=='CW':                  # case the set direction is CW
-                    rotate_home(set_dir, slow_time=slow_time)  # call to function to spin the full cube toward home position
 
-    
     if stop_servos:                                # case there is a stop request for servos 
         if print_out:                              # case the print_out variable is set true
             print("\nRobot stopped")               # feedback is printed to the terminal
@@ -1230,6 +1250,55 @@ def servo_solve_cube(moves, scrambling=False, print_out=s_debug, test=False, slo
      
      
 
+def motion_params():
+    """ Returns the dict of servos positions and timers, used by the motion timeline (Cubotino_P_motion)."""
+    
+    return {'t_close':t_servo_close, 't_open':t_servo_open, 't_read':t_servo_read, 't_flip':t_servo_flip, 't_rel':t_servo_rel,
+            'b_home':b_home, 'b_CW':b_servo_CW, 'b_CCW':b_servo_CCW, 'b_CW_rel':b_servo_CW_rel, 'b_CCW_rel':b_servo_CCW_rel,
+            'b_home_from_CW':b_home_from_CW, 'b_home_from_CCW':b_home_from_CCW, 'one_step':flip_to_close_one_step,
+            't_flip_to_close_time':t_flip_to_close_time, 't_close_to_flip_time':t_close_to_flip_time,
+            't_flip_open_time':t_flip_open_time, 't_open_close_time':t_open_close_time, 't_rel_time':t_rel_time,
+            'b_spin_time':b_spin_time, 'b_rotate_time':b_rotate_time, 'b_rel_time':b_rel_time}
+
+
+
+
+
+
+
+def servo_solve_timeline(moves, remaining_moves, scrambling=False, print_out=s_debug, slow_time=0):
+    """ Executes the moves string via the motion timeline: Same servos movements of the sequential execution, yet the
+        top servo starts moving while the bottom servo releases the tensions; Safety interlocks are part of the timeline.
+        The predicted (timeline) and measured times are printed to the terminal."""
+    
+    global t_top_cover, b_servo_operable, b_servo_stopped, b_servo_home, b_servo_CW_pos, b_servo_CCW_pos
+    
+    holder = 'home' if b_servo_home else ('CW' if b_servo_CW_pos else 'CCW')   # cube holder position
+    timeline = motion.Timeline(motion_params(), cover=t_top_cover, holder=holder, slow_time=slow_time)  # timeline object
+    scheduled, serial = timeline.expand(moves, remaining_moves)   # moves are expanded into servos events, and scheduled
+    backend = motion.ServoBackend(t_servo, b_servo)               # backend positioning the servos
+    measured, last = motion.run(timeline.events, backend, stop=lambda: stop_servos,
+                                progress=lambda percent: s_disp.display_progress_bar(percent, scrambling))  # timeline execution
+    
+    states = [ev['state'] for ev in timeline.events[:last+1] if ev['state'] is not None]  # positions reached
+    if len(states) > 0:                            # case at least one servos function has been executed
+        t_top_cover, holder = states[-1]           # top cover and cube holder positions
+        b_servo_home = holder == 'home'            # boolean of bottom servo at home
+        b_servo_CW_pos = holder == 'CW'            # boolean of bottom servo at full CW position
+        b_servo_CCW_pos = holder == 'CCW'          # boolean of bottom servo at full CCW position
+        b_servo_stopped = True                     # boolean of bottom servo at location the lifter can be operated
+        b_servo_operable = t_top_cover in ('open', 'close', 'read')  # variable to block/allow bottom servo operation
+    
+    if serial > 0:                                 # case there are servos movements
+        print(f'Servos timeline: serial {serial:.1f}s, scheduled {scheduled:.1f}s (predicted {100*(scheduled/serial-1):.1f}%),'
+              f' measured {measured:.1f}s ({100*(measured/serial-1):.1f}%)')   # feedback is printed to the terminal
+
+
+
+
+
+
+
 def set_servos_pos(target):
         """ Function to set both servos to target angle, wherein the target is from -1.00 to 1.00"""
         
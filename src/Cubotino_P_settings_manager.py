@@ -14,10 +14,14 @@
 #
 # Mac address is used to match boards and settings on my robots: This limits mistakes at my end. 
 #
+# The settings object is a single instance, shared by all the modules of the process: Files are parsed once, and
+# re-parsed only when their mtime/size changed together with their content hash. Files (backups included) are
+# written only when their content changes; Files I/O is counted in settings.io (see io_report).
+#
 #############################################################################################################
 """
 
-import sys, glob, os.path, pathlib, json
+import sys, glob, os.path, pathlib, json, hashlib
 from getmac import get_mac_address           # library to get the device MAC ddress
 
 
@@ -29,6 +33,9 @@ class Settings:
             Parameters and settings are imported.
             Settings datatypes are parsed."""
         
+        self.io = {'reads':0, 'read_bytes':0, 'writes':0, 'written_bytes':0, 'skipped_writes':0, 'checks':0}  # files I/O counters
+        self.stamps = {}                                  # fname: (mtime_ns, size, sha1) of the files as last read or written
+        
         # mac address is used by myself (Andrea Favero), to upload the settings fitting my robot
         self.folder = pathlib.Path().resolve()            # active folder (should be home/pi/cubotino_pocket/src)
         self.macs_AF = self.get_macs_AF(self.folder)      # mac addresses of AF bots are retrieved
@@ -96,8 +103,7 @@ class Settings:
                     sys.exit(1)                                   # script is quitted with error
                 
                 with open(fname_d, 'r') as input:                 # default settings file is opened as input
-                    output = open(fname, 'w')                     # local settings file is opened to be written
-                    output.write(input.read())                    # default settings are saved into the local settings file
+                    self.write_file(fname, input.read())          # default settings are saved into the local settings file
                 
                 print(f"One time action: Creating local settings file {fname}")  # feedback is printed to the terminal
 
@@ -106,7 +112,11 @@ class Settings:
 
 
     def get_settings(self):
-        """Returns the general robot settings dict."""
+        """Returns the general robot settings dict; The file is re-parsed only if changed since the last read."""
+        fname = self.get_settings_fname()                         # folder and file name for the settings
+        if self.changed(fname):                                   # case the settings file has changed
+            print(f"Settings file changed, re-reading {fname}")   # feedback is printed to the terminal
+            self.s = self.parse_settings(self.read_settings(fname))  # settings are read and parsed
         return self.s
 
 
@@ -114,13 +124,87 @@ class Settings:
 
 
     def get_servos_settings(self):
-        """Returns the servos settings dict."""
+        """Returns the servos settings dict; The file is re-parsed only if changed since the last read."""
+        fname = self.get_servo_settings_fname()                   # folder and file name for the servos settings
+        if self.changed(fname):                                   # case the servos settings file has changed
+            print(f"Servos settings file changed, re-reading {fname}")  # feedback is printed to the terminal
+            self.servos_s = self.parse_servos_settings(self.read_servos_settings(fname))  # settings are read and parsed
         return self.servos_s
 
 
 
 
 
+    def read_file(self, fname):
+        """Returns the text content of fname; The file stamp and the I/O counters are updated."""
+        with open(fname, 'rb') as f:                              # file is opened in binary reading mode
+            raw = f.read()                                        # file content
+        st = os.stat(fname)                                       # file status (mtime and size)
+        self.stamps[fname] = (st.st_mtime_ns, st.st_size, hashlib.sha1(raw).hexdigest())  # file stamp
+        self.io['reads'] += 1                                     # reads counter is incremented
+        self.io['read_bytes'] += len(raw)                         # read bytes counter is incremented
+        return raw.decode()                                       # file content is returned as text
+
+
+
+
+
+    def write_file(self, fname, text):
+        """Writes text to fname, only when it differs from the file content. Returns True when the file is written."""
+        raw = text.encode()                                       # content to be written, as bytes
+        digest = hashlib.sha1(raw).hexdigest()                    # content hash
+        if os.path.exists(fname):                                 # case the file exists
+            if fname not in self.stamps:                          # case the file stamp is not known
+                self.read_file(fname)                             # file is read, to get its content hash
+            else:                                                 # case the file stamp is known
+                self.changed(fname)                               # stamp is updated, if the file was modified meanwhile
+            if self.stamps[fname][2] == digest:                   # case the file has already this content
+                self.io['skipped_writes'] += 1                    # skipped writes counter is incremented
+                return False                                      # file is not written
+        
+        os.umask(0) # The default umask is 0o22 which turns off write permission of group and others
+        with open(os.open(fname, os.O_CREAT | os.O_WRONLY | os.O_TRUNC, 0o777), 'wb') as f:  # file is opened in writing mode
+            f.write(raw)                                          # content is written
+        st = os.stat(fname)                                       # file status (mtime and size)
+        self.stamps[fname] = (st.st_mtime_ns, st.st_size, digest) # file stamp
+        self.io['writes'] += 1                                    # writes counter is incremented
+        self.io['written_bytes'] += len(raw)                      # written bytes counter is incremented
+        return True
+
+
+
+
+
+    def changed(self, fname):
+        """Returns True when fname differs from the last read (or written) content: mtime and size are checked first,
+            the content hash only when these differ (i.e. file saved again with the same content)."""
+        try:                                                      # tentative
+            st = os.stat(fname)                                   # file status (mtime and size)
+        except OSError:                                           # case the file does not exist
+            return False                                          # missing files are not reported as changed
+        self.io['checks'] += 1                                    # checks counter is incremented
+        stamp = self.stamps.get(fname)                            # stamp of the last read
+        if stamp is None:                                         # case the file was never read
+            return True
+        if stamp[:2] == (st.st_mtime_ns, st.st_size):             # case mtime and size did not change
+            return False
+        self.read_file(fname)                                     # file is read, and its stamp updated
+        return self.stamps[fname][2] != stamp[2]                  # True when the content hash differs
+
+
+
+
+
+    def io_report(self):
+        """Returns a string with the settings files I/O counters."""
+        io = self.io                                              # I/O counters
+        return (f"Settings files I/O: {io['reads']} reads ({io['read_bytes']} bytes), {io['writes']} writes "
+                f"({io['written_bytes']} bytes), {io['skipped_writes']} unchanged writes skipped, {io['checks']} checks")
+
+
+
+
+
     def get_settings_fname(self):
         fname = 'Cubotino_P_settings.txt'                         # file name with general settings
         if self.eth_mac in self.macs_AF:                          # case the script is running on AF (Andrea Favero) robot
@@ -147,6 +231,32 @@ class Settings:
 
 
 
+    def get_colors_calib_fname(self):
+        fname = 'Cubotino_P_colors_calib.txt'                     # file name with the colors calibration (per robot)
+        if self.eth_mac in self.macs_AF:                          # case the script is running on AF (Andrea Favero) robot
+            pos = self.macs_AF.index(self.eth_mac)                # mac address row position in macs_AF.txt file
+            fname = self.get_fname_AF(fname, pos)                 # AF robot colors calibration file name
+        else:                                                     # case the script is not running on AF (Andrea Favero) robot
+            fname = os.path.join(self.folder,fname)               # folder and file name for the colors calibration
+        return fname                                              # return folder and file name for the colors calibration
+
+
+
+
+
+    def get_camera_profile_fname(self):
+        fname = 'Cubotino_P_camera_profile.txt'                   # file name with the camera profiles (per robot)
+        if self.eth_mac in self.macs_AF:                          # case the script is running on AF (Andrea Favero) robot
+            pos = self.macs_AF.index(self.eth_mac)                # mac address row position in macs_AF.txt file
+            fname = self.get_fname_AF(fname, pos)                 # AF robot camera profiles file name
+        else:                                                     # case the script is not running on AF (Andrea Favero) robot
+            fname = os.path.join(self.folder,fname)               # folder and file name for the camera profiles
+        return fname                                              # return folder and file name for the camera profiles
+
+
+
+
+
     def read_settings(self, fname=''):
         """Function reading the Cubotino_P_settings.txt file. Retrieves a dict with parameters and settings."""
         
@@ -154,8 +264,7 @@ class Settings:
             fname = self.get_settings_fname()                     # folder and file name for the settings
         
         if os.path.exists(fname):                                 # case the settings file exists
-            with open(fname, "r") as f:                           # settings file is opened in reading mode
-                s = json.load(f)                                  # json file is parsed to a local dict variable
+            s = json.loads(self.read_file(fname))                 # json file is parsed to a local dict variable
             
             # update key-values parameters, needed in case of additional parameters added at remote repo
             s = self.update_settings_file(fname, s)
@@ -221,6 +330,19 @@ class Settings:
             s['built_by_fs'] = int(s['built_by_fs'])              # font size for the maker's name on display
             s['fcs_delay'] = float(s['fcs_delay'])                # delay in secs to switch to Fix Coordinates System for facelets position
             
+            if s['roi_detection'].lower().strip() == 'false':     # case roi_detection parameter is a string == false
+                s['roi_detection'] = False                        # roi_detection parameter is set boolean False
+            elif s['roi_detection'].lower().strip() == 'true':    # case roi_detection parameter is a string == true
+                s['roi_detection'] = True                         # roi_detection parameter is set boolean True
+            else:                                                 # case the roi_detection parameter is not 'false' or 'true'
+                print('\n\nAttention: Wrong roi_detection parameter: It should be "true" or "false."\n')  # feedback is printed to the terminal
+                s['roi_detection'] = True                         # roi_detection parameter is set boolean True
+            
+            s['data_log'] = s['data_log'].lower().strip()         # cube data log format: text, binary or both
+            if s['data_log'] not in ('text', 'binary', 'both'):   # case the data_log parameter is not 'text', 'binary' or 'both'
+                print('\n\nAttention: Wrong data_log parameter: It should be "text", "binary" or "both".\n')  # feedback is printed to the terminal
+                s['data_log'] = 'text'                            # data_log parameter is set to text
+            
             if s['cover_self_close'].lower().strip() == 'false':  # case cover_self_close parameter is a string == false
                 s['cover_self_close'] = False                     # cover_self_close parameter is set boolean False
             elif s['cover_self_close'].lower().strip() == 'true': # case cover_self_close parameter is a string == true
@@ -252,8 +374,7 @@ class Settings:
             fname = self.get_servo_settings_fname()               # fname for the text file to retrieve settings
         
         if os.path.exists(fname):                                 # case the servo_settings file exists
-            with open(fname, "r") as f:                           # servo_settings file is opened in reading mode
-                servo_s = json.load(f)                            # json file is parsed to a local dict variable
+            servo_s = json.loads(self.read_file(fname))           # json file is parsed to a local dict variable
             
             # update key-values parameters, for additional parameters added at remote repo after first release
             servo_s = self.update_servos_settings_file(fname, servo_s, json)
@@ -335,15 +456,9 @@ class Settings:
         for key, value in data.items():                          # iteration through the dict data
             data[key]=str(value)                                 # values of data are converted to string
         
-        os.umask(0) # The default umask is 0o22 which turns off write permission of group and others
         backup_fname = os.path.join(self.folder, fname)          # folder and file name for the settings backup
-
-        with open(os.open(backup_fname, os.O_CREAT | os.O_WRONLY, 0o777), 'w') as f:  # settings_backup file is opened in writing mode
-            if debug:                                            # case debug variable is set true
-                print('Copy of settings parameter is saved as backup at: ', backup_fname)  # feedback is printed to the terminal
-            
-            f.write(json.dumps(data, indent=0))                  # content of the setting file is saved in another file, as backup
-            f.truncate()                       # truncates the file (prevents older characters at file-end, if new content is shorter)
+        if self.write_file(backup_fname, json.dumps(data, indent=0)) and debug:  # case the file is written and debug is set true
+            print('Copy of settings parameter is saved as backup at: ', backup_fname)  # feedback is printed to the terminal
         
         if "servo" in fname:                                     # case fname contains 'servo'
             self.servo_s = self.parse_servos_settings(data)      # servos settings datatypes are parsed
@@ -356,15 +471,12 @@ class Settings:
 
 
     def save_backup(self, fname, data):
-        """Saves a backup copy of the settings data."""
+        """Saves a backup copy of the settings data; The file is written only when its content changes."""
         
         for key, value in data.items():
             data[key]=str(value)
-        os.umask(0) # The default umask is 0o22 which turns off write permission of group and others
         backup_fname = os.path.join(self.folder, fname)          # folder and file name for the settings backup
-        with open(os.open(backup_fname, os.O_CREAT | os.O_WRONLY, 0o777), 'w') as f:  # settings_backup file is opened in writing mode
-            f.write(json.dumps(data, indent=0))                  # content of the setting file is saved in another file, as backup
-            f.truncate()                       # truncates the file (prevents older characters at file-end, if new content is shorter)
+        self.write_file(backup_fname, json.dumps(data, indent=0))  # content of the setting file is saved in another file, as backup
 
 
 
@@ -479,12 +591,19 @@ class Settings:
         if 'fcs_delay' not in s_keys:
             s['fcs_delay']='3'
             any_change = True
+        
+        if 'roi_detection' not in s_keys:
+            s['roi_detection']='true'
+            any_change = True
+        
+        if 'data_log' not in s_keys:
+            s['data_log']='text'
+            any_change = True
          
         if any_change:
             print('\nOne time action: Adding new parameters to the Cubotino_P_settings.txt')
             print('Action necessary for compatibility with the latest downloaded Cubotino_P.py \n')
-            with open(fname, 'w') as f:
-                f.write(json.dumps(s, indent=0))   # content of the updated setting is saved
+            self.write_file(fname, json.dumps(s, indent=0))   # content of the updated setting is saved
         
         return s
 
@@ -530,8 +649,7 @@ class Settings:
         if any_change:
             print('\nOne time action: Adding new parameters to the Cubotino_P_settings.txt')
             print('Action necessary for compatibility with the latest downloaded Cubotino_P.py \n')
-            with open(fname, 'w') as f:
-                f.write(json.dumps(servo_s, indent=0))   # content of the updated setting is saved
+            self.write_file(fname, json.dumps(servo_s, indent=0))   # content of the updated setting is saved
         
         return servo_s
 
@@ -557,3 +675,9 @@ if __name__ == "__main__":
     for key, value in s.items():
         print(key, ":", value)
     print()
+    
+    print("At startup:", settings.io_report())
+    for i in range(1000):
+        settings.get_settings()
+        settings.get_servos_settings()
+    print("After 1000 get_settings and get_servos_settings calls:", settings.io_report())
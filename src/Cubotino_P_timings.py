@@ -0,0 +1,196 @@
+#!/usr/bin/python
+# coding: utf-8
+
+"""
+#############################################################################################################
+#  Andrea Favero 29 March 2024
+#
+# This script relates to CUBOTino Pocket, a very small and simple Rubik's cube solver robot 3D printed
+# CUBOTino autonomous is the CUBOTino versions for the Rubik's cube 2x2x2.
+# This specific script measures the time spent by the vision functions, at the cube status detection.
+# When activated (--timings argument), the listed functions are wrapped by a timer; Otherwise the functions
+# are left untouched, therefore without any cost.
+# Per stage latency histograms, per face and per cycle, are appended to CubesDataLog/Cubotino_timings_log.txt
+# This file is imported by Cubotino_P.py and Cubotino_P_replay.py
+# When launched, this script prints a summary of the timings logged so far.
+#
+#############################################################################################################
+"""
+
+import time, os, pathlib
+
+
+# upper edges (ms) of the histogram bins, the last bin collects the larger values
+bins = (0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class Timings:
+
+    def __init__(self):
+        """ Timing variables are initialized; Timings are disabled until instrument() is called."""
+
+        self.enabled = False                       # flag tracking whether the timings are active
+        self.side = 0                              # cube side under detection (set by Cubotino_P)
+        self.samples = {}                          # dict stage -> dict side -> list of durations (secs)
+        self.stack = []                            # time spent on the nested timed functions, per call level
+
+
+    def instrument(self, namespace, stages):
+        """ Wraps the functions in namespace (i.e. globals() of Cubotino_P) with a timer.
+            stages is a dict with function name as key and the stage name as value."""
+
+        for fname, stage in stages.items():        # iteration over the functions to be timed
+            func = namespace.get(fname)            # function is retrieved from the namespace
+            if func is not None and not hasattr(func, 'timed_stage'):  # case the function exists and it is not wrapped yet
+                namespace[fname] = self.wrap(func, stage)  # function is replaced by the timed one
+        self.enabled = True                        # timings are activated
+
+
+    def wrap(self, func, stage):
+        """ Returns func wrapped by a timer; Time spent on nested timed functions is excluded from the stage."""
+
+        perf_counter, stack, add = time.perf_counter, self.stack, self.add  # local variables, for speed
+
+        def timed(*args, **kwargs):
+            t0 = perf_counter()                    # time reference
+            stack.append(0.0)                      # new call level, for the time spent on nested timed functions
+            try:                                   # tentative
+                return func(*args, **kwargs)       # original function is called
+            finally:                               # in any case
+                elapsed = perf_counter() - t0      # time spent on the function, nested functions included
+                nested = stack.pop()               # time spent on the nested timed functions
+                add(stage, elapsed - nested)       # time spent on this stage only
+                if stack:                          # case this function is nested in another timed one
+                    stack[-1] += elapsed           # time is added to the calling level
+
+        timed.timed_stage = stage                  # stage name is attached to the timed function
+        timed.__name__ = func.__name__             # name of the original function
+        timed.__doc__ = func.__doc__               # docstring of the original function
+        return timed
+
+
+    def add(self, stage, secs):
+        """ Stores a duration for stage, on the cube side under detection."""
+        self.samples.setdefault(stage, {}).setdefault(self.side, []).append(secs)
+
+
+    def reset(self):
+        """ Clears the durations of the previous cycle."""
+        self.samples = {}                          # durations are cleared
+        self.side = 0                              # side is set to zero (camera warm-up and settings)
+
+
+    def stats(self, values):
+        """ Returns count, p50, p95 and max (ms), the total (ms) and the histogram counts of a list of durations (secs)."""
+
+        ms = sorted(1000 * v for v in values)      # durations in ms, sorted
+        n = len(ms)                                # quantity of durations
+        p50 = ms[max(0, -(-50*n//100) - 1)]        # median (nearest rank)
+        p95 = ms[max(0, -(-95*n//100) - 1)]        # 95th percentile (nearest rank)
+        hist = [0] * (len(bins) + 1)               # histogram counts
+        for v in ms:                               # iteration over the durations
+            i = 0                                  # bin index
+            while i < len(bins) and v > bins[i]:   # case the duration is larger than the bin upper edge
+                i += 1                             # next bin
+            hist[i] += 1                           # bin counter is incremented
+        return n, p50, p95, ms[-1], sum(ms), hist
+
+
+    def cycle_end(self, timestamp, sides, frames_stage='findContours'):
+        """ Prints a summary of the cycle timings, and appends the histograms (per face and per cycle) to the log file.
+            sides is the dict side -> face letter; frames_stage is the stage called once per analyzed frame."""
+
+        if not self.enabled or len(self.samples) == 0:  # case timings are disabled, or there are no durations
+            return                                 # function is terminated
+
+        rows = []                                  # rows to be logged
+        print("\nStage timings (ms)       calls     p50     p95     max   total")  # header is printed to the terminal
+        for stage, per_side in self.samples.items():  # iteration over the stages
+            for side in sorted(per_side):          # iteration over the cube sides
+                rows.append((stage, sides.get(side, side), self.stats(per_side[side])))  # per face stats
+            values = [v for side in per_side for v in per_side[side]]  # all the durations of the stage
+            n, p50, p95, mx, tot, hist = self.stats(values)  # per cycle stats
+            rows.append((stage, 'cycle', (n, p50, p95, mx, tot, hist)))
+            print(f"{stage:<22} {n:7d} {p50:7.2f} {p95:7.2f} {mx:7.1f} {tot:7.0f}")  # feedback is printed to the terminal
+
+        frames = self.samples.get(frames_stage, {})  # durations of the stage called once per frame
+        faces = [(sides.get(s, s), len(frames[s])) for s in sorted(frames) if s > 0]  # frames per face
+        if len(faces) > 0:                         # case there are frames per face
+            print('Frames per face before acceptance: ' + '  '.join(f'{f}:{n}' for f, n in faces))  # feedback to the terminal
+        self.save(timestamp, rows, faces)          # timings are appended to the log file
+        self.reset()                               # durations are cleared
+
+
+    def save(self, timestamp, rows, faces):
+        """ Appends the rows to CubesDataLog/Cubotino_timings_log.txt, next to Cubotino_solver_log.txt"""
+
+        folder = pathlib.Path().resolve()          # active folder (should be home/pi/cubotino_pocket/src)
+        folder = os.path.join(folder, 'CubesDataLog')  # folder with the cube data
+        if not os.path.exists(folder):             # if case the folder does not exist
+            os.makedirs(folder)                    # folder is made if it doesn't exist
+        fname = os.path.join(folder, 'Cubotino_timings_log.txt')  # folder+filename for the timings
+
+        try:                                       # tentative
+            header = not os.path.exists(fname)     # headers are written on a new file
+            with open(fname, 'a') as f:            # file is opened in appending mode
+                if header:                         # case the file is new
+                    hist_headers = '\t'.join(f'<={b}' for b in bins) + f'\t>{bins[-1]}'  # histogram bins headers
+                    f.write(f'Date\tStage\tFace\tCount\tp50(ms)\tp95(ms)\tMax(ms)\tTot(ms)\t{hist_headers}\n')
+                for stage, face, (n, p50, p95, mx, tot, hist) in rows:  # iteration over the rows
+                    counts = '\t'.join(str(c) for c in hist)  # histogram counts
+                    f.write(f'{timestamp}\t{stage}\t{face}\t{n}\t{p50:.3f}\t{p95:.3f}\t{mx:.3f}\t{tot:.1f}\t{counts}\n')
+                for face, n in faces:              # iteration over the faces
+                    f.write(f'{timestamp}\tframes\t{face}\t{n}\n')  # frames analyzed per face
+        except Exception as e:                     # case an exception is raised
+            print(f'Exception while saving the timings: {e}')  # feedback is printed to the terminal
+
+
+
+
+def summary(fname):
+    """ Prints the per stage p50/p95/max (over all the logged cycles) and the average frames per face.
+        Percentiles are estimated from the logged histograms (bin upper edge)."""
+
+    hists, maxs, frames = {}, {}, {}               # dicts to merge the logged data
+    with open(fname, 'r') as f:                    # log file is opened in reading mode
+        next(f)                                    # headers are skipped
+        for line in f:                             # iteration over the lines
+            cols = line.rstrip('\n').split('\t')   # columns of the line
+            if cols[1] == 'frames':                # case of frames per face
+                frames.setdefault(cols[2], []).append(int(cols[3]))  # frames are stored per face
+            elif cols[2] == 'cycle':               # case of per cycle stats
+                hist = [int(c) for c in cols[8:]]  # histogram counts
+                old = hists.get(cols[1], [0] * len(hist))  # histogram so far
+                hists[cols[1]] = [a + b for a, b in zip(old, hist)]  # histograms are merged
+                maxs[cols[1]] = max(maxs.get(cols[1], 0), float(cols[6]))  # max duration
+
+    edges = list(bins) + [float('inf')]            # bins upper edges
+    print("Stage (ms, over all the cycles)   calls    p50 <=    p95 <=     max")
+    for stage, hist in hists.items():              # iteration over the stages
+        n = sum(hist)                              # quantity of durations
+        cum, p50, p95 = 0, None, None              # cumulated counts and percentiles
+        for count, edge in zip(hist, edges):       # iteration over the bins
+            cum += count                           # cumulated counts
+            if p50 is None and cum >= 0.5 * n:     # case the median bin is reached
+                p50 = edge                         # bin upper edge is assigned to p50
+            if p95 is None and cum >= 0.95 * n:    # case the 95th percentile bin is reached
+                p95 = edge                         # bin upper edge is assigned to p95
+        print(f"{stage:<32} {n:7d} {p50:9} {p95:9} {maxs[stage]:7.1f}")
+    if len(frames) > 0:                            # case frames per face are logged
+        print('Average frames per face before acceptance: ' +
+              '  '.join(f'{face}:{sum(n)/len(n):.1f}' for face, n in frames.items()))
+
+
+
+
+timings = Timings()
+
+if __name__ == "__main__":
+    """the main function prints the summary of the logged timings. """
+
+    fname = os.path.join(pathlib.Path().resolve(), 'CubesDataLog', 'Cubotino_timings_log.txt')
+    if os.path.exists(fname):
+        summary(fname)
+    else:
+        print(f'Not found {fname}')
+        print('Timings are logged when Cubotino_P.py is launched with the --timings argument')
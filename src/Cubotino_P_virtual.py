@@ -0,0 +1,501 @@
+#!/usr/bin/python
+# coding: utf-8
+
+"""
+#############################################################################################################
+#  Andrea Favero 29 March 2024
+#
+# This script relates to CUBOTino Pocket, a very small and simple Rubik's cube solver robot 3D printed
+# CUBOTino autonomous is the CUBOTino versions for the Rubik's cube 2x2x2.
+# This specific script is a virtual hardware backend, to run the full robot cycle on any Linux computer.
+# When activated (--virtual argument), simulated modules replace the hardware ones: GPIO and touch button,
+# servos and led (gpiozero), display (ST7735), pigpiod and MAC address; The camera replays the frames recorded
+# with the --record argument, one recorded cycle per solving cycle, paced as a camera.
+# The sleeps of the main thread are not waited but added to a virtual clock (time.time and time.monotonic),
+# therefore the robot cycle time is the one the robot would have, while the script runs much faster.
+# The robot phases are timed on the virtual clock and on the process CPU time, and printed per cycle.
+# This file is imported by Cubotino_P.py
+#
+#############################################################################################################
+"""
+
+import sys, os, time, types, threading
+
+
+# cube faces, as numbered by the robot while detecting the cube status
+faces = {0:'Empty', 1:'U', 2:'B', 3:'D', 4:'F', 5:'R', 6:'L'}
+
+
+class Clock:
+
+    def __init__(self):
+        """ Virtual clock variables are initialized; The clock is activated by install()."""
+
+        self.offset = 0.0                          # secs of the skipped sleeps (virtual time ahead of the real one)
+        self.sleeps = 0                            # counter of the skipped sleeps
+        self.main = threading.main_thread()        # thread whose sleeps are skipped
+        self.local = threading.local()             # per thread offset, of the worker threads running a task (see task)
+        self.real_sleep = time.sleep               # original time.sleep
+        self.real_time = time.time                 # original time.time
+        self.real_monotonic = time.monotonic       # original time.monotonic
+
+
+    def install(self):
+        """ time.sleep, time.time and time.monotonic are replaced by the virtual clock ones.
+            Modules importing time use the replaced functions; perf_counter and process_time are left real."""
+        time.sleep, time.time, time.monotonic = self.sleep, self.time, self.monotonic
+
+
+    def task(self, t_start):
+        """ The calling worker thread gets its own virtual clock, starting from t_start (main thread time at the task
+            submission); Its sleeps are skipped and added to it. This is used by the motion worker, so that the robot
+            movements overlap the main thread work as on the robot; The main thread then waits the end via wait_until."""
+        if threading.current_thread() is not self.main:  # case of a worker thread
+            self.local.offset = t_start - self.real_time()  # worker clock starts from the task submission time
+
+
+    def sleep(self, secs):
+        """ Sleeps of the main thread (and of the worker tasks) are added to the clock offset; Other threads sleep for real."""
+        if threading.current_thread() is self.main:  # case of the main thread
+            self.offset += max(0.0, secs)          # sleep time is added to the clock offset
+            self.sleeps += 1                       # counter of the skipped sleeps is incremented
+        elif hasattr(self.local, 'offset'):        # case of a worker thread running a task (i.e. robot movements)
+            self.local.offset += max(0.0, secs)    # sleep time is added to the worker clock offset
+            self.sleeps += 1                       # counter of the skipped sleeps is incremented
+        else:                                      # case of a worker thread (display, windows, recorder, etc)
+            self.real_sleep(secs)                  # real sleep
+
+
+    def time(self):
+        """ Returns the virtual time (real time plus the skipped sleeps)."""
+        return self.real_time() + getattr(self.local, 'offset', self.offset)
+
+
+    def monotonic(self):
+        """ Returns the virtual monotonic time (real monotonic time plus the skipped sleeps)."""
+        return self.real_monotonic() + getattr(self.local, 'offset', self.offset)
+
+
+    def wait_until(self, t):
+        """ The virtual clock is advanced to the time t, when ahead of the current one (i.e. waiting for a camera frame)."""
+        self.sleep(t - self.time())                # remaining time is slept (skipped on the main thread)
+
+
+
+
+class Phases:
+
+    def __init__(self):
+        """ Phases variables are initialized; Phases are timed once instrument() is called."""
+
+        self.stack = []                            # (virtual, cpu) time spent on the nested timed functions, per call level
+        self.cycle = {}                            # dict phase -> [calls, virtual secs, cpu secs] of the current cycle
+        self.total = {}                            # dict phase -> [calls, virtual secs, cpu secs] of all the cycles
+        self.cycles = []                           # list of (cycle number, virtual secs, cpu secs) per cycle
+
+
+    def instrument(self, namespace, phases):
+        """ Wraps the functions in namespace (i.e. globals() of Cubotino_P) with a virtual and a cpu timer.
+            phases is a dict with function name as key and the phase name as value."""
+
+        for fname, phase in phases.items():        # iteration over the functions to be timed
+            func = namespace.get(fname)            # function is retrieved from the namespace
+            if func is not None and not hasattr(func, 'virtual_phase'):  # case the function exists and it is not wrapped yet
+                namespace[fname] = self.wrap(func, phase)  # function is replaced by the timed one
+
+
+    def wrap(self, func, phase):
+        """ Returns func wrapped by a timer; Time spent on nested timed functions is excluded from the phase.
+            Only the main thread is timed, as the robot cycle runs on it."""
+
+        stack, add, main = self.stack, self.add, clock.main  # local variables, for speed
+        vtime, ctime = time.monotonic, time.process_time     # virtual clock, and process cpu time
+
+        def timed(*args, **kwargs):
+            if threading.current_thread() is not main:  # case of a worker thread
+                return func(*args, **kwargs)       # original function is called, without timing
+            v0, c0 = vtime(), ctime()              # time references
+            stack.append([0.0, 0.0])               # new call level, for the time spent on nested timed functions
+            try:                                   # tentative
+                return func(*args, **kwargs)       # original function is called
+            finally:                               # in any case
+                v, c = vtime() - v0, ctime() - c0  # time spent on the function, nested functions included
+                nv, nc = stack.pop()               # time spent on the nested timed functions
+                add(phase, v - nv, c - nc)         # time spent on this phase only
+                if stack:                          # case this function is nested in another timed one
+                    stack[-1][0] += v              # virtual time is added to the calling level
+                    stack[-1][1] += c              # cpu time is added to the calling level
+
+        timed.virtual_phase = phase                # phase name is attached to the timed function
+        timed.__name__ = func.__name__             # name of the original function
+        timed.__doc__ = func.__doc__               # docstring of the original function
+        return timed
+
+
+    def add(self, phase, v, c):
+        """ Stores a call of phase, with its virtual and cpu secs."""
+        stats = self.cycle.setdefault(phase, [0, 0.0, 0.0])  # phase stats of the current cycle
+        stats[0] += 1                              # calls counter is incremented
+        stats[1] += v                              # virtual secs are added
+        stats[2] += c                              # cpu secs are added
+
+
+    def cycle_end(self, cycle):
+        """ Prints the phases of the cycle, and adds them to the totals."""
+
+        if len(self.cycle) == 0:                   # case there are no timed phases
+            return                                 # function is terminated
+        print(f"\nVirtual cycle {cycle} phases        calls  virtual(s)    cpu(s)   cpu%")  # header is printed to the terminal
+        v_tot, c_tot = 0.0, 0.0                    # cycle totals
+        for phase, (n, v, c) in self.cycle.items():  # iteration over the phases
+            print(f"   {phase:<28} {n:6d} {v:11.2f} {c:9.3f} {100*c/max(v, 1e-9):6.1f}")
+            v_tot, c_tot = v_tot + v, c_tot + c    # cycle totals are updated
+            stats = self.total.setdefault(phase, [0, 0.0, 0.0])  # phase stats of all the cycles
+            stats[0], stats[1], stats[2] = stats[0] + n, stats[1] + v, stats[2] + c  # totals are updated
+        print(f"   {'total':<28} {'':6} {v_tot:11.2f} {c_tot:9.3f} {100*c_tot/max(v_tot, 1e-9):6.1f}")
+        self.cycles.append((cycle, v_tot, c_tot))  # cycle totals are stored
+        self.cycle = {}                            # phases of the cycle are cleared
+
+
+    def report(self):
+        """ Prints the phases averaged over the cycles, and the simulated hardware counters."""
+
+        n = len(self.cycles)                       # quantity of timed cycles
+        print(f"\n\nVirtual hardware report, {n} cycles replayed from {camera.folder}")
+        if n > 0:                                  # case there are timed cycles
+            print(f"   {'phase (mean per cycle)':<28} {'calls':>6} {'virtual(s)':>11} {'cpu(s)':>9}")
+            for phase, (calls, v, c) in self.total.items():  # iteration over the phases
+                print(f"   {phase:<28} {calls/n:6.1f} {v/n:11.2f} {c/n:9.3f}")
+            v_mean = sum(v for _, v, _ in self.cycles) / n  # mean cycle time
+            c_mean = sum(c for _, _, c in self.cycles) / n  # mean cycle cpu time
+            print(f"   {'cycle':<28} {'':6} {v_mean:11.2f} {c_mean:9.3f}")
+        print(f"Camera: {camera.frames_served} frames served, {camera.cycles_done} recorded cycles")
+        print(f"Servos: {sum(s.moves for s in Servo.servos)} movements;  Led: {PWMLED.changes} changes")
+        print(f"Display: {ST7735.frames} full frames, {ST7735.windows} windows, {ST7735.bytes/1024:.0f} kB sent")
+        print(f"Clock: {clock.sleeps} sleeps skipped, {clock.offset:.1f} secs of virtual time added\n")
+
+
+
+
+class ReplayCamera:
+
+    replay = True                                  # frames are already cropped, warped and resized (as recorded)
+
+    def __init__(self, folder):
+        """ Camera replaying the recorded cycles in folder (or the single recorded cycle folder)."""
+
+        self.folder = os.path.abspath(folder)      # folder with the recorded cycles
+        if os.path.exists(os.path.join(self.folder, 'meta.json')):  # case folder is a single recorded cycle
+            self.recordings = [self.folder]        # list with the single recorded cycle
+        elif os.path.isdir(self.folder):           # case folder contains recorded cycles
+            self.recordings = [os.path.join(self.folder, f) for f in sorted(os.listdir(self.folder))
+                               if os.path.exists(os.path.join(self.folder, f, 'meta.json'))]  # list of the recorded cycles
+        else:                                      # case the folder does not exist
+            self.recordings = []                   # empty list
+        self.cycles_done = 0                       # counter of the replayed cycles
+        self.frames_served = 0                     # counter of the frames returned by get_frame
+        self.frames = {}                           # dict side -> list of the recorded frames of the current cycle
+        self.pointer = {}                          # dict side -> index of the next frame to be returned
+        self.frame = None                          # last returned frame
+        self.period = 0.05                         # min secs in between frames (updated from the recorded frames)
+        self.t_frame = 0                           # virtual time of the last returned frame
+        self.side = 0                              # cube side under detection (set by Cubotino_P)
+        self.shutter_time = 20000                  # shutter time (micro secs), returned by the metadata
+        self.gains = (1.0, 1.0, (1.5, 1.5))        # analog gain, digital gain and AWB gains, returned by the metadata
+
+
+    def next_cycle(self):
+        """ Loads the frames of the next recorded cycle; Returns its metadata, or None when all the cycles are replayed."""
+
+        from Cubotino_P_recorder import load_meta, load_frames  # functions to load the recorded frames
+        if self.cycles_done >= len(self.recordings):  # case all the recorded cycles have been replayed
+            return None                            # None is returned
+        folder = self.recordings[self.cycles_done] # recorded cycle folder
+        meta = load_meta(folder)                   # metadata of the recorded cycle
+        self.frames, self.pointer, deltas = {}, {}, []  # frames per side, and secs in between recorded frames
+        for frame, side, elapsed in load_frames(folder, meta):  # iteration over the recorded frames
+            frames = self.frames.setdefault(side, [])  # recorded frames of the side
+            if len(frames) > 0 and elapsed > frames[-1][1]:  # case of a frame following another one of the same side
+                deltas.append(elapsed - frames[-1][1])  # secs in between the two frames
+            frames.append((frame, elapsed))        # frame is stored
+        if len(deltas) > 0:                        # case there are secs in between frames
+            self.period = min(deltas)              # frames are not served faster than the fastest recorded ones
+        self.cycles_done += 1                      # counter of the replayed cycles is incremented
+        print(f"\nVirtual camera: replaying {os.path.basename(folder)} ({meta['frames']} frames)")  # feedback to the terminal
+        return meta                                # metadata is returned
+
+
+    def get_frame(self):
+        """ Returns the next recorded frame of the side under detection; The last one is repeated when exhausted.
+            Frames are paced as a camera: the virtual clock is advanced to the next frame time, if not yet elapsed."""
+
+        clock.wait_until(self.t_frame + self.period)  # waits for the next frame time
+        self.t_frame = time.time()                 # virtual time of this frame
+        recorded = sorted(self.frames)             # sides with recorded frames
+        if len(recorded) == 0:                     # case there are no recorded frames
+            return self.frame if self.frame is not None else []  # last frame (or an empty one) is returned
+        below = [s for s in recorded if s <= self.side]  # recorded sides up to the one under detection
+        side = below[-1] if len(below) > 0 else recorded[0]  # closest recorded side
+        frames, i = self.frames[side], self.pointer.get(side, 0)  # recorded frames of the side, and next frame index
+        self.pointer[side] = min(i + 1, len(frames) - 1)  # pointer is moved to the next frame (kept on the last one)
+        self.frame = frames[i][0].copy()           # frame copy (frames get drawn by the detection)
+        self.frames_served += 1                    # counter of the returned frames is incremented
+        return self.frame                          # frame is returned
+
+
+    def shape(self):
+        """ Returns the height and width of the recorded frames (the first recorded frame, when none was returned yet)."""
+
+        if self.frame is None and len(self.recordings) > 0:  # case no frames have been returned yet
+            from Cubotino_P_recorder import load_meta, load_frames  # functions to load the recorded frames
+            meta = load_meta(self.recordings[0])   # metadata of the first recorded cycle
+            for frame, side, elapsed in load_frames(self.recordings[0], meta):  # iteration over the recorded frames
+                self.frame = frame                 # first frame is assigned
+                break                              # for loop is interrupted
+        return self.frame.shape[:2] if self.frame is not None else (0, 0)
+
+
+    def get_width(self):
+        return self.shape()[1]
+
+
+    def get_height(self):
+        return self.shape()[0]
+
+
+    def printout(self):
+        print(f"Virtual camera, replaying the recorded frames in {self.folder}")
+
+
+    def close_camera(self):
+        return 'camera closed'
+
+
+    def set_auto(self, debug, awb_mode, expo_shift):
+        if debug:                                  # case debug variable is set True
+            print('\nVirtual camera set in automatic mode, with AwbMode type:', awb_mode, "  and expo_shift:", expo_shift)
+
+
+    def set_gains(self, debug, a_gain, d_gain, awb_gains):
+        self.gains = (a_gain, d_gain, awb_gains)   # gains are stored, and returned by the metadata
+
+
+    def get_metadata(self):
+        """ Returns the metadata at the frame rate, as the PiCamera does."""
+        clock.wait_until(self.t_frame + self.period)  # waits for the next frame time
+        self.t_frame = time.time()                 # virtual time of this frame
+        a_gain, d_gain, awb_gains = self.gains     # gains
+        return {"AnalogueGain": a_gain, "DigitalGain": d_gain, "ColourGains": awb_gains, "ExposureTime": self.shutter_time}
+
+
+    def get_exposure(self):
+        return self.shutter_time
+
+
+    def set_exposure(self, shutter_time):
+        self.shutter_time = shutter_time           # shutter time is stored, and returned by the metadata
+
+
+    def set_exposure_shift(self, shift):
+        pass
+
+
+
+
+class GPIO:
+    """ Simulated RPi.GPIO module; The touch button is never pressed."""
+
+    BCM, BOARD, IN, OUT, LOW, HIGH = 11, 10, 1, 0, 0, 1
+    PUD_OFF, PUD_DOWN, PUD_UP, RISING, FALLING, BOTH = 20, 21, 22, 31, 32, 33
+    levels = {}                                    # dict pin -> level of the output pins
+
+    def setwarnings(flag): pass
+    def setmode(mode): pass
+    def cleanup(*args): pass
+    def add_event_detect(pin, edge, callback=None, bouncetime=None): pass
+    def remove_event_detect(pin): pass
+    def setup(pin, mode, pull_up_down=None, initial=None):
+        if mode == GPIO.OUT and initial is not None:  # case of an output pin with initial level
+            GPIO.levels[pin] = initial             # level is stored
+    def output(pin, level):
+        GPIO.levels[pin] = level                   # level is stored
+    def input(pin):
+        return GPIO.levels.get(pin, GPIO.LOW)      # button pins are read as not pressed
+
+
+
+
+class Servo:
+    """ Simulated gpiozero Servo: movements are counted (the servos timing is the one of the sleeps in Cubotino_P_servos)."""
+
+    servos = []                                    # list of the created servos
+
+    def __init__(self, pin, initial_value=0, min_pulse_width=0.001, max_pulse_width=0.002, frame_width=0.02, pin_factory=None):
+        self.pin = pin                             # GPIO pin
+        self._value = initial_value                # servo position (-1 to 1), None when detached
+        self.moves = 0                             # counter of the movements
+        Servo.servos.append(self)                  # servo is added to the list
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        if value != self._value:                   # case the position changes
+            self.moves += 1                        # counter of the movements is incremented
+        self._value = value                        # position is stored
+
+    def detach(self):
+        self._value = None                         # PWM is stopped
+
+    def close(self):
+        self.detach()                              # PWM is stopped
+
+
+
+
+class PWMLED:
+    """ Simulated gpiozero PWMLED: brightness changes are counted."""
+
+    changes = 0                                    # counter of the brightness changes
+
+    def __init__(self, pin, active_high=True, initial_value=0, frequency=100, pin_factory=None):
+        self._value = initial_value                # led brightness (0 to 1)
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        PWMLED.changes += int(value != self._value)  # counter of the brightness changes is incremented
+        self._value = value                        # brightness is stored
+
+    def on(self):
+        self.value = 1
+
+    def off(self):
+        self.value = 0
+
+    def close(self):
+        self.off()
+
+
+
+
+class Button:
+    """ Simulated gpiozero Button, never pressed."""
+
+    def __init__(self, pin, *args, **kwargs):
+        self.pin = pin                             # GPIO pin
+        self.is_pressed = False                    # button is never pressed
+
+    def wait_for_press(self, timeout=None):
+        time.sleep(timeout if timeout is not None else 0)  # timeout is slept (on the virtual clock, if main thread)
+        return False
+
+
+
+
+class ST7735:
+    """ Simulated ST7735 display: frames and windows are counted, and the SPI transfer time is slept by the display
+        worker thread (real time, as the worker thread runs concurrently to the robot cycle)."""
+
+    frames, windows, bytes = 0, 0, 0               # counters of the full frames, windows and bytes sent
+
+    def __init__(self, port=0, cs=0, dc=None, rst=None, backlight=None, width=128, height=160,
+                 offset_left=0, offset_top=0, rotation=90, invert=False, spi_speed_hz=4000000):
+        self._width, self._height = width, height  # display dimensions, as per display native orientation
+        self._rotation = rotation                  # image orientation
+        self.spi_speed_hz = spi_speed_hz           # SPI frequence
+        self.backlight = 0                         # backlight status
+
+    @property
+    def width(self):
+        return self._width if self._rotation in (0, 180) else self._height
+
+    @property
+    def height(self):
+        return self._height if self._rotation in (0, 180) else self._width
+
+    def set_backlight(self, value):
+        self.backlight = value                     # backlight status is stored
+
+    def spi(self, n):
+        """ Counts n bytes sent to the display, and sleeps the SPI transfer time."""
+        ST7735.bytes += n                          # bytes counter is increased
+        time.sleep(8 * n / self.spi_speed_hz)      # SPI transfer time
+
+    def image_to_data(self, image, rotation=0):
+        """ Returns the RGB565 bytes of a PIL image, as the ST7735 library does (numpy based)."""
+        import numpy as np                         # data array management
+        pb = np.rot90(np.array(image.convert('RGB')), rotation // 90).astype('uint16')  # rotated RGB array
+        color = ((pb[:, :, 0] & 0xF8) << 8) | ((pb[:, :, 1] & 0xFC) << 3) | (pb[:, :, 2] >> 3)  # RGB565 pixels
+        return np.dstack(((color >> 8) & 0xFF, color & 0xFF)).flatten().tolist()  # high and low bytes per pixel
+
+    def set_window(self, x0=0, y0=0, x1=None, y1=None):
+        ST7735.windows += 1                        # windows counter is incremented
+
+    def data(self, data):
+        self.spi(len(data))                        # bytes are sent to the display window
+
+    def display(self, image):
+        ST7735.frames += 1                         # full frames counter is incremented
+        self.spi(len(self.image_to_data(image, self._rotation)))  # full frame bytes are sent to the display
+
+
+
+
+class Pigpiod:
+    """ Simulated pigpiod daemon manager (no daemon is started)."""
+    pigpiod_once = True
+
+
+
+
+def module(name, **attrs):
+    """ Returns a new module named name, with the attrs as attributes; The module is registered in sys.modules."""
+    mod = types.ModuleType(name)                   # new module
+    mod.__dict__.update(attrs)                     # attributes are added
+    sys.modules[name] = mod                        # module is registered, so that it gets imported instead of the real one
+    return mod
+
+
+
+
+def install(folder):
+    """ Simulated modules replace the hardware ones, the virtual clock is activated, and the replay camera is set
+        on the recorded cycles in folder; This has to be called before importing the robot modules."""
+
+    global camera
+
+    camera = ReplayCamera(folder)                  # camera replaying the recorded cycles
+    gpio = module('RPi.GPIO', **{k: v for k, v in vars(GPIO).items() if not k.startswith('__')})  # simulated GPIO module
+    module('RPi', GPIO=gpio)                       # RPi package with the GPIO module
+    pins = module('gpiozero.pins')                 # gpiozero pins package
+    pins.pigpio = module('gpiozero.pins.pigpio', PiGPIOFactory=lambda *args, **kwargs: None)  # pin factory
+    module('gpiozero', Servo=Servo, PWMLED=PWMLED, Button=Button, pins=pins)  # simulated gpiozero
+    module('ST7735', ST7735=ST7735)                # simulated display library
+    module('getmac', get_mac_address=lambda *args, **kwargs: '00:00:00:00:00:00')  # MAC address of the virtual board
+    module('Cubotino_P_pigpiod', pigpiod=Pigpiod())  # no pigpio daemon is started
+    module('Cubotino_P_camera_os11', camera=camera)  # replay camera, as the OS 11 (Bullseye) PiCamera
+    clock.install()                                # virtual clock is activated
+    print(f"\nVirtual hardware: {len(camera.recordings)} recorded cycles found in {camera.folder}")  # feedback to the terminal
+
+
+
+
+clock = Clock()
+phases = Phases()
+camera = None
+
+if __name__ == "__main__":
+    """the main function can be used to list the recorded cycles the virtual camera would replay. """
+
+    rec_folder = sys.argv[1] if len(sys.argv) > 1 else 'FramesRecording'  # folder with the recorded cycles
+    camera = ReplayCamera(rec_folder)              # camera replaying the recorded cycles
+    print(f"{len(camera.recordings)} recorded cycles found in {camera.folder}")
+    while camera.next_cycle() is not None:         # iteration over the recorded cycles
+        print('   frames per face: ' + '  '.join(f'{faces.get(s, s)}:{len(f)}' for s, f in sorted(camera.frames.items())),
+              f'  (frames period {1000*camera.period:.0f} ms)')
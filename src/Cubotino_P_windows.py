@@ -0,0 +1,157 @@
+#!/usr/bin/python
+# coding: utf-8
+
+"""
+#############################################################################################################
+#  Andrea Favero 29 March 2024
+#
+# This script relates to CUBOTino Pocket, a very small and simple Rubik's cube solver robot 3D printed
+# CUBOTino autonomous is the CUBOTino versions for the Rubik's cube 2x2x2.
+# This specific script manages the OpenCV windows on the (optional) screen, also when via VNC.
+# A worker thread owns all the imshow / waitKey calls, so that the cube detection and the servos
+# never wait on a window refresh.
+# This file is imported by Cubotino_P.py
+#
+#############################################################################################################
+"""
+
+import threading, queue, time
+
+
+class Windows:
+
+    def __init__(self):
+        """ Sets the queues used to pass commands and frames to the worker thread.
+            The worker thread is started via the start() method, once OpenCV is imported."""
+
+        self.ops = queue.Queue()                   # windows commands (create, move, destroy), executed in order
+        self.frames = queue.Queue(maxsize=1)       # frames to show, size 1: the latest frame wins
+        self.thread = None                         # worker thread
+        self.shown = False                         # flag tracking whether at least one window has been shown
+
+
+    def start(self):
+        """ Imports OpenCV and starts the worker thread (once)."""
+
+        if self.thread is None:                    # case the worker thread has not been started yet
+            import cv2                             # computer vision package
+            self.cv2 = cv2                         # cv2 is assigned to an instance variable
+            self.thread = threading.Thread(target=self.run, name='windows', daemon=True)  # worker thread
+            self.thread.start()                    # worker thread is started
+
+
+    def window(self, name, pos=None):
+        """ Creates the window name, and eventually moves it to the pos (x, y) coordinates."""
+        self.ops.put(('window', name, pos))        # command is queued
+
+
+    def destroy(self, name=None):
+        """ Closes the window name, or all the windows when name is None.
+            Frames not yet shown are dropped, to prevent closed windows from re-opening."""
+
+        self.drop_frames()                         # frames not yet shown are dropped
+        self.ops.put(('destroy', name, None))      # command is queued
+
+
+    def destroy_after(self, name, secs):
+        """ Closes the window name after secs, without waiting on the caller side.
+            Queued frames are kept, as they belong to other windows by then."""
+
+        timer = threading.Timer(secs, self.ops.put, args=(('destroy', name, None),))  # command is queued after secs
+        timer.daemon = True                        # timer does not prevent the script from quitting
+        timer.start()                              # timer is started
+
+
+    def show(self, name, image, hold=0):
+        """ Queues an image for the window name; A queued image not yet shown is replaced (latest wins).
+            When hold is > 0, the image is kept on screen for hold secs, before showing newer frames."""
+        self.show_set({name: image}, hold)         # single window images set is queued
+
+
+    def show_set(self, images, hold=0):
+        """ Queues a dict of images (window name as key), to be shown together; Latest set wins."""
+
+        item = (images, hold)                      # images set and holding time
+        while True:                                # iteration until the item is queued
+            try:                                   # tentative
+                self.frames.put_nowait(item)       # item is queued
+                break                              # while loop is interrupted
+            except queue.Full:                     # case a previous item is still queued
+                self.drop_frames()                 # the stale item is dropped
+
+
+    def drop_frames(self):
+        """ Drops the frames not yet shown."""
+        try:                                       # tentative
+            self.frames.get_nowait()               # queued item is removed
+        except queue.Empty:                        # case there are no queued items
+            pass                                   # do nothing
+
+
+    def wait(self, ms):
+        """ Waits ms milliseconds on the caller side, while the worker keeps the windows refreshed.
+            This replaces the cv2.waitKey(ms) used to let the windows visible for some time."""
+        time.sleep(ms/1000)                        # ms are converted to secs
+
+
+    def run(self):
+        """ Worker thread: executes the queued windows commands, shows the latest frames and refreshes the windows."""
+
+        cv2 = self.cv2                             # cv2 is assigned to a local variable
+        hold_until = 0                             # time until the last shown frame has to be kept on screen
+        while True:                                # infinite loop
+            while not self.ops.empty():            # case there are windows commands
+                op, name, pos = self.ops.get()     # windows command is retrieved
+                try:                               # tentative
+                    if op == 'window':             # case of window creation
+                        cv2.namedWindow(name)      # window is created
+                        if pos is not None:        # case a position is given
+                            cv2.moveWindow(name, pos[0], pos[1])  # window is moved to pos
+                    elif op == 'destroy':          # case of windows closing
+                        if name is None:           # case all the windows have to be closed
+                            cv2.destroyAllWindows()  # all the windows are closed
+                            self.shown = False     # flag tracking shown windows is set False
+                        else:                      # case a specific window has to be closed
+                            cv2.destroyWindow(name)  # window is closed
+                        hold_until = 0             # frame holding time is reset
+                except:                            # case an exception is raised (i.e. window not existing)
+                    pass                           # do nothing
+
+            if time.time() >= hold_until:          # case the last shown frame does not need to be held anymore
+                try:                               # tentative
+                    images, hold = self.frames.get(timeout=0.01)  # latest images set is retrieved
+                    for name, image in images.items():  # iteration over the images set
+                        cv2.imshow(name, image)    # image is shown on its window
+                    self.shown = True              # flag tracking shown windows is set True
+                    hold_until = time.time() + hold  # time until the frame has to be kept on screen
+                except queue.Empty:                # case there are no frames to show
+                    pass                           # do nothing
+            else:                                  # case the last shown frame has to be held
+                time.sleep(0.01)                   # little sleep time
+
+            if self.shown:                         # case at least one window has been shown
+                cv2.waitKey(1)                     # windows are refreshed (events processing)
+
+
+
+
+
+
+
+windows = Windows()
+
+if __name__ == "__main__":
+    """the main function can be used to test the windows worker. """
+
+    import numpy as np
+
+    windows.start()
+    windows.window('test', (0, 0))
+    for i in range(100):
+        img = np.zeros((240, 320, 3), dtype=np.uint8)
+        img[:, :, 1] = int(2.5*i)
+        windows.show('test', img)
+        time.sleep(0.03)
+    windows.wait(1000)
+    windows.destroy()
+    windows.wait(200)
@@ -0,0 +1,9 @@
+"""
+Tests of the CUBOTino Pocket scripts that run without the robot hardware.
+The scripts folder is added to the import path, as the scripts import each other by name.
+From the src folder:  python -m pytest tests
+"""
+
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,121 @@
+"""
+Tests of the cube status functions of Cubotino_P.py that run without the robot hardware.
+"""
+
+import sys, math
+import pytest
+
+sys.argv = sys.argv[:1]                            # Cubotino_P parses the CLI arguments at import, these are removed
+import Cubotino_P as cp                            # script with the cube status detection functions
+from solver2x2x2.face import FaceCube             # facelet level cube, to check the cube status validity
+
+
+to_color = {'U':'c0', 'R':'c1', 'F':'c2', 'D':'c3', 'L':'c4', 'B':'c5'}  # inverse of the cube_string letters
+
+
+def scrambled():
+    """ Returns a valid cube status string (URFDLB order), from robot moves applied to the solved cube."""
+    css = 'UUUURRRRFFFFDDDDLLLLBBBB'
+    for move_type, direction in (('R','1'), ('F','1'), ('R','3'), ('S','1'), ('R','1'), ('F','1'), ('R','1')):
+        css = cp.cube_facelets_permutation(css, move_type, direction)
+    return css
+
+
+@pytest.fixture
+def classified(monkeypatch):
+    """ Replaces the calibrated colors classification by the given cube status (dict facelet -> color)."""
+    monkeypatch.setattr(cp, 'FaceCube', FaceCube, raising=False)
+    monkeypatch.setattr(cp, 'debug', False, raising=False)
+    def classify(status):
+        def cube_colors_interpr_LAB(BGR_detected, facelets=None):
+            return {f: status[f] for f in facelets}, 'ref_colors'
+        monkeypatch.setattr(cp, 'cube_colors_interpr_LAB', cube_colors_interpr_LAB)
+    return classify
+
+
+
+
+def test_scrambled_cube_is_valid(classified):
+    css = scrambled()
+    assert css != 'UUUURRRRFFFFDDDDLLLLBBBB'
+    assert cp.cube_status_check(css)
+
+
+def test_last_face_unique(classified):
+    status = {f: to_color[c] for f, c in enumerate(scrambled())}
+    classified(status)
+    outcome, completions, ref_colors = cp.last_face_deduction(None)
+    assert outcome == 'unique'
+    assert completions == [status]
+    assert ref_colors == 'ref_colors'
+    assert cp.cube_string(completions[0]) == scrambled()
+
+
+def test_last_face_inconsistent(classified):
+    status = {f: to_color[c] for f, c in enumerate(scrambled())}
+    status[0], status[4] = status[4], status[0]   # two scanned facelets with swapped colors
+    classified(status)
+    outcome, completions, _ = cp.last_face_deduction(None)
+    assert outcome == 'inconsistent'
+    assert completions == []
+
+
+def test_last_face_unclassified(classified, monkeypatch):
+    status = {f: to_color[c] for f, c in enumerate(scrambled())}
+    del status[7]                                  # a scanned facelet not classified
+    classified(status)
+    def cube_colors_interpr_LAB(BGR_detected, facelets=None):
+        return {f: status[f] for f in facelets if f in status}, 'ref_colors'
+    monkeypatch.setattr(cp, 'cube_colors_interpr_LAB', cube_colors_interpr_LAB)
+    assert cp.last_face_deduction(None)[0] == 'unclassified'
+
+
+def test_canonical_string_relabels_by_first_appearance():
+    assert cp.canonical_string('UUUURRRRFFFFDDDDLLLLBBBB') == 'UUUURRRRFFFFDDDDLLLLBBBB'
+    assert cp.canonical_string('BBBBLLLLDDDDFFFFRRRRUUUU') == 'UUUURRRRFFFFDDDDLLLLBBBB'
+    assert cp.canonical_string(scrambled()) == 'URURFFRDRDLLDDBBLLUBUBFF'
+
+
+def test_canonical_string_same_cube_other_labels():
+    css = scrambled()
+    relabeled = css.translate(str.maketrans('URFDLB', 'FDULBR'))  # same cube, colors labeled in another order
+    assert relabeled != css
+    assert cp.canonical_string(relabeled) == cp.canonical_string(css)
+    assert cp.canonical_string(cp.canonical_string(css)) == cp.canonical_string(css)
+    swapped = css[4:] + css[:4]                    # a different cube status
+    assert cp.canonical_string(swapped) != cp.canonical_string(css)
+
+
+@pytest.fixture
+def consensus(monkeypatch):
+    """ Sets the globals used by facelets_colors_consensus; Returns a function to queue the camera frames."""
+    np = pytest.importorskip('numpy')
+    cv2 = pytest.importorskip('cv2')
+    for name, value in (('np', np), ('cv2', cv2), ('math', math), ('robot_stop', False), ('debug', False), ('screen', False),
+                        ('edge', 2), ('side', 1), ('sides', {1: 'U'}), ('consensus_stats', [])):
+        monkeypatch.setattr(cp, name, value, raising=False)
+    frames = []
+    monkeypatch.setattr(cp, 'read_camera', lambda: (frames.pop(0) if frames else None, 40, 40))
+    return np, frames
+
+
+def test_consensus_skips_missing_frames(consensus):
+    np, frames = consensus
+    frame = np.full((40, 40, 3), (10, 120, 200), dtype=np.uint8)  # cube at rest, facelets of the same color
+    frames += [None, None, frame, frame]
+    facelets = [{'cx': 10, 'cy': 10}, {'cx': 30, 'cy': 10}, {'cx': 10, 'cy': 30}, {'cx': 30, 'cy': 30}]
+    BGR_mean, HSV_mean = [(10, 120, 200)]*4, [[0, 0, 0]]*4
+    cp.facelets_colors_consensus(facelets, BGR_mean, HSV_mean, n_max=4)
+    assert cp.consensus_stats == [('U', 2)]        # the missing frames are not counted, the stable sample stops it
+    assert frames == [frame]
+    assert BGR_mean == [(10, 120, 200)]*4
+    assert all(list(hsv) != [0, 0, 0] for hsv in HSV_mean)
+
+
+def test_consensus_without_frames(consensus):
+    np, frames = consensus
+    facelets = [{'cx': 10, 'cy': 10}]*4
+    BGR_mean, HSV_mean = [(1, 2, 3)]*4, [[0, 0, 0]]*4
+    cp.facelets_colors_consensus(facelets, BGR_mean, HSV_mean, n_max=3)
+    assert cp.consensus_stats == [('U', 1)]        # only the detection frame, after n_max missing frames
+    assert BGR_mean == [(1, 2, 3)]*4
@@ -0,0 +1,97 @@
+"""
+Tests of the binary cube data log (Cubotino_P_datalog.py): record layout, round-trip and fields overflow.
+"""
+
+import os
+import pytest
+from Cubotino_P_datalog import DataLog, head, rec, fields, magic, text_headers, to_epoch
+
+
+def log_row(**kwargs):
+    """ Returns a row as logged to the text log, keyed by text_headers; kwargs replace the default values."""
+    row = {'Date': '20240329_101500', 'Screen': 'no screen', 'Flip2close': '1', 'FramelessCube': 'auto',
+           'ColorAnalysisWinner': 'LAB', 'TotRobotTime(s)': '31.5', 'CameraWarmUpTime(s)': '2.5',
+           'FaceletsDetectionTime(s)': '8.2', 'CubeSolutionTime(s)': '0.3', 'RobotSolvingTime(s)': '20.5',
+           'SlowTime(s)': '0', 'FCS': '2', 'URF/DBL': 'DBL', 'OS_ver': '11',
+           'CubeStatus': 'FRFRUURBRBDDBBLLDDFLFLUU', 'CubeSolution': 'R1F3R2', 'CubeColor(BGR or HSV or BRG,HSV)': ''}
+    row.update(kwargs)
+    return row
+
+
+def read_records(fname):
+    """ Returns the header and the unpacked records of the binary log fname, without numpy."""
+    with open(fname, 'rb') as f:
+        data = f.read()
+    body = data[head.size:]
+    return head.unpack(data[:head.size]), [rec.unpack_from(body, i) for i in range(0, len(body), rec.size)]
+
+
+
+
+def test_record_layout():
+    assert rec.size == 112
+    assert head.size == 16
+    assert len(text_headers) == 17
+    assert [name for name, _ in fields][:2] == ['ts', 'tot']
+    assert len(fields) == 17                       # 16 rec fields, plus the padding
+
+
+def test_round_trip(tmp_path):
+    fname = str(tmp_path / 'CubesDataLog' / 'log.bin')
+    binlog = DataLog(sync_every=2)
+    binlog.append(log_row(), fname)
+    binlog.append(log_row(Date='20240329_101600', Screen='screen', Flip2close='2', FramelessCube='false',
+                          FCS='', OS_ver='', CubeSolution=''), fname)
+    binlog.close()
+
+    (sign, size, _), records = read_records(fname)
+    assert (sign, size) == (magic, rec.size)
+    assert len(records) == 2
+    ts, tot, warmup, detect, solution_t, solving, slow, fcs, screen, flip, frameless, urf_dbl, os_ver, \
+        cdw, css, solution = records[0]
+    assert ts == to_epoch('20240329_101500')
+    assert tot == pytest.approx(31.5) and detect == pytest.approx(8.2) and solving == pytest.approx(20.5)
+    assert (fcs, screen, flip, frameless, urf_dbl, os_ver) == (2, 0, 1, 2, 1, 11)
+    assert cdw.rstrip(b'\0') == b'LAB'
+    assert css == b'FRFRUURBRBDDBBLLDDFLFLUU'
+    assert solution.rstrip(b'\0') == b'R1F3R2'
+    assert records[1][7:13] == (255, 1, 2, 0, 1, 255)
+
+
+def test_partial_record_is_truncated(tmp_path):
+    fname = str(tmp_path / 'log.bin')
+    binlog = DataLog()
+    binlog.append(log_row(), fname)
+    binlog.close()
+    with open(fname, 'ab') as f:                   # as after a power cut while writing
+        f.write(b'\1' * 50)
+    binlog.append(log_row(Date='20240329_101600'), fname)
+    binlog.close()
+    assert os.path.getsize(fname) == head.size + 2*rec.size
+    assert [r[0] for r in read_records(fname)[1]] == [to_epoch('20240329_101500'), to_epoch('20240329_101600')]
+
+
+@pytest.mark.parametrize('header, value', [('ColorAnalysisWinner', 'W'*9),
+                                           ('CubeStatus', 'U'*25),
+                                           ('CubeSolution', 'R1'*21)])
+def test_overflow_raises(tmp_path, header, value):
+    fname = str(tmp_path / 'log.bin')
+    binlog = DataLog()
+    with pytest.raises(ValueError):
+        binlog.append(log_row(**{header: value}), fname)
+    assert binlog.appended == 0
+    assert not os.path.exists(fname)               # nothing is written, not even the header
+
+
+def test_load_matches_records(tmp_path):
+    np = pytest.importorskip('numpy')
+    from Cubotino_P_datalog import load
+    fname = str(tmp_path / 'log.bin')
+    binlog = DataLog()
+    for minute in range(3):
+        binlog.append(log_row(Date=f'20240329_10{minute:02d}00'), fname)
+    binlog.close()
+    data = load(fname)
+    assert len(data) == 3
+    assert np.all(data['ts'][1:] > data['ts'][:-1])
+    assert data['css'][0] == b'FRFRUURBRBDDBBLLDDFLFLUU'
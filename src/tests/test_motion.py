@@ -0,0 +1,90 @@
+"""
+Tests of the servos timeline (Cubotino_P_motion.py): safety interlocks and overlaps, on the simulated backend.
+"""
+
+import pytest
+from Cubotino_P_motion import Timeline, SimBackend, run
+
+
+# servos positions and timers, as returned by params_from_settings
+p = {'t_close': -0.8, 't_open': 0.2, 't_read': 0.6, 't_flip': 1.0, 't_rel': -0.85,
+     'b_home': 0.0, 'b_CW': -0.9, 'b_CCW': 0.9, 'b_CW_rel': -0.85, 'b_CCW_rel': 0.85,
+     'b_home_from_CW': 0.05, 'b_home_from_CCW': -0.05, 'one_step': False,
+     't_flip_to_close_time': 0.4, 't_close_to_flip_time': 0.5, 't_flip_open_time': 0.3, 't_open_close_time': 0.3,
+     't_rel_time': 0.05, 'b_spin_time': 0.5, 'b_rotate_time': 0.6, 'b_rel_time': 0.1}
+
+moves = 'F2R1S3R1S3S3F1R1F2R1S3S3F1R1S3R1F3R1S3R1S3S3F3R1S3F1R1S3R1F3R1S3R1S3F3R1S3R1'
+
+
+def simulate(tl):
+    """ Runs the timeline events on the simulated backend; Returns the backend, the measured time and last event."""
+    sim = SimBackend(cover='read')                 # top cover at read position, as the Timeline start
+    measured, last = run(tl.events, sim)
+    return sim, measured, last
+
+
+
+
+@pytest.mark.parametrize('overlap', [False, True])
+def test_no_interlock_violations(overlap):
+    tl = Timeline(p, overlap=overlap)
+    scheduled, serial = tl.expand(moves)
+    sim, measured, last = simulate(tl)
+    assert sim.violations == []
+    assert measured == pytest.approx(scheduled)
+    assert last == len(tl.events) - 1
+
+
+def test_serialized_without_overlap():
+    scheduled, serial = Timeline(p, overlap=False).expand(moves)
+    assert scheduled == pytest.approx(serial)
+
+
+def test_overlap_only_on_release():
+    tl = Timeline(p, overlap=True)
+    scheduled, serial = tl.expand('R1')
+    assert scheduled < serial
+    events = tl.events
+    for i, ev in enumerate(events):
+        if ev['servo'] == 'top' and i > 0 and events[i-1]['kind'] == 'release':  # top cover raised after a rotation
+            rotate, release = events[i-2], events[i-1]
+            assert ev['start'] == pytest.approx(rotate['start'] + rotate['time'])  # starts at the rotation end
+            assert ev['start'] < release['start'] + release['time']  # while the holder backs off
+            break
+    else:
+        pytest.fail('no top cover movement following a holder release')
+
+
+def test_bottom_waits_for_top_cover():
+    tl = Timeline(p, overlap=True)
+    tl.expand('S1R1')
+    for ev in tl.events:
+        if ev['servo'] == 'bottom' and ev['kind'] != 'release':  # holder spin or rotation
+            tops = [tl.events[i] for i in ev['after'] if tl.events[i]['servo'] == 'top']
+            assert len(tops) == 1
+            assert ev['start'] >= tops[0]['start'] + tops[0]['time'] - 1e-9
+
+
+def test_simulator_reports_violations():
+    tl = Timeline(p, overlap=True)
+    tl.expand(moves)
+    for ev in tl.events:                           # interlocks are dropped: only the same servo events are serialized
+        ev['after'] = [i for i in ev['after'] if tl.events[i]['servo'] == ev['servo']]
+    tl.schedule()
+    sim, measured, last = simulate(tl)
+    assert len(sim.violations) > 0
+
+
+def test_rotation_with_open_cover_is_a_violation():
+    sim = SimBackend(cover='open')
+    sim.set({'servo': 'bottom', 'value': p['b_CW'], 'time': p['b_rotate_time'], 'kind': 'rotate', 'pos': ''})
+    assert sim.violations == ['0.000s holder rotate with top cover at open']
+
+
+def test_stop_interrupts_the_run():
+    tl = Timeline(p)
+    tl.expand(moves, progress={0: 10, 4: 20})
+    calls = []
+    measured, last = run(tl.events, SimBackend(), stop=lambda: len(calls) > 0, progress=calls.append)
+    assert calls != []
+    assert last < len(tl.events) - 1